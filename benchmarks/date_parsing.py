@@ -0,0 +1,96 @@
+"""
+Throughput of parse_date_to_timestamp_ms on 100k mixed values: ms and seconds
+timestamps, floats, datetimes, ISO strings (a few hundred distinct ones, repeated like
+the due dates of a course) and some non ISO strings.
+
+  - dateutil: every string through dateutil.parser.parse, as it used to be
+  - single:   parse_date_to_timestamp_ms on each value
+  - batch:    parse_dates_to_timestamp_ms on the whole list
+
+The cache of the ISO strings is cleared before every run, so each one pays for its
+misses. The non ISO strings go through dateutil every time, they aren't cached.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/date_parsing.py [--values 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from dateutil.parser import parse as parse_date
+
+from utils import (
+    parse_date_to_timestamp_ms,
+    parse_dates_to_timestamp_ms,
+    parse_iso_date_string_to_timestamp_ms,
+)
+
+TIMESTAMP_MS = 1_750_000_000_000
+
+
+def mixed_values(count, distinct_strings):
+    start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    dates = [start + timedelta(hours=7 * i) for i in range(distinct_strings)]
+    makers = [
+        lambda i: TIMESTAMP_MS + i,
+        lambda i: TIMESTAMP_MS // 1000 + i,
+        lambda i: TIMESTAMP_MS / 1000 + i / 10,
+        lambda i: dates[i % len(dates)].replace(tzinfo=None),
+        lambda i: dates[i % len(dates)].isoformat(),
+        lambda i: dates[i % len(dates)].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        lambda i: dates[i % len(dates)].strftime("%Y-%m-%d"),
+        lambda i: dates[i % len(dates)].strftime("%B %d %Y %H:%M"),
+    ]
+    return [random.choice(makers)(i) for i in range(count)]
+
+
+def dateutil_timestamp_ms(value):
+    if isinstance(value, str):
+        dt = parse_date(value)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1000)
+    return parse_date_to_timestamp_ms(value)
+
+
+def best_ms(call, repeat):
+    def run():
+        parse_iso_date_string_to_timestamp_ms.cache_clear()
+        call()
+
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--values", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = mixed_values(args.values, args.distinct)
+
+    expected = [dateutil_timestamp_ms(value) for value in values]
+    assert parse_dates_to_timestamp_ms(values) == expected
+
+    dateutil = best_ms(
+        lambda: [dateutil_timestamp_ms(value) for value in values], args.repeat
+    )
+    single = best_ms(
+        lambda: [parse_date_to_timestamp_ms(value) for value in values], args.repeat
+    )
+    batch = best_ms(lambda: parse_dates_to_timestamp_ms(values), args.repeat)
+
+    print(
+        f"{args.values} values, {args.distinct} distinct dates, best of {args.repeat}\n"
+    )
+    print(f"dateutil  {dateutil:8.1f} ms")
+    print(f"single    {single:8.1f} ms  ({dateutil / single:.1f}x)")
+    print(f"batch     {batch:8.1f} ms  ({dateutil / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
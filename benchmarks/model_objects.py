@@ -0,0 +1,242 @@
+"""
+Memory and throughput of the models on a 10k tasks list, each with a few submissions
+and their feedbacks (the shape get_tasks_by_teacher and get_tasks_by_student load),
+for the models before __slots__ (DictTask, a copy of them) and the current ones:
+
+  - from_dict: building the Task objects from the documents
+  - to_dict:   serializing them back for the response
+  - memory:    bytes held by the list of Task objects (tracemalloc)
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/model_objects.py [--tasks 10000] [--repeat 5]
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+from bson import ObjectId
+
+from models.task import Task, TaskStatus, TaskType
+from utils import parse_date_to_timestamp_ms, parse_to_timestamp_ms_now
+
+TIMESTAMP_MS = 1_750_000_000_000
+
+
+# The models as they were before __slots__: instance dicts, built through __init__
+class DictFeedback:
+    def __init__(self, corrector_id=None, grade=None, comment=None, created_at=None):
+        self.corrector_id = corrector_id
+        self.grade = grade
+        self.comment = comment
+        self.created_at = created_at or parse_to_timestamp_ms_now()
+
+    def to_dict(self):
+        return {
+            "corrector_id": self.corrector_id,
+            "grade": self.grade,
+            "comment": self.comment,
+            "created_at": self.created_at,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return DictFeedback(
+            corrector_id=data.get("corrector_id"),
+            grade=data.get("grade"),
+            comment=data.get("comment"),
+            created_at=data.get("created_at"),
+        )
+
+
+class DictSubmission:
+    def __init__(self, attachments=None, feedbacks=None, on_time=True):
+        self.attachments = attachments or []
+        self.feedbacks = {}
+        self.on_time = on_time
+        if feedbacks:
+            for corrector_id, feedback_data in feedbacks.items():
+                self.feedbacks[corrector_id] = DictFeedback.from_dict(feedback_data)
+
+    def to_dict(self):
+        return {
+            "attachments": self.attachments,
+            "feedbacks": {k: v.to_dict() for k, v in self.feedbacks.items()},
+            "on_time": self.on_time,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        data = data or {}
+        return DictSubmission(
+            attachments=data.get("attachments", []),
+            feedbacks=data.get("feedbacks", {}),
+            on_time=data.get("on_time", True),
+        )
+
+
+class DictTask:
+    def __init__(
+        self,
+        title,
+        due_date,
+        course_id,
+        module_id,
+        description="",
+        instructions="",
+        status=TaskStatus.INACTIVE,
+        task_type=TaskType.TASK,
+        attachments=None,
+        submissions=None,
+        _id=None,
+        created_at=None,
+        updated_at=None,
+    ):
+        self._id = _id if _id else ObjectId()
+        self.title = title
+        self.description = description
+        self.instructions = instructions
+        self.due_date = due_date
+        self.course_id = course_id
+        self.module_id = module_id
+        self.status = status
+        self.task_type = task_type
+        self.attachments = attachments if attachments is not None else []
+        self.submissions = submissions if submissions is not None else {}
+        self.created_at = (
+            created_at if created_at is not None else parse_to_timestamp_ms_now()
+        )
+        self.updated_at = (
+            updated_at if updated_at is not None else parse_to_timestamp_ms_now()
+        )
+
+    def to_dict(self):
+        return {
+            "_id": str(self._id),
+            "title": self.title,
+            "description": self.description,
+            "instructions": self.instructions,
+            "due_date": self.due_date,
+            "course_id": self.course_id,
+            "module_id": self.module_id,
+            "status": self.status.value,
+            "task_type": self.task_type.value,
+            "attachments": self.attachments,
+            "submissions": {k: v.to_dict() for k, v in self.submissions.items()},
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        data = data or {}
+        submissions = {}
+        for k, v in (data.get("submissions", {}) or {}).items():
+            if v:
+                submissions[k] = DictSubmission.from_dict(v)
+
+        return DictTask(
+            _id=ObjectId(data["_id"]) if data.get("_id") else None,
+            title=data["title"],
+            description=data.get("description", ""),
+            instructions=data.get("instructions", ""),
+            due_date=parse_date_to_timestamp_ms(data.get("due_date")),
+            course_id=data["course_id"],
+            module_id=data["module_id"],
+            status=TaskStatus(data.get("status", TaskStatus.INACTIVE)),
+            task_type=TaskType(data.get("task_type", TaskType.TASK)),
+            attachments=data.get("attachments", []),
+            submissions=submissions,
+            created_at=parse_date_to_timestamp_ms(data.get("created_at")),
+            updated_at=parse_date_to_timestamp_ms(data.get("updated_at")),
+        )
+
+
+def task_documents(count, submissions_per_task):
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Task {i}",
+            "description": "Solve the exercises of the module",
+            "instructions": "Upload a PDF",
+            "due_date": TIMESTAMP_MS + i,
+            "course_id": f"course{i % 100}",
+            "module_id": f"module{i % 10}",
+            "status": "open",
+            "task_type": "task",
+            "attachments": [],
+            "submissions": {
+                f"student{j}": {
+                    "attachments": [{"url": f"https://storage/{i}/{j}.pdf"}],
+                    "feedbacks": {
+                        "teacher1": {
+                            "corrector_id": "teacher1",
+                            "grade": 8,
+                            "comment": "Good",
+                            "created_at": TIMESTAMP_MS,
+                        }
+                    },
+                    "on_time": True,
+                }
+                for j in range(submissions_per_task)
+            },
+            "created_at": TIMESTAMP_MS,
+            "updated_at": TIMESTAMP_MS,
+        }
+        for i in range(count)
+    ]
+
+
+def held_memory(model, documents):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [model.from_dict(document) for document in documents]
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del tasks
+    return held
+
+
+def measure(model, documents, repeat):
+    # (from_dict ms, to_dict ms, memory MiB) of the model
+    tasks = [model.from_dict(document) for document in documents]
+    from_dict = min(
+        timeit.repeat(
+            lambda: [model.from_dict(document) for document in documents],
+            number=1,
+            repeat=repeat,
+        )
+    )
+    to_dict = min(
+        timeit.repeat(lambda: [task.to_dict() for task in tasks], number=1, repeat=repeat)
+    )
+    return from_dict * 1000, to_dict * 1000, held_memory(model, documents) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--submissions", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = task_documents(args.tasks, args.submissions)
+
+    assert DictTask.from_dict(documents[0]).to_dict() == Task.from_dict(documents[0]).to_dict()
+
+    before = measure(DictTask, documents, args.repeat)
+    after = measure(Task, documents, args.repeat)
+
+    print(
+        f"{args.tasks} tasks, {args.submissions} submissions each, best of {args.repeat}\n"
+    )
+    print(f"{'':10} {'before':>7}    {'slots':>7}")
+    for name, unit, old, new in zip(
+        ("from_dict", "to_dict", "memory"), ("ms", "ms", "MiB"), before, after
+    ):
+        print(f"{name:10} {old:7.1f} {unit:<3}{new:7.1f} {unit:<3} ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
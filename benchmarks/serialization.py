@@ -0,0 +1,104 @@
+"""
+Serialization cost of a 1k courses response, before and after the JSON provider:
+
+  - before: Course.from_dict(doc).to_dict() for every document, then Flask's json encoder
+  - after:  the documents as read (course_response_from_dict), encoded by OrjsonProvider
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/serialization.py [--courses 1000] [--repeat 20]
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import MongoJSONProvider, OrjsonProvider, orjson
+from models.course import Course, course_response_from_dict
+
+
+def course_documents(count):
+    start = datetime(2025, 3, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Course {i}",
+            "description": "Algebra, geometry and a bit of calculus " * 3,
+            "max_students": 30,
+            "course_start_date": "2025-03-01",
+            "course_end_date": "2025-07-01",
+            "enroll_date_start": start + timedelta(minutes=i),
+            "enroll_date_end": None,
+            "creator_id": f"teacher{i % 50}",
+            "creator_name": "Alice",
+            "students": [f"student{j}" for j in range(25)],
+            "modules": [],
+            "assistants": [f"assistant{i % 7}"],
+            "correlatives_required_id": [],
+            "background": "https://images.unsplash.com/photo-1517694712202-14dd9538aa97",
+            "status": "open",
+            "version": 3,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(label, provider_class, convert, documents, repeat):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+
+    def run():
+        return app.json.response([convert(document) for document in documents])
+
+    with app.app_context():
+        size = len(run().get_data())
+        best = min(timeit.repeat(run, number=1, repeat=repeat))
+
+    print(f"{label:<42} {best * 1000:8.2f} ms   {size / 1024:8.1f} KiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = course_documents(args.courses)
+    print(f"{args.courses} courses, best of {args.repeat}\n")
+
+    before = measure(
+        "Course.from_dict().to_dict() + json",
+        DefaultJSONProvider,
+        lambda document: Course.from_dict(document).to_dict(),
+        documents,
+        args.repeat,
+    )
+    measure(
+        "course_response_from_dict + json",
+        MongoJSONProvider,
+        course_response_from_dict,
+        documents,
+        args.repeat,
+    )
+
+    if orjson is None:
+        print("\norjson is not installed, the app falls back to the json encoder")
+        return
+
+    after = measure(
+        "course_response_from_dict + orjson",
+        OrjsonProvider,
+        course_response_from_dict,
+        documents,
+        args.repeat,
+    )
+    print(f"\n{before / after:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
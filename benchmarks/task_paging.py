@@ -0,0 +1,120 @@
+"""
+Latency of the student task feed (get_student_tasks_by_course_ids) by page depth, on
+100k tasks:
+
+  - skip:   ?page=N, the server walks over the (N - 1) * limit previous tasks
+  - cursor: ?cursor=..., the page starts right after the last task seen
+
+Needs a MongoDB. The tasks are written to a scratch database that is dropped at the end:
+
+    MONGO_URI=mongodb://localhost:27017 PYTHONPATH=src \\
+        python benchmarks/task_paging.py [--tasks 100000] [--courses 20] [--limit 20]
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+
+from pymongo import MongoClient
+
+from repository.indexes import reconcile_indexes
+from repository.tasks_repository import TasksRepository, next_task_cursor
+
+DEPTHS = (1, 10, 100, 1000, 4000)
+STUDENT_ID = "student1"
+
+
+def seed_tasks(collection, tasks, courses):
+    start = 1_750_000_000_000
+    documents = [
+        {
+            "title": f"Task {i}",
+            "course_id": f"course{i % courses}",
+            "module_id": "module",
+            "status": random.choice(("open", "closed")),
+            # Few distinct due dates, so the _id tiebreak is exercised
+            "due_date": start + random.randrange(500) * 3_600_000,
+            "submissions": {},
+        }
+        for i in range(tasks)
+    ]
+    for i in range(0, len(documents), 10_000):
+        collection.insert_many(documents[i : i + 10_000], ordered=False)
+
+
+def best_ms(call, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def cursors_by_page(repository, course_ids, limit, last_page):
+    # The cursor a client holds when asking for each page, collected by walking the feed
+    cursors = {1: ""}
+    cursor = ""
+    for page in range(2, last_page + 1):
+        tasks = repository.get_student_tasks_by_course_ids(
+            course_ids, STUDENT_ID, limit=limit, cursor=cursor
+        )
+        cursor = next_task_cursor(tasks, limit)
+        if cursor is None:
+            break
+        cursors[page] = cursor
+    return cursors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("benchmark")
+    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    database = client["benchmark_task_paging"]
+    client.drop_database(database.name)
+
+    try:
+        repository = TasksRepository(database["tasks"], logger)
+        reconcile_indexes([repository], logger)
+        seed_tasks(repository.collection, args.tasks, args.courses)
+
+        # A student enrolled in half of the courses
+        course_ids = [f"course{i}" for i in range(0, args.courses, 2)]
+        depths = [
+            page for page in DEPTHS if (page - 1) * args.limit < args.tasks // 2
+        ]
+        cursors = cursors_by_page(repository, course_ids, args.limit, max(depths))
+
+        print(
+            f"{args.tasks} tasks, {len(course_ids)} courses, {args.limit} per page, "
+            f"best of {args.repeat}\n"
+        )
+        print(f"{'page':>6} {'skip':>10} {'cursor':>10}")
+        for page in depths:
+            skip_ms = best_ms(
+                lambda: repository.get_student_tasks_by_course_ids(
+                    course_ids, STUDENT_ID, page=page, limit=args.limit
+                ),
+                args.repeat,
+            )
+            cursor_ms = best_ms(
+                lambda: repository.get_student_tasks_by_course_ids(
+                    course_ids, STUDENT_ID, limit=args.limit, cursor=cursors[page]
+                ),
+                args.repeat,
+            )
+            print(f"{page:>6} {skip_ms:>8.2f}ms {cursor_ms:>8.2f}ms")
+    finally:
+        client.drop_database(database.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from flasgger import Swagger
+from compression import init_compression
+from json_provider import init_json_provider
 
 # Importing the blueprints..
 from endpoints.courses import courses_bp
@@ -11,13 +13,20 @@ from endpoints.user_endpoints import courses_enrollment_bp, users_approvation_bp
 from endpoints.favourite_courses import courses_favourites
 from endpoints.assistants import courses_assistants
 from endpoints.feedbacks import feedbacks_bp
+from services import cache_invalidation_backend, caches
 
 
 # Lets start the courses app by default on /courses
 courses_app = Flask(__name__)
 
+# orjson, and ObjectId / datetime / enums encoded without converting the documents first
+init_json_provider(courses_app)
+
 CORS(courses_app, origins=["*"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
+# gzip / brotli for the large JSON responses, see compression.py for the settings
+init_compression(courses_app)
+
 # Session config
 courses_app.secret_key = os.getenv("SECRET_KEY_SESSION")
 
@@ -48,6 +57,16 @@ def health_check():
     return {"status": "ok"}, 200
 
 
+@courses_app.get("/courses/health/cache")
+def cache_stats():
+    # Hits and misses of each cache, to size <NAME>_CACHE_MAX_ENTRIES
+    stats = {
+        name: {"enabled": True, **cache.stats()} if cache else {"enabled": False}
+        for name, cache in caches.items()
+    }
+    return {"invalidation_backend": cache_invalidation_backend, **stats}, 200
+
+
 courses_app.register_blueprint(courses_bp)
 courses_app.register_blueprint(modules_bp)
 courses_app.register_blueprint(courses_enrollment_bp)
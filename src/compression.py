@@ -0,0 +1,109 @@
+"""
+Negotiated compression of the responses. Bodies of at least COMPRESSION_MIN_BYTES
+are compressed with brotli or gzip, whichever the client accepts (brotli first).
+Streamed responses are left as they are, compressing them would mean buffering them.
+
+    COMPRESSION_ENABLED      true
+    COMPRESSION_MIN_BYTES    1024
+    COMPRESSION_GZIP_LEVEL   6   (1-9)
+    COMPRESSION_BROTLI_LEVEL 4   (0-11, higher levels are too slow for responses)
+
+brotli is optional, without it only gzip is offered.
+"""
+
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_DEFAULT_MIN_BYTES = 1024
+COMPRESSION_DEFAULT_GZIP_LEVEL = 6
+COMPRESSION_DEFAULT_BROTLI_LEVEL = 4
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (
+        mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+
+class ResponseCompressor:
+    def __init__(
+        self,
+        min_bytes=COMPRESSION_DEFAULT_MIN_BYTES,
+        gzip_level=COMPRESSION_DEFAULT_GZIP_LEVEL,
+        brotli_level=COMPRESSION_DEFAULT_BROTLI_LEVEL,
+    ):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+        self.encodings = (["br"] if brotli else []) + ["gzip"]
+
+    def compress(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_level)
+        # mtime=0 so the same body always compresses to the same bytes
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def after_request(self, response):
+        if not is_compressible(response.mimetype) or response.status_code in (204, 304):
+            return response
+
+        # The body depends on Accept-Encoding even when this one isn't compressed
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.status_code < 200
+            or response.status_code == 206
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_bytes:
+            return response
+
+        response.set_data(self.compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def compressor_from_env():
+    return ResponseCompressor(
+        min_bytes=int(
+            os.getenv("COMPRESSION_MIN_BYTES", COMPRESSION_DEFAULT_MIN_BYTES)
+        ),
+        gzip_level=int(
+            os.getenv("COMPRESSION_GZIP_LEVEL", COMPRESSION_DEFAULT_GZIP_LEVEL)
+        ),
+        brotli_level=int(
+            os.getenv("COMPRESSION_BROTLI_LEVEL", COMPRESSION_DEFAULT_BROTLI_LEVEL)
+        ),
+    )
+
+
+def init_compression(app):
+    if os.getenv("COMPRESSION_ENABLED", "true").lower() != "true":
+        return None
+
+    compressor = compressor_from_env()
+    app.after_request(compressor.after_request)
+    return compressor
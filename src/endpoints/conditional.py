@@ -0,0 +1,54 @@
+"""
+Conditional GETs. The ETag and Last-Modified of a response come from the version of
+the documents it is built from (see repository.versioning), so a client that already
+has the current one gets a 304 without the documents being read or serialized.
+"""
+
+from datetime import timezone
+from flask import make_response, request
+
+
+def version_etag(version):
+    return str(version["version"])
+
+
+def last_modified(version):
+    # Mongo returns naive UTC dates, the request ones are aware
+    updated_at = version["updated_at"]
+    if updated_at and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at
+
+
+def conditional_response(version, load):
+    """
+    version is the {"version", "updated_at"} of the documents (None if unknown) and load
+    the call that builds the service result. load is only called when the client's copy is stale.
+    """
+    if version:
+        etag = version_etag(version)
+        updated_at = last_modified(version)
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            # If-None-Match takes precedence, If-Modified-Since is only looked at without it
+            not_modified = bool(
+                updated_at
+                and request.if_modified_since
+                and updated_at.replace(microsecond=0) <= request.if_modified_since
+            )
+
+        if not_modified:
+            response = make_response("", 304)
+            response.set_etag(etag, weak=True)
+            return response
+
+    result = load()
+    response = make_response(result["response"], result["code_status"])
+
+    if version and result["code_status"] == 200:
+        response.set_etag(version_etag(version), weak=True)
+        response.last_modified = last_modified(version)
+
+    return response
@@ -1,8 +1,14 @@
+import json
+
 from flask import Blueprint, request, jsonify
 
+from endpoints.conditional import conditional_response
+from endpoints.streaming import stream_batch_size, stream_format, stream_response
 from error.error import error_generator
-from headers import MISSING_FIELDS
+from headers import INVALID_CURSOR, MISSING_FIELDS
 from services import service_courses, logger
+from services.course_service import InvalidCourseError
+from utils import InvalidCursorError, next_page_cursor
 
 
 courses_bp = Blueprint("courses_actions", __name__, url_prefix="/courses")
@@ -23,6 +29,44 @@ def create_course():
     return result["response"], result["code_status"]
 
 
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/jsonl")
+
+
+def ndjson_courses(stream):
+    # One course per line, read as it arrives, so big imports are never fully in memory
+    for number, line in enumerate(iter(stream.readline, b""), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidCourseError(f"Line {number} is not valid JSON: {e}")
+
+
+@courses_bp.post("/bulk")
+def create_courses():
+    """
+    Create many courses at once, from a JSON array or from NDJSON (one course per line).
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        courses = ndjson_courses(request.stream)
+    else:
+        courses = request.get_json(silent=True)
+        if not isinstance(courses, list):
+            error = error_generator(
+                MISSING_FIELDS,
+                "A JSON array or NDJSON of courses is required",
+                400,
+                "bulk",
+            )
+            return error["response"], error["code_status"]
+
+    result = service_courses.create_courses(courses)
+
+    return result["response"], result["code_status"]
+
+
 # This method is for editing a course
 @courses_bp.put("/<string:course_id>")
 def update_course(course_id=None):
@@ -85,7 +129,7 @@ def delete_course(course_id=None):
 @courses_bp.get("/<string:course_id>")
 def get_course(course_id=None):
     """
-    Get a course by ID.
+    Get a course by ID. Supports If-None-Match and If-Modified-Since.
     """
 
     if not course_id:
@@ -95,10 +139,11 @@ def get_course(course_id=None):
         return error["response"], error["code_status"]
 
     logger.debug(f"[APP] Getting course with ID: {course_id}")
-    # Call the service to get the course
-    result = service_courses.get_course(course_id)
-
-    return result["response"], result["code_status"]
+    # Answered with a 304 when the client has the current version
+    return conditional_response(
+        service_courses.get_course_version(course_id),
+        lambda: service_courses.get_course(course_id),
+    )
 
 
 # This allow us to search a course by /courses/search?q=<string>
@@ -120,9 +165,16 @@ def search_course():
         )
         return error["response"], error["code_status"]
 
+    offset = request.args.get("offset", default=0, type=int)
+    max_per_page = request.args.get("max_per_page", default=None, type=int)
+    # Sending cursor (empty for the first page) switches to {"data", "next_cursor"} responses
+    cursor = request.args.get("cursor", default=None)
+
     logger.debug(f"[APP] Searching for course with query: {query_string}")
     # Call the service to search for the course, removing the quotes
-    result = service_courses.search_course_by_query(query_string.replace('"', ""))
+    result = service_courses.search_course_by_query(
+        query_string.replace('"', ""), offset, max_per_page, cursor
+    )
 
     return result["response"], result["code_status"]
 
@@ -130,15 +182,33 @@ def search_course():
 @courses_bp.get("/")
 def get_courses():
     """
-    Get all courses.
+    Get all courses. Can be streamed, see endpoints.streaming.
     """
     logger.debug(f"[APP] Getting all courses")
+
+    stream = stream_format()
+    if stream:
+        result = service_courses.get_all_courses(
+            stream=True, batch_size=stream_batch_size()
+        )
+        return stream_response(result, stream, logger)
     # Call the service to get all courses
     result = service_courses.get_all_courses()
 
     return result["response"], result["code_status"]
 
 
+@courses_bp.get("/facets")
+def get_catalog_facets():
+    """
+    Course counts for the catalog filters, read from the precomputed summary.
+    """
+    logger.debug(f"[APP] Getting catalog facets")
+    result = service_courses.get_catalog_facets()
+
+    return result["response"], result["code_status"]
+
+
 # This methods is for listing the courses with pagination (we gave access to front to the offset)
 # This endpoint will be called as example
 # /courses/paginated?offset=0&max_per_page=5
@@ -151,12 +221,14 @@ def get_paginated_courses():
     # By default offset is 0, and max_per_page is 10
     offset = request.args.get("offset", default=0, type=int)
     max_per_page = request.args.get("max_per_page", default=10, type=int)
+    # Sending cursor (empty for the first page) switches to {"data", "next_cursor"} responses
+    cursor = request.args.get("cursor", default=None)
 
     logger.debug(
         f"[APP] Getting all courses with offset: {offset} and max_per_page: {max_per_page}"
     )
     # Call the service to get all courses
-    result = service_courses.get_paginated_courses(offset, max_per_page)
+    result = service_courses.get_paginated_courses(offset, max_per_page, cursor)
 
     return result["response"], result["code_status"]
 
@@ -169,6 +241,7 @@ def get_courses_owned_by_user(user_id=None):
 
     offset = request.args.get("offset", default=0, type=int)
     max_per_page = request.args.get("max_per_page", default=10, type=int)
+    cursor = request.args.get("cursor", default=None)
 
     if not user_id:
         error = error_generator(
@@ -185,9 +258,26 @@ def get_courses_owned_by_user(user_id=None):
     # Call the service to get all courses
     try:
         courses = service_courses.get_courses_owned_by_user(
-            user_id, offset, max_per_page
+            user_id, offset, max_per_page, cursor
+        )
+
+        if cursor is None:
+            return jsonify(courses), 200
+
+        return (
+            jsonify(
+                {
+                    "data": courses,
+                    "next_cursor": next_page_cursor(courses, max_per_page),
+                }
+            ),
+            200,
         )
-        return jsonify([c.to_dict() for c in courses]), 200
+    except InvalidCursorError as e:
+        error = error_generator(
+            INVALID_CURSOR, str(e), 400, "/courses_owned/<string:user_id>"
+        )
+        return error["response"], error["code_status"]
     except Exception as e:
         error = error_generator(
             "[COURSES][CONTROLLER] Error", e, 500, "/courses_owned/<string:user_id>"
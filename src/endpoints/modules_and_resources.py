@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from services import service_modules, logger
+from endpoints.conditional import conditional_response
 from error.error import error_generator
 from headers import MISSING_FIELDS
 
@@ -21,10 +22,10 @@ def get_modules_from_course(course_id=None):
 
     logger.debug(f"[APP] Getting modules from course with ID: {course_id}")
 
-    # Call the service to get the modules
-    result = service_modules.get_modules_from_course(course_id)
-
-    return result["response"], result["code_status"]
+    return conditional_response(
+        service_modules.get_modules_version(course_id),
+        lambda: service_modules.get_modules_from_course(course_id),
+    )
 
 
 @modules_bp.get("/<string:course_id>/modules/<string:module_id>")
@@ -49,10 +50,10 @@ def get_module_from_course(course_id=None, module_id=None):
         f"[APP] Getting module with ID: {module_id} from course with ID: {course_id}"
     )
 
-    # Call the service to get the module
-    result = service_modules.get_module_from_course(course_id, module_id)
-
-    return result["response"], result["code_status"]
+    return conditional_response(
+        service_modules.get_modules_version(course_id),
+        lambda: service_modules.get_module_from_course(course_id, module_id),
+    )
 
 
 # This method is for adding a module to a course
@@ -206,10 +207,10 @@ def get_resources_from_module(course_id=None, module_id=None):
         f"[APP] Getting resources from module with ID: {module_id} in course with ID: {course_id}"
     )
 
-    # Call the service to get the resources
-    result = service_modules.get_resources_from_module(course_id, module_id)
-
-    return result["response"], result["code_status"]
+    return conditional_response(
+        service_modules.get_modules_version(course_id),
+        lambda: service_modules.get_resources_from_module(course_id, module_id),
+    )
 
 
 @resources_bp.get(
@@ -242,10 +243,12 @@ def get_resource_from_module(course_id=None, module_id=None, resource_id=None):
         f"[APP] Getting resource with ID: {resource_id} in module with ID: {module_id} in course with ID: {course_id}"
     )
 
-    # Call the service to get the resource
-    result = service_modules.get_resource_from_module(course_id, module_id, resource_id)
-
-    return result["response"], result["code_status"]
+    return conditional_response(
+        service_modules.get_modules_version(course_id),
+        lambda: service_modules.get_resource_from_module(
+            course_id, module_id, resource_id
+        ),
+    )
 
 
 @resources_bp.post("/<string:course_id>/modules/<string:module_id>/resources")
@@ -0,0 +1,79 @@
+"""
+Streamed list responses. The list endpoints that can return every document of a
+collection send it as it is read from the database instead of building the whole
+list first, when the client asks for it:
+
+    Accept: application/x-ndjson   or ?stream=ndjson   one JSON document per line
+    ?stream=json                                       the usual JSON array, chunked
+
+?batch_size= sets the documents read per round trip. Without any of those the
+endpoints answer as always.
+"""
+
+from itertools import islice
+from flask import Response, current_app, request
+
+from utils import STREAM_DEFAULT_BATCH_SIZE, STREAM_MAX_BATCH_SIZE
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Documents encoded per chunk written to the client
+STREAM_CHUNK_ITEMS = 100
+
+
+def stream_format():
+    # "ndjson", "json" or None when the client didn't ask for a stream
+    stream = request.args.get("stream", "").lower()
+    if stream == "ndjson" or request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return "ndjson"
+    if stream in ("json", "true"):
+        return "json"
+    return None
+
+
+def stream_batch_size():
+    batch_size = request.args.get(
+        "batch_size", default=STREAM_DEFAULT_BATCH_SIZE, type=int
+    )
+    return min(max(batch_size, 1), STREAM_MAX_BATCH_SIZE)
+
+
+def chunks(items):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, STREAM_CHUNK_ITEMS)):
+        yield chunk
+
+
+def json_array(items, dumps):
+    yield "["
+    separator = ""
+    for chunk in chunks(items):
+        yield separator + ",".join(dumps(item) for item in chunk)
+        separator = ","
+    yield "]\n"
+
+
+def ndjson_lines(items, dumps):
+    for chunk in chunks(items):
+        yield "".join(dumps(item) + "\n" for item in chunk)
+
+
+def stream_response(result, stream, logger):
+    """
+    The service result as a streamed response, errors are returned as usual. The status is
+    sent before the documents, so an error while streaming can only cut the body short.
+    """
+    if result["code_status"] != 200:
+        return result["response"], result["code_status"]
+
+    dumps = current_app.json.dumps
+    encode = ndjson_lines if stream == "ndjson" else json_array
+
+    def generate():
+        try:
+            yield from encode(result["response"], dumps)
+        except Exception as e:
+            logger.error(f"[APP] Streamed response interrupted: {e}")
+
+    mimetype = NDJSON_MIMETYPE if stream == "ndjson" else "application/json"
+    return Response(generate(), mimetype=mimetype)
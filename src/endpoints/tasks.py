@@ -4,12 +4,43 @@ from werkzeug.exceptions import BadRequest
 from flasgger import swag_from
 
 from error.error import error_generator
-from headers import MISSING_FIELDS
+from headers import INVALID_CURSOR, MISSING_FIELDS
+from endpoints.streaming import stream_batch_size, stream_format, stream_response
 from services import service_tasks, logger
-from utils import parse_date_to_timestamp_ms
+from utils import (
+    InvalidCursorError,
+    parse_date_to_timestamp_ms,
+    parse_dates_to_timestamp_ms,
+)
 
 tasks_bp = Blueprint("tasks", __name__, url_prefix="/courses/tasks")
 
+TASK_FEED_CURSOR_PARAMETER = {
+    "name": "cursor",
+    "in": "query",
+    "type": "string",
+    "description": (
+        "Opaque cursor from a previous next_cursor, empty for the first page. With it "
+        'page is ignored and the response is {"data": [...], "next_cursor": "..."}.'
+    ),
+}
+
+
+def task_feed_response(tasks):
+    # The service returns a page dict when a cursor was sent (see services.task_service.task_feed_page)
+    if isinstance(tasks, dict):
+        return (
+            jsonify(
+                {
+                    "data": [t.to_dict() for t in tasks["data"]],
+                    "next_cursor": tasks["next_cursor"],
+                }
+            ),
+            200,
+        )
+
+    return jsonify([t.to_dict() for t in tasks]), 200
+
 
 @tasks_bp.post("/")
 @swag_from(
@@ -222,6 +253,15 @@ def delete_task(task_id=None):
             {"name": "course_id", "in": "path", "type": "string", "required": True},
             {"name": "status", "in": "query", "type": "string", "required": False},
             {"name": "module_id", "in": "query", "type": "string", "required": False},
+            {
+                "name": "stream",
+                "in": "query",
+                "type": "string",
+                "enum": ["json", "ndjson"],
+                "required": False,
+                "description": "Stream the tasks as a chunked JSON array or NDJSON",
+            },
+            {"name": "batch_size", "in": "query", "type": "integer", "required": False},
         ],
         "responses": {
             200: {"description": "Tasks retrieved successfully"},
@@ -251,6 +291,13 @@ def get_tasks_by_course(course_id=None):
         f"[TASKS][CONTROLLER] Getting tasks for course {course_id} with status filter: {status}. And module_id filter: {module_id}"
     )
 
+    stream = stream_format()
+    if stream:
+        result = service_tasks.get_tasks_by_course(
+            course_id, status, module_id, stream=True, batch_size=stream_batch_size()
+        )
+        return stream_response(result, stream, logger)
+
     result = service_tasks.get_tasks_by_course(course_id, status, module_id)
     return result["response"], result["code_status"]
 
@@ -441,9 +488,10 @@ def upload_task():
             {"name": "date", "in": "query", "type": "string"},
             {"name": "page", "in": "query", "type": "integer"},
             {"name": "limit", "in": "query", "type": "integer"},
+            TASK_FEED_CURSOR_PARAMETER,
         ],
         "responses": {
-            200: {"description": "Tasks retrieved successfully"},
+            200: {"description": "Tasks of the courses the teacher created or assists, by due date"},
             400: {"description": "Invalid parameters"},
             500: {"description": "Internal server error"},
         },
@@ -468,8 +516,7 @@ def get_tasks_by_teacher(teacher_id):
 
         if start_date is not None and end_date is not None:
             logger.debug("Parsing start_date and end_date")
-            start_date = parse_date_to_timestamp_ms(start_date)
-            end_date = parse_date_to_timestamp_ms(end_date)
+            start_date, end_date = parse_dates_to_timestamp_ms([start_date, end_date])
         else:
             start_date = None
             end_date = None
@@ -482,9 +529,14 @@ def get_tasks_by_teacher(teacher_id):
             end_date=end_date,
             page=page,
             limit=limit,
+            cursor=request.args.get("cursor"),
         )
 
-        return jsonify([t.to_dict() for t in tasks]), 200
+        return task_feed_response(tasks)
+
+    except InvalidCursorError as e:
+        error = error_generator(INVALID_CURSOR, str(e), 400, "tasks")
+        return error["response"], error["code_status"]
 
     except ValueError as e:
         error = error_generator(
@@ -509,14 +561,23 @@ def get_tasks_by_teacher(teacher_id):
         "summary": "Get tasks for a student",
         "parameters": [
             {"name": "student_id", "in": "path", "type": "string", "required": True},
-            {"name": "status", "in": "query", "type": "string"},
+            {
+                "name": "status",
+                "in": "query",
+                "type": "string",
+                "description": (
+                    "pending, overdue or completed filter by the status of the task for "
+                    "the student, any other value by the status of the task itself"
+                ),
+            },
             {"name": "course_id", "in": "query", "type": "string"},
             {"name": "date", "in": "query", "type": "string"},
             {"name": "page", "in": "query", "type": "integer"},
             {"name": "limit", "in": "query", "type": "integer"},
+            TASK_FEED_CURSOR_PARAMETER,
         ],
         "responses": {
-            200: {"description": "Tasks retrieved successfully"},
+            200: {"description": "Tasks of the courses the student is enrolled in, by due date"},
             400: {"description": "Invalid parameters"},
             500: {"description": "Internal server error"},
         },
@@ -542,8 +603,7 @@ def get_tasks_for_student(student_id):
 
         if start_date is not None and end_date is not None:
             logger.debug("Parsing start_date and end_date")
-            start_date = parse_date_to_timestamp_ms(start_date)
-            end_date = parse_date_to_timestamp_ms(end_date)
+            start_date, end_date = parse_dates_to_timestamp_ms([start_date, end_date])
         else:
             start_date = None
             end_date = None
@@ -557,9 +617,14 @@ def get_tasks_for_student(student_id):
             end_date=end_date,
             page=page,
             limit=limit,
+            cursor=request.args.get("cursor"),
         )
 
-        return jsonify([t.to_dict() for t in tasks]), 200
+        return task_feed_response(tasks)
+
+    except InvalidCursorError as e:
+        error = error_generator(INVALID_CURSOR, str(e), 400, "tasks")
+        return error["response"], error["code_status"]
 
     except ValueError as e:
         error = error_generator(
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 
+from endpoints.streaming import stream_batch_size, stream_format, stream_response
 from error.error import error_generator
 from headers import MISSING_FIELDS
 from services import service_users, service_enrollment, logger
@@ -50,6 +51,14 @@ def get_enrolled_courses(student_id=None):
         return error["response"], error["code_status"]
 
     logger.debug(f"[APP] Getting all courses for student with ID: {student_id}")
+
+    stream = stream_format()
+    if stream:
+        result = service_enrollment.get_enrolled_courses(
+            student_id, stream=True, batch_size=stream_batch_size()
+        )
+        return stream_response(result, stream, logger)
+
     # Call the service to get all courses
     result = service_enrollment.get_enrolled_courses(student_id)
 
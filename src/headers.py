@@ -1,5 +1,10 @@
 MISSING_FIELDS = "Missing required field(s)"
 COURSE_CREATED = "Course created successfully"
+COURSES_IMPORTED = "Courses imported"
+COURSES_PARTIALLY_IMPORTED = "Some courses couldn't be imported"
+COURSES_NOT_IMPORTED = "No course could be imported"
+COURSE_NOT_IMPORTED = "Course couldn't be imported"
+INVALID_COURSE = "Invalid course"
 MODULE_CREATED = "Module created successfully"
 MODULE_MODIFIED = "Module modified successfully"
 MODULE_REMOVED = "Module removed successfully"
@@ -13,6 +18,7 @@ INTERNAL_SERVER_ERROR = "Internal Server Error"
 FEEDBACK_CREATED = "Feedback created successfully"
 USER_NOT_ALLOWED_TO_CREATE_FEEDBACK = "User not allowed to create feedback"
 USER_ENROLLED = "User enrolled successfully"
+ENROLLMENT_CONFLICT = "Course changed while enrolling"
 USER_NOT_ENROLLED_INTO_THE_COURSE = "User not enrolled into the course"
 USER_HAS_NOT_ENOUGH_CORRELATIVES_APPROVED_TO_ENROLL = (
     "User has not enough correlatives approved to enroll"
@@ -34,3 +40,5 @@ NO_SIGNATURES_APPROVED_FOUND = "No signatures approved found"
 MODULE_NOT_FOUND_IN_COURSE = "Module not found in course"
 COURSE_ALREADY_APPROVED = "Course already approved"
 COURSE_NOT_IN_FAVORITES = "Course not in favourites"
+SEARCH_TIMEOUT = "Search took too long"
+INVALID_CURSOR = "Invalid pagination cursor"
@@ -0,0 +1,105 @@
+"""
+JSON provider of the app. Encodes with orjson, and knows the types of the Mongo
+documents, so the services can return them as read instead of converting them to
+JSON-safe dicts first:
+
+  - ObjectId as its hex string
+  - datetime and date as HTTP dates, the same format Flask's default provider uses
+  - enums by their value
+
+Without orjson installed it falls back to Flask's encoder with the same conversions.
+"""
+
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, timezone
+from enum import Enum
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def http_date(value):
+    """
+    Same output as werkzeug.http.http_date (naive datetimes are UTC), about twice as
+    fast, which shows on lists with a date per document.
+    """
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+
+    return (
+        f"{WEEKDAYS[value.weekday()]}, {value.day:02d} {MONTHS[value.month - 1]} "
+        f"{value.year:04d} {value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT"
+    )
+
+
+def json_default(value):
+    # Called for every value the encoder can't handle itself
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return http_date(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    Fallback when orjson isn't installed: the stdlib encoder with json_default.
+    """
+
+    default = staticmethod(json_default)
+
+
+class OrjsonProvider(MongoJSONProvider):
+    def _dumps(self, obj, sort_keys, indent):
+        # Datetimes go through json_default so they keep the HTTP date format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(
+            obj, kwargs.get("sort_keys", self.sort_keys), kwargs.get("indent")
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # orjson already returns bytes, no need to go through a str
+        return self._app.response_class(
+            self._dumps(obj, self.sort_keys, indent) + b"\n",
+            mimetype=self.mimetype,
+        )
+
+
+def init_json_provider(app):
+    provider_class = OrjsonProvider if orjson else MongoJSONProvider
+    app.json = provider_class(app)
+    return app.json
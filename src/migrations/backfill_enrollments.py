@@ -0,0 +1,97 @@
+"""
+Copy the embedded course students arrays into the enrollments collection.
+
+Switching a deployment to the enrollments collection without downtime:
+  1. Deploy with ENROLLMENTS_READ_FROM_COLLECTION unset. Every enrollment is now
+     written to both the course and the enrollments collection (dual write).
+  2. Run this backfill (python -m migrations.backfill_enrollments, with PYTHONPATH=src).
+     It is idempotent, so it can be run again if it is interrupted.
+  3. Set ENROLLMENTS_READ_FROM_COLLECTION=true and restart. The collection is now the
+     only store of the enrollments: reads use it, its unique index keeps a student from
+     enrolling twice and the course students arrays are no longer written.
+  4. Run migrations.drop_course_students, which removes the arrays.
+
+A student removed from a course after the cursor read it had their enrollment deleted
+before the backfill re-created it. So every course that got new enrollments is read
+again after the write, and the enrollments of the students it no longer lists are
+removed. A removal that lands after that read deletes the enrollment itself.
+"""
+
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+from repository.enrollments_repository import EnrollmentsRepository
+from repository.indexes import reconcile_indexes
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def remove_departed_students(
+    collection_courses, enrollment_repository, course_id, student_ids
+):
+    # Re-verification of a course after its enrollments were written, see above
+    course = collection_courses.find_one({"_id": course_id}, {"students": 1})
+    enrolled = set((course or {}).get("students") or [])
+    departed = [
+        student_id for student_id in student_ids if student_id not in enrolled
+    ]
+    if not departed:
+        return 0
+
+    return enrollment_repository.remove_enrollments(str(course_id), departed)
+
+
+def backfill_enrollments(
+    collection_courses, enrollment_repository, logger, batch_size=BACKFILL_BATCH_SIZE
+):
+    """
+    Walk the courses with students by _id and upsert one enrollment per student.
+    Returns (courses_processed, enrollments_created).
+    """
+    courses_processed = 0
+    enrollments_created = 0
+
+    cursor = (
+        collection_courses.find({"students.0": {"$exists": True}}, {"students": 1})
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+
+    for course in cursor:
+        student_ids = course.get("students", [])
+        created = enrollment_repository.add_enrollments(str(course["_id"]), student_ids)
+        if created:
+            created -= remove_departed_students(
+                collection_courses, enrollment_repository, course["_id"], student_ids
+            )
+        enrollments_created += created
+        courses_processed += 1
+
+        if courses_processed % batch_size == 0:
+            logger.info(
+                f"[MIGRATION] {courses_processed} courses backfilled, last course {course['_id']}"
+            )
+
+    logger.info(
+        f"[MIGRATION] Backfill done: {courses_processed} courses, {enrollments_created} new enrollments"
+    )
+    return courses_processed, enrollments_created
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    enrollment_repository = EnrollmentsRepository(
+        db[os.getenv("ENROLLMENTS_COLLECTION_NAME", "enrollments")], logger
+    )
+    reconcile_indexes([enrollment_repository], logger)
+
+    backfill_enrollments(
+        db[os.getenv("COURSES_COLLECTION_NAME")], enrollment_repository, logger
+    )
@@ -0,0 +1,87 @@
+"""
+Copy the embedded task submissions maps into the submissions collection.
+
+Switching a deployment to the submissions collection without downtime:
+  1. Deploy with SUBMISSIONS_READ_FROM_COLLECTION unset. Every submission and feedback
+     is now written to both the task and the submissions collection (dual write).
+  2. Run this backfill (python -m migrations.backfill_submissions, with PYTHONPATH=src).
+     It is idempotent, so it can be run again if it is interrupted.
+  3. Set SUBMISSIONS_READ_FROM_COLLECTION=true and restart. The collection is now the
+     only store of the submissions: reads use it and the task maps are no longer written.
+  4. Run migrations.drop_task_submissions, which removes the maps.
+"""
+
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+from repository.indexes import reconcile_indexes
+from repository.submissions_repository import SubmissionsRepository
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_submissions(
+    collection_tasks, submissions_repository, logger, batch_size=BACKFILL_BATCH_SIZE
+):
+    """
+    Walk the tasks with submissions by _id and insert the submissions missing from the
+    collection, batch_size submissions per write. The ones already there are kept, the
+    dual write may have replaced them after the task was read.
+    Returns (tasks_processed, submissions_created).
+    """
+    tasks_processed = 0
+    submissions_created = 0
+    batch = []
+
+    cursor = (
+        collection_tasks.find(
+            {"submissions": {"$exists": True, "$ne": {}}},
+            {"course_id": 1, "submissions": 1},
+        )
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+
+    for task in cursor:
+        for student_id, submission in (task.get("submissions") or {}).items():
+            # The map can hold None entries (see models.task.Task.from_dict)
+            if submission:
+                batch.append(
+                    (task["_id"], task.get("course_id"), student_id, submission)
+                )
+        tasks_processed += 1
+
+        if len(batch) < batch_size:
+            continue
+
+        submissions_created += submissions_repository.save_submissions(batch)
+        logger.info(
+            f"[MIGRATION] {tasks_processed} tasks backfilled, last task {task['_id']}"
+        )
+        batch = []
+
+    submissions_created += submissions_repository.save_submissions(batch)
+
+    logger.info(
+        f"[MIGRATION] Backfill done: {tasks_processed} tasks, {submissions_created} new submissions"
+    )
+    return tasks_processed, submissions_created
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    submissions_repository = SubmissionsRepository(
+        db[os.getenv("SUBMISSIONS_COLLECTION_NAME", "submissions")], logger
+    )
+    reconcile_indexes([submissions_repository], logger)
+
+    backfill_submissions(
+        db[os.getenv("TASKS_COLLECTION_NAME", "tasks")], submissions_repository, logger
+    )
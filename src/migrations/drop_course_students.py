@@ -0,0 +1,73 @@
+"""
+Remove the students array of every course, the last step of moving the enrollments to
+their own collection (see migrations.backfill_enrollments).
+
+Run it once every replica runs with ENROLLMENTS_READ_FROM_COLLECTION=true, as they
+neither read nor write the array anymore (python -m migrations.drop_course_students,
+with PYTHONPATH=src). It is idempotent. A course without enrolled_count gets it from
+the array in the same write, so its count isn't lost with the array.
+"""
+
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+from repository.courses_repository import ENROLLED_COUNT
+
+DROP_BATCH_SIZE = 500
+
+
+def drop_batch(collection_courses, course_ids):
+    result = collection_courses.update_many(
+        {"_id": {"$in": course_ids}, "students": {"$exists": True}},
+        [{"$set": {"enrolled_count": ENROLLED_COUNT}}, {"$unset": "students"}],
+    )
+    return result.modified_count
+
+
+def drop_course_students(collection_courses, logger, batch_size=DROP_BATCH_SIZE):
+    """
+    Walk the courses that still have the array by _id, batch_size at a time.
+    Returns (courses_processed, courses_modified).
+    """
+    courses_processed = 0
+    courses_modified = 0
+    batch = []
+
+    cursor = (
+        collection_courses.find({"students": {"$exists": True}}, {"_id": 1})
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+
+    for course in cursor:
+        batch.append(course["_id"])
+        if len(batch) < batch_size:
+            continue
+
+        courses_modified += drop_batch(collection_courses, batch)
+        courses_processed += len(batch)
+        logger.info(
+            f"[MIGRATION] {courses_processed} courses without students, last course {batch[-1]}"
+        )
+        batch = []
+
+    if batch:
+        courses_modified += drop_batch(collection_courses, batch)
+        courses_processed += len(batch)
+
+    logger.info(
+        f"[MIGRATION] Drop done: {courses_processed} courses, {courses_modified} arrays removed"
+    )
+    return courses_processed, courses_modified
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    drop_course_students(db[os.getenv("COURSES_COLLECTION_NAME")], logger)
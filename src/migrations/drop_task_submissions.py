@@ -0,0 +1,71 @@
+"""
+Remove the submissions map of every task, the last step of moving the submissions to
+their own collection (see migrations.backfill_submissions).
+
+Run it once every replica runs with SUBMISSIONS_READ_FROM_COLLECTION=true, as they
+neither read nor write the map anymore (python -m migrations.drop_task_submissions,
+with PYTHONPATH=src). It is idempotent.
+"""
+
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+
+DROP_BATCH_SIZE = 500
+
+
+def drop_batch(collection_tasks, task_ids):
+    result = collection_tasks.update_many(
+        {"_id": {"$in": task_ids}, "submissions": {"$exists": True}},
+        {"$unset": {"submissions": ""}},
+    )
+    return result.modified_count
+
+
+def drop_task_submissions(collection_tasks, logger, batch_size=DROP_BATCH_SIZE):
+    """
+    Walk the tasks that still have the map by _id, batch_size at a time.
+    Returns (tasks_processed, tasks_modified).
+    """
+    tasks_processed = 0
+    tasks_modified = 0
+    batch = []
+
+    cursor = (
+        collection_tasks.find({"submissions": {"$exists": True}}, {"_id": 1})
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+
+    for task in cursor:
+        batch.append(task["_id"])
+        if len(batch) < batch_size:
+            continue
+
+        tasks_modified += drop_batch(collection_tasks, batch)
+        tasks_processed += len(batch)
+        logger.info(
+            f"[MIGRATION] {tasks_processed} tasks without submissions, last task {batch[-1]}"
+        )
+        batch = []
+
+    if batch:
+        tasks_modified += drop_batch(collection_tasks, batch)
+        tasks_processed += len(batch)
+
+    logger.info(
+        f"[MIGRATION] Drop done: {tasks_processed} tasks, {tasks_modified} maps removed"
+    )
+    return tasks_processed, tasks_modified
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    drop_task_submissions(db[os.getenv("TASKS_COLLECTION_NAME", "tasks")], logger)
@@ -0,0 +1,82 @@
+"""
+Create the indexes declared by the repositories and report the queries that would
+still scan a whole collection:
+
+    PYTHONPATH=src python -m migrations.reconcile_indexes [--report]
+
+The repositories are built straight from the collections, only for their declared
+indexes: importing services would start the whole app (the invalidation bus, the
+catalog facets refresher, the attachment storage).
+"""
+
+import argparse
+import json
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from repository.courses_repository import CoursesRepository
+from repository.enrollments_repository import EnrollmentsRepository
+from repository.feedback_repository import FeedBackRepository
+from repository.indexes import collscan_report, reconcile_indexes
+from repository.module_repository import ModuleRepository
+from repository.submissions_repository import SubmissionsRepository
+from repository.tasks_repository import TasksRepository
+from repository.users_data_repository import UsersDataRepository
+
+
+def declared_repositories(db, logger):
+    # The same collections as services, see services/__init__.py
+    collection_courses = db[os.getenv("COURSES_COLLECTION_NAME")]
+
+    return [
+        UsersDataRepository(
+            db[os.getenv("USERS_COLLECTION_NAME")],
+            db[os.getenv("APPROVED_COURSES_STUDENTS_COLLECTION_NAME")],
+            logger,
+        ),
+        FeedBackRepository(
+            db[os.getenv("FEEDBACK_COURSES_COLLECTION_NAME")],
+            db[os.getenv("FEEDBACK_STUDENTS_COLLECTION_NAME")],
+            logger,
+        ),
+        TasksRepository(db[os.getenv("TASKS_COLLECTION_NAME", "tasks")], logger),
+        SubmissionsRepository(
+            db[os.getenv("SUBMISSIONS_COLLECTION_NAME", "submissions")], logger
+        ),
+        EnrollmentsRepository(
+            db[os.getenv("ENROLLMENTS_COLLECTION_NAME", "enrollments")], logger
+        ),
+        CoursesRepository(collection_courses, None, logger),
+        ModuleRepository(
+            db[os.getenv("MODULES_AND_RESOURCES_COLLECTION_NAME")],
+            collection_courses,
+            logger,
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="explain the declared query shapes and list the collection scans",
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    repositories = declared_repositories(db, logger)
+
+    print(json.dumps(reconcile_indexes(repositories, logger), indent=2))
+
+    if args.report:
+        flagged = collscan_report(repositories, logger)
+        print(json.dumps({"collection_scans": flagged}, indent=2))
+        raise SystemExit(1 if flagged else 0)
@@ -0,0 +1,81 @@
+"""
+Recompute the enrolled_count of every course from its students array.
+
+Run it once after deploying the counter, so the courses written before it get one,
+and again whenever the counts are suspected to have drifted
+(python -m migrations.repair_enrolled_counts, with PYTHONPATH=src). It is idempotent.
+
+Every course is updated with a pipeline update that reads the array and writes the
+count in the same write, so an enrollment that lands meanwhile can't be lost. Only the
+courses whose count is wrong are written. Cached courses keep their count until they
+expire (COURSES_CACHE_TTL_SECONDS). Courses without the array (see
+migrations.drop_course_students) are skipped, the enrollment writes alone move their count.
+"""
+
+import logging
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient
+
+REPAIR_BATCH_SIZE = 500
+
+STUDENTS_SIZE = {"$size": {"$ifNull": ["$students", []]}}
+
+
+def repair_batch(collection_courses, course_ids):
+    result = collection_courses.update_many(
+        {
+            "_id": {"$in": course_ids},
+            "students": {"$exists": True},
+            "$expr": {"$ne": [{"$ifNull": ["$enrolled_count", None]}, STUDENTS_SIZE]},
+        },
+        [{"$set": {"enrolled_count": STUDENTS_SIZE}}],
+    )
+    return result.modified_count
+
+
+def repair_enrolled_counts(collection_courses, logger, batch_size=REPAIR_BATCH_SIZE):
+    """
+    Walk the courses by _id, batch_size at a time. Returns (courses_processed, courses_repaired).
+    """
+    courses_processed = 0
+    courses_repaired = 0
+    batch = []
+
+    cursor = (
+        collection_courses.find({}, {"_id": 1})
+        .sort("_id", ASCENDING)
+        .batch_size(batch_size)
+    )
+
+    for course in cursor:
+        batch.append(course["_id"])
+        if len(batch) < batch_size:
+            continue
+
+        courses_repaired += repair_batch(collection_courses, batch)
+        courses_processed += len(batch)
+        logger.info(
+            f"[MIGRATION] {courses_processed} courses checked, last course {batch[-1]}"
+        )
+        batch = []
+
+    if batch:
+        courses_repaired += repair_batch(collection_courses, batch)
+        courses_processed += len(batch)
+
+    logger.info(
+        f"[MIGRATION] Repair done: {courses_processed} courses, {courses_repaired} counts fixed"
+    )
+    return courses_processed, courses_repaired
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    # services.logger_config would import the services package, which builds the whole app
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger("api-courses-migrations")
+    db = MongoClient(os.getenv("MONGO_URI"))[os.getenv("COURSE_DATABASE")]
+
+    repair_enrolled_counts(db[os.getenv("COURSES_COLLECTION_NAME")], logger)
@@ -15,6 +15,25 @@ class CourseStatus(str, Enum):
 
 
 class Course:
+    __slots__ = (
+        "_id",
+        "name",
+        "description",
+        "max_students",
+        "course_start_date",
+        "course_end_date",
+        "enroll_date_start",
+        "enroll_date_end",
+        "creator_id",
+        "creator_name",
+        "students",
+        "modules",
+        "assistants",
+        "correlatives_required_id",
+        "background",
+        "status",
+    )
+
     def __init__(
         self,
         course_name: str,
@@ -96,3 +115,68 @@ class Course:
             background=data.get("background", DEFAULT_COURSE_BACKGOUND),
             status=CourseStatus(data.get("status", CourseStatus.OPEN)),
         )
+
+
+# Fields returned by the list endpoints. The students, modules and assistants arrays
+# can be large, so they are only returned with the full course (/courses/<id>).
+COURSE_SUMMARY_FIELDS = (
+    "name",
+    "description",
+    "max_students",
+    "course_start_date",
+    "course_end_date",
+    "enroll_date_start",
+    "enroll_date_end",
+    "creator_id",
+    "creator_name",
+    "correlatives_required_id",
+    "background",
+    "status",
+    # Denormalized size of the students array (see CoursesRepository)
+    "enrolled_count",
+)
+
+
+def course_summary_from_dict(data):
+    """
+    Serialize a (projected) course document for list views without building a Course.
+    Defaults match the ones of Course.to_dict.
+    """
+    summary = {field: data.get(field) for field in COURSE_SUMMARY_FIELDS}
+    summary["_id"] = str(data["_id"])
+    summary["correlatives_required_id"] = summary["correlatives_required_id"] or []
+    summary["background"] = summary["background"] or DEFAULT_COURSE_BACKGOUND
+    summary["status"] = summary["status"] or CourseStatus.OPEN.value
+    summary["enrolled_count"] = summary["enrolled_count"] or 0
+    return summary
+
+
+def course_response_from_dict(data):
+    """
+    Serialize a course document for the full course responses without building a Course.
+    Same fields and defaults as Course.to_dict; _id and the dates are left as they are
+    stored, the JSON provider encodes them.
+    """
+    enroll_date_end = data.get("enroll_date_end")
+    if isinstance(enroll_date_end, str):
+        # Courses updated with the date as sent by the client
+        enroll_date_end = datetime.strptime(enroll_date_end, "%Y-%m-%d")
+
+    return {
+        "_id": data["_id"],
+        "name": data.get("name"),
+        "description": data.get("description"),
+        "max_students": data.get("max_students"),
+        "course_start_date": data.get("course_start_date"),
+        "course_end_date": data.get("course_end_date"),
+        "enroll_date_start": data.get("enroll_date_start"),
+        "enroll_date_end": enroll_date_end,
+        "creator_id": data.get("creator_id"),
+        "creator_name": data.get("creator_name"),
+        "students": data.get("students", []),
+        "modules": data.get("modules") or [],
+        "assistants": data.get("assistants") or [],
+        "correlatives_required_id": data.get("correlatives_required_id") or [],
+        "background": data.get("background") or DEFAULT_COURSE_BACKGOUND,
+        "status": data.get("status") or CourseStatus.OPEN.value,
+    }
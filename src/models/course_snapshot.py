@@ -0,0 +1,146 @@
+from datetime import datetime
+from enum import Enum
+
+
+class EnrollmentOutcome(str, Enum):
+    ENROLLED = "enrolled"
+    NOT_FOUND = "not_found"
+    CLOSED = "closed"
+    ALREADY_ENROLLED = "already_enrolled"
+    FULL = "full"
+    MISSING_CORRELATIVES = "missing_correlatives"
+    # The guarded write matched nothing but the course looks enrollable now (concurrent change)
+    CONFLICT = "conflict"
+
+
+class CourseSnapshot:
+    """
+    Read-only view of a course used for the enrollment and ownership checks.
+    It is loaded once per request (see CoursesRepository.get_course_snapshot)
+    and every predicate is answered from memory.
+    """
+
+    __slots__ = (
+        "_id",
+        "creator_id",
+        "assistants",
+        "max_students",
+        "status",
+        "enroll_date_start",
+        "enroll_date_end",
+        "correlatives_required_id",
+        "students_count",
+        "students",
+        "student_id",
+        "student_enrolled",
+    )
+
+    def __init__(
+        self,
+        _id,
+        creator_id: str = None,
+        assistants: list = None,
+        max_students: int = None,
+        status: str = None,
+        enroll_date_start: datetime = None,
+        enroll_date_end: datetime = None,
+        correlatives_required_id: list = None,
+        students_count: int = 0,
+        students: list = None,
+        student_id: str = None,
+        student_enrolled: bool = False,
+    ):
+        self._id = str(_id)
+        self.creator_id = creator_id
+        self.assistants = assistants if assistants else []
+        self.max_students = max_students
+        self.status = status
+        self.enroll_date_start = enroll_date_start
+        self.enroll_date_end = enroll_date_end
+        self.correlatives_required_id = (
+            correlatives_required_id if correlatives_required_id else []
+        )
+        self.students_count = students_count
+        # The full students list is only present when the snapshot was built from a complete document
+        self.students = set(students) if students is not None else None
+        self.student_id = student_id
+        self.student_enrolled = student_enrolled
+
+    def is_owner(self, user_id) -> bool:
+        return self.creator_id == user_id
+
+    def is_open(self) -> bool:
+        # Courses created before the status field existed are considered open
+        return (self.status or "open") == "open"
+
+    def is_inscription_available(self, now: datetime = None) -> bool:
+        # In case enroll_date_end is None, we assume the course is open for enrollment
+        if self.enroll_date_end is None:
+            return True
+
+        now = now if now else datetime.now()
+        return self.enroll_date_start <= now <= self.enroll_date_end
+
+    def is_student_enrolled(self, student_id) -> bool:
+        if self.students is not None:
+            return student_id in self.students
+
+        if student_id != self.student_id:
+            raise ValueError(
+                f"Course snapshot {self._id} was not loaded for student {student_id}"
+            )
+
+        return self.student_enrolled
+
+    def has_place_to_enroll(self) -> bool:
+        return self.students_count < (self.max_students or 0)
+
+    def enrollment_rejection(
+        self, student_id, approved_course_ids=None, now: datetime = None
+    ) -> EnrollmentOutcome:
+        """
+        Explain why an enrollment for student_id would be rejected, following the same
+        order of checks the services always used. Returns CONFLICT if nothing blocks it.
+        """
+        if not self.is_open() or not self.is_inscription_available(now):
+            return EnrollmentOutcome.CLOSED
+
+        if self.is_student_enrolled(student_id):
+            return EnrollmentOutcome.ALREADY_ENROLLED
+
+        if not self.has_place_to_enroll():
+            return EnrollmentOutcome.FULL
+
+        if approved_course_ids is not None and not set(
+            self.correlatives_required_id
+        ).issubset(approved_course_ids):
+            return EnrollmentOutcome.MISSING_CORRELATIVES
+
+        return EnrollmentOutcome.CONFLICT
+
+    @staticmethod
+    def from_dict(data, student_id=None):
+        students = data.get("students")
+
+        if students is not None:
+            # Same count as ENROLLED_COUNT: the counter, or the array before it existed
+            students_count = data.get("enrolled_count", len(students))
+            student_enrolled = student_id in students
+        else:
+            students_count = data.get("students_count", 0)
+            student_enrolled = data.get("student_enrolled", False)
+
+        return CourseSnapshot(
+            _id=data.get("_id"),
+            creator_id=data.get("creator_id"),
+            assistants=data.get("assistants", []),
+            max_students=data.get("max_students"),
+            status=data.get("status"),
+            enroll_date_start=data.get("enroll_date_start"),
+            enroll_date_end=data.get("enroll_date_end"),
+            correlatives_required_id=data.get("correlatives_required_id", []),
+            students_count=students_count,
+            students=students,
+            student_id=student_id,
+            student_enrolled=student_enrolled,
+        )
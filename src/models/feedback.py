@@ -4,6 +4,8 @@ from bson import ObjectId
 
 
 class FeedbackCourse:
+    __slots__ = ("course_id", "feedback", "rating", "feedback_created")
+
     def __init__(
         self,
         course_id: str,
@@ -47,6 +49,8 @@ class FeedbackCourse:
 
 
 class FeedbackStudent:
+    __slots__ = ("student_id", "course_id", "teacher_id", "feedback", "feedback_created")
+
     def __init__(
         self,
         student_id: str,
@@ -15,6 +15,8 @@ from bson import ObjectId
 
 
 class Module:
+    __slots__ = ("id", "title", "description", "resources", "position", "date_created")
+
     def __init__(
         self,
         title,
@@ -47,12 +49,6 @@ class Module:
             "date_created": self.date_created,
         }
 
-    def __setattr__(self, name, value):
-        if name == "_id" and value is not None:
-            value = ObjectId(value)
-
-        super().__setattr__(name, value)
-
     @staticmethod
     def from_dict(data):
         return Module(
@@ -15,6 +15,8 @@ from bson import ObjectId
 
 
 class Resource:
+    __slots__ = ("id", "title", "description", "mimetype", "source", "position")
+
     def __init__(
         self,
         title: str,
@@ -41,12 +43,6 @@ class Resource:
             "position": self.position,
         }
 
-    def __setattr__(self, name, value):
-        if name == "_id" and value is not None:
-            value = ObjectId(value)
-
-        super().__setattr__(name, value)
-
     @staticmethod
     def from_dict(data):
         return Resource(
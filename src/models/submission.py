@@ -4,6 +4,8 @@ from utils import parse_to_timestamp_ms_now
 
 
 class Feedback:
+    __slots__ = ("corrector_id", "grade", "comment", "created_at")
+
     def __init__(
         self,
         corrector_id: Optional[str] = None,
@@ -26,15 +28,18 @@ class Feedback:
 
     @staticmethod
     def from_dict(data: dict):
-        return Feedback(
-            corrector_id=data.get("corrector_id"),
-            grade=data.get("grade"),
-            comment=data.get("comment"),
-            created_at=data.get("created_at"),
-        )
+        # Built without __init__, there is one per submission and corrector of every task loaded
+        feedback = Feedback.__new__(Feedback)
+        feedback.corrector_id = data.get("corrector_id")
+        feedback.grade = data.get("grade")
+        feedback.comment = data.get("comment")
+        feedback.created_at = data.get("created_at") or parse_to_timestamp_ms_now()
+        return feedback
 
 
 class Submission:
+    __slots__ = ("attachments", "feedbacks", "on_time")
+
     def __init__(
         self,
         attachments: Optional[List[Dict[str, str]]] = None,
@@ -42,11 +47,8 @@ class Submission:
         on_time: bool = True
     ):
         self.attachments = attachments or []
-        self.feedbacks = {}
+        self.feedbacks = feedbacks_from_dict(feedbacks)
         self.on_time = on_time
-        if feedbacks:
-            for corrector_id, feedback_data in feedbacks.items():
-                self.feedbacks[corrector_id] = Feedback.from_dict(feedback_data)
 
     def to_dict(self):
         return {
@@ -58,8 +60,20 @@ class Submission:
     @staticmethod
     def from_dict(data: dict):
         data = data or {}
-        return Submission(
-            attachments=data.get("attachments", []), 
-            feedbacks=data.get("feedbacks", {}),
-            on_time=data.get("on_time", True),
-        )
+        # Built without __init__, there is one per student of every task loaded
+        submission = Submission.__new__(Submission)
+        submission.attachments = data.get("attachments") or []
+        submission.feedbacks = feedbacks_from_dict(data.get("feedbacks"))
+        submission.on_time = data.get("on_time", True)
+        return submission
+
+
+def feedbacks_from_dict(feedbacks):
+    if not feedbacks:
+        return {}
+
+    feedback_from_dict = Feedback.from_dict
+    return {
+        corrector_id: feedback_from_dict(feedback)
+        for corrector_id, feedback in feedbacks.items()
+    }
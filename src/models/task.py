@@ -3,7 +3,7 @@ from enum import Enum
 from typing import Optional
 
 from models.submission import Submission
-from utils import parse_date_to_timestamp_ms, parse_to_timestamp_ms_now
+from utils import parse_to_timestamp_ms_now, timestamp_ms
 
 
 class TaskStatus(str, Enum):
@@ -23,6 +23,22 @@ class TaskType(str, Enum):
 
 
 class Task:
+    __slots__ = (
+        "_id",
+        "title",
+        "description",
+        "instructions",
+        "due_date",
+        "course_id",
+        "module_id",
+        "status",
+        "task_type",
+        "attachments",
+        "submissions",
+        "created_at",
+        "updated_at",
+    )
+
     def __init__(
         self,
         title: str,
@@ -77,24 +93,39 @@ class Task:
     @staticmethod
     def from_dict(data: dict):
         data = data or {}
-        submissions_data = data.get("submissions", {}) or {}
-        submissions = {}
-        for k, v in submissions_data.items():
-            if v:  # Solo procesar si no es None
-                submissions[k] = Submission.from_dict(v)
+        submissions_data = data.get("submissions") or {}
+        submission_from_dict = Submission.from_dict
+        # Skip the None submissions
+        submissions = {
+            student_id: submission_from_dict(submission)
+            for student_id, submission in submissions_data.items()
+            if submission
+        }
+
+        # Built without __init__, the same defaults applied directly
+        task = Task.__new__(Task)
+        _id = data.get("_id")
+        task._id = (
+            (_id if isinstance(_id, ObjectId) else ObjectId(_id)) if _id else ObjectId()
+        )
+        task.title = data["title"]
+        task.description = data.get("description", "")
+        task.instructions = data.get("instructions", "")
+        task.due_date = timestamp_ms(data.get("due_date"))
+        task.course_id = data["course_id"]
+        task.module_id = data["module_id"]
+        task.status = TaskStatus(data.get("status", TaskStatus.INACTIVE))
+        task.task_type = TaskType(data.get("task_type", TaskType.TASK))
+        attachments = data.get("attachments", [])
+        task.attachments = attachments if attachments is not None else []
+        task.submissions = submissions
 
-        return Task(
-            _id=ObjectId(data["_id"]) if data.get("_id") else None,
-            title=data["title"],
-            description=data.get("description", ""),
-            instructions=data.get("instructions", ""),
-            due_date=parse_date_to_timestamp_ms(data.get("due_date")),
-            course_id=data["course_id"],
-            module_id=data["module_id"],
-            status=TaskStatus(data.get("status", TaskStatus.INACTIVE)),
-            task_type=TaskType(data.get("task_type", TaskType.TASK)),
-            attachments=data.get("attachments", []),
-            submissions=submissions,
-            created_at=parse_date_to_timestamp_ms(data.get("created_at")),
-            updated_at=parse_date_to_timestamp_ms(data.get("updated_at")),
+        created_at = timestamp_ms(data.get("created_at"))
+        task.created_at = (
+            created_at if created_at is not None else parse_to_timestamp_ms_now()
+        )
+        updated_at = timestamp_ms(data.get("updated_at"))
+        task.updated_at = (
+            updated_at if updated_at is not None else parse_to_timestamp_ms_now()
         )
+        return task
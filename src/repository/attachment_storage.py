@@ -0,0 +1,80 @@
+"""
+Storage of the uploaded task attachments, chosen with ATTACHMENT_STORAGE_BACKEND:
+
+  - GCSAttachmentStorage ("gcs"): a Google Cloud Storage bucket. The client is built
+    once per process from the GOOGLE_CREDENTIALS_JSON service account info, without
+    writing it to disk, and shared by every upload, so an upload only pays for its
+    bytes. Returns a signed URL.
+  - LocalAttachmentStorage ("local"): a directory, for tests and offline deployments.
+    Returns the URL of the file under ATTACHMENT_STORAGE_BASE_URL, or a file:// URL.
+"""
+
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from pathlib import Path
+from google.cloud import storage
+
+SIGNED_URL_EXPIRATION = timedelta(minutes=15)
+
+
+class AttachmentStorage(ABC):
+    @abstractmethod
+    def save(self, filename, file, content_type=None):
+        """Store the file object under filename and return the URL to download it."""
+
+
+class GCSAttachmentStorage(AttachmentStorage):
+    def __init__(self, credentials_json, bucket_name, logger):
+        self.credentials_json = credentials_json
+        self.bucket_name = bucket_name
+        self.logger = logger
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    def bucket(self):
+        # Built on the first upload, so the app starts without GCS credentials
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    client = storage.Client.from_service_account_info(
+                        json.loads(self.credentials_json)
+                    )
+                    self._bucket = client.bucket(self.bucket_name)
+                    self.logger.info(
+                        f"[STORAGE] GCS client created for bucket {self.bucket_name}"
+                    )
+        return self._bucket
+
+    def save(self, filename, file, content_type=None):
+        blob = self.bucket().blob(filename)
+        blob.upload_from_file(file, content_type=content_type)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=SIGNED_URL_EXPIRATION,
+            method="GET",
+        )
+
+
+class LocalAttachmentStorage(AttachmentStorage):
+    def __init__(self, directory, logger, base_url=None):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.logger = logger
+
+    def save(self, filename, file, content_type=None):
+        # The filename is built from the request, it can't leave the directory
+        if os.path.basename(filename) != filename or filename in ("", ".", ".."):
+            raise ValueError(f"Invalid attachment filename: {filename}")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / filename
+        with open(path, "wb") as destination:
+            shutil.copyfileobj(file, destination)
+
+        if self.base_url:
+            return f"{self.base_url}/{filename}"
+        return path.resolve().as_uri()
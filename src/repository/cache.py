@@ -0,0 +1,95 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+CACHE_DEFAULT_MAX_ENTRIES = 1024
+CACHE_DEFAULT_TTL_SECONDS = 30
+
+
+class LRUCache:
+    """
+    Bounded in-memory cache with a time to live. When it is full the least recently
+    used entry is evicted. It is shared by the request threads, so every operation
+    takes the lock, and values are copied in and out so callers can't modify a cached document.
+    """
+
+    def __init__(
+        self,
+        max_entries=CACHE_DEFAULT_MAX_ENTRIES,
+        ttl_seconds=CACHE_DEFAULT_TTL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        # Bumped by every invalidation, see set
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def generation(self):
+        return self._generation
+
+    def set(self, key, value, generation=None):
+        """
+        generation is the value of generation() taken before reading value from the database.
+        If anything was invalidated since then, value may be stale and it isn't cached.
+        """
+        if self.max_entries <= 0:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,200 @@
+"""
+Catalog facets: how many courses there are by status, by creator, by start month and
+with or without open seats. They are computed with a single $facet aggregation over the
+courses and materialized with $merge into a one document summary collection, so a
+facets request is a find_one by _id instead of a scan of every course.
+
+CatalogFacetsRefresher keeps the summary up to date. It subscribes to the courses
+namespace of the invalidation bus, so course writes mark it stale, and refreshes it at
+most once every CATALOG_FACETS_REFRESH_SECONDS. It is also refreshed every
+CATALOG_FACETS_MAX_AGE_SECONDS even without writes, for the ones the bus didn't hear
+about (other replicas with the in_process backend, scripts, migrations).
+"""
+
+import threading
+import time
+from pymongo.errors import PyMongoError
+from repository.courses_repository import ENROLLED_COUNT
+
+CATALOG_FACETS_ID = "catalog"
+
+CATALOG_FACETS_DEFAULT_REFRESH_SECONDS = 5
+CATALOG_FACETS_DEFAULT_MAX_AGE_SECONDS = 60
+
+
+def facet_counts(group_by, sort, *extra_fields):
+    # [{"value", "count", *extra_fields}], one entry per distinct group_by
+    return [
+        {
+            "$group": {
+                "_id": group_by,
+                "count": {"$sum": 1},
+                **{field: {"$first": f"${field}"} for field in extra_fields},
+            }
+        },
+        {"$sort": sort},
+        {
+            "$project": {
+                "_id": 0,
+                "value": "$_id",
+                "count": 1,
+                **{field: 1 for field in extra_fields},
+            }
+        },
+    ]
+
+
+class CatalogFacetsRepository:
+    def __init__(self, collection_courses, collection, logger):
+        self.collection_courses = collection_courses
+        # Summary collection, only holds the CATALOG_FACETS_ID document
+        self.collection = collection
+        self.logger = logger
+
+    def facets_pipeline(self):
+        return [
+            # Only what the facets need goes through $facet, never the students array
+            {
+                "$project": {
+                    "status": {"$ifNull": ["$status", "open"]},
+                    "creator_id": 1,
+                    "creator_name": 1,
+                    "course_start_date": 1,
+                    "has_open_seats": {
+                        "$and": [
+                            {"$eq": [{"$ifNull": ["$status", "open"]}, "open"]},
+                            {
+                                "$lt": [
+                                    ENROLLED_COUNT,
+                                    {"$ifNull": ["$max_students", 0]},
+                                ]
+                            },
+                        ]
+                    },
+                }
+            },
+            {
+                "$facet": {
+                    "total": [{"$count": "count"}],
+                    "status": facet_counts("$status", {"_id": 1}),
+                    "creators": facet_counts(
+                        "$creator_id", {"count": -1, "_id": 1}, "creator_name"
+                    ),
+                    # course_start_date is stored as YYYY-MM-DD
+                    "start_months": [
+                        {"$match": {"course_start_date": {"$type": "string"}}},
+                        *facet_counts(
+                            {"$substrCP": ["$course_start_date", 0, 7]}, {"_id": 1}
+                        ),
+                    ],
+                    "has_open_seats": facet_counts("$has_open_seats", {"_id": 1}),
+                }
+            },
+            {
+                "$set": {
+                    "_id": CATALOG_FACETS_ID,
+                    "total": {
+                        "$ifNull": [{"$arrayElemAt": ["$total.count", 0]}, 0]
+                    },
+                    "refreshed_at": "$$NOW",
+                }
+            },
+            {
+                "$merge": {
+                    "into": self.collection.name,
+                    "on": "_id",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+
+    def refresh(self):
+        # Runs on the server, $merge returns no documents
+        self.collection_courses.aggregate(self.facets_pipeline())
+        self.logger.debug("[REPOSITORY] Catalog facets refreshed")
+
+    def get_facets(self):
+        """
+        The materialized facets. Computed here the first time, when nothing refreshed them yet.
+        """
+        facets = self.collection.find_one({"_id": CATALOG_FACETS_ID}, {"_id": 0})
+        if facets is None:
+            self.refresh()
+            facets = self.collection.find_one({"_id": CATALOG_FACETS_ID}, {"_id": 0})
+        return facets
+
+
+class CatalogFacetsRefresher:
+    """
+    Subscribed to the invalidation bus like a cache: invalidate and clear only mark the
+    facets stale, the refresh happens in the background, so a burst of writes (a bulk
+    import) costs one aggregation instead of one per course.
+    """
+
+    def __init__(
+        self,
+        repository,
+        logger,
+        refresh_seconds=CATALOG_FACETS_DEFAULT_REFRESH_SECONDS,
+        max_age_seconds=CATALOG_FACETS_DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self.repository = repository
+        self.logger = logger
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.refreshed_at = None
+        self._stale = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def invalidate(self, key):
+        self._stale.set()
+
+    def clear(self):
+        self._stale.set()
+
+    def refresh_if_due(self):
+        """
+        Refresh when a course changed or the facets are older than max_age_seconds.
+        Returns whether they were refreshed.
+        """
+        now = time.monotonic()
+        expired = (
+            self.refreshed_at is None
+            or now - self.refreshed_at >= self.max_age_seconds
+        )
+        if not (self._stale.is_set() or expired):
+            return False
+
+        # Cleared before reading, a write that lands meanwhile marks it stale again
+        self._stale.clear()
+        try:
+            self.repository.refresh()
+        except PyMongoError as e:
+            self._stale.set()
+            self.logger.error(f"[CATALOG FACETS] Refresh failed: {e}")
+            return False
+
+        self.refreshed_at = now
+        return True
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="catalog-facets-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_seconds * 2)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.refresh_if_due()
+            self._stopped.wait(self.refresh_seconds)
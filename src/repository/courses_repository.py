@@ -1,174 +1,613 @@
 import os
+import re
 from bson import ObjectId
-from models.course import Course
+from pymongo import ASCENDING, TEXT, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError
+from models.course import COURSE_SUMMARY_FIELDS, Course, CourseStatus
+from models.course_snapshot import CourseSnapshot, EnrollmentOutcome
 from datetime import datetime, timedelta
+from repository.invalidation_bus import COURSES
+from repository.versioning import (
+    VERSION_PROJECTION,
+    initial_version,
+    pipeline_with_version_bump,
+    version_of,
+    with_version_bump,
+)
+from utils import STREAM_DEFAULT_BATCH_SIZE, decode_cursor, encode_cursor
+
+# Queries shorter than this use a prefix match instead of the text index
+SEARCH_MIN_TEXT_LENGTH = 3
+SEARCH_DEFAULT_MAX_RESULTS = 50
+SEARCH_DEFAULT_MAX_TIME_MS = 2000
+
+# Attempts of the reset of a course being reopened (see CoursesRepository.open_course)
+OPEN_COURSE_RESET_ATTEMPTS = 3
+
+# Courses keep enrolled_count, the number of students enrolled, updated in the same
+# write that enrolls or removes the student. Courses written before it existed (until
+# migrations.repair_enrolled_counts runs) fall back to the size of their students
+# array, computed by the server so the array is never sent.
+ENROLLED_COUNT = {
+    "$ifNull": ["$enrolled_count", {"$size": {"$ifNull": ["$students", []]}}]
+}
+
+
+def enrollment_update(student_id, enrolled, embedded=True):
+    """
+    Pipeline update adding (or removing) the student and moving the counter from
+    ENROLLED_COUNT. An $inc would start a missing counter at 1 or -1 and hide the
+    size of the array from then on. Without embedded only the counter moves, the
+    student is kept in the enrollments collection alone.
+    """
+    if enrolled:
+        update = {"enrolled_count": {"$add": [ENROLLED_COUNT, 1]}}
+    else:
+        update = {"enrolled_count": {"$subtract": [ENROLLED_COUNT, 1]}}
+
+    if embedded:
+        students = {"$ifNull": ["$students", []]}
+        student = {"$literal": student_id}
+        if enrolled:
+            update["students"] = {"$concatArrays": [students, [student]]}
+        else:
+            update["students"] = {
+                "$filter": {"input": students, "cond": {"$ne": ["$$this", student]}}
+            }
+
+    return pipeline_with_version_bump([{"$set": update}])
+
+# Projection used by the list views (see models.course.course_summary_from_dict)
+COURSE_SUMMARY_PROJECTION = {
+    **{field: 1 for field in COURSE_SUMMARY_FIELDS},
+    "enrolled_count": ENROLLED_COUNT,
+}
 
 
 class CoursesRepository:
-    def __init__(self, collection, task_repository, logger):
+    # See repository.indexes
+    INDEXES = {
+        "collection": [
+            # Course search, name matches weight more than the description
+            IndexModel(
+                [("name", TEXT), ("description", TEXT), ("creator_name", TEXT)],
+                name="courses_text_search",
+                weights={"name": 10, "creator_name": 5, "description": 1},
+                # Courses are written both in spanish and english, so we don't stem
+                default_language="none",
+            ),
+            IndexModel([("students", ASCENDING)]),
+            # Owned courses, each branch of the $or keeps the _id order of the pages
+            IndexModel([("creator_id", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("assistants", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("_id", ASCENDING)]),
+        ]
+    }
+    QUERY_SHAPES = {
+        "collection": [
+            ("enrolled courses", {"students": "student"}, None),
+            (
+                "owned courses",
+                {"$or": [{"creator_id": "user"}, {"assistants": "user"}]},
+                [("_id", ASCENDING)],
+            ),
+            ("open courses page", {"status": "open"}, [("_id", ASCENDING)]),
+        ]
+    }
+
+    def __init__(
+        self,
+        collection,
+        task_repository,
+        logger,
+        search_max_time_ms=SEARCH_DEFAULT_MAX_TIME_MS,
+        enrollment_repository=None,
+        read_enrollments_from_collection=False,
+        cache=None,
+        invalidation_bus=None,
+    ):
         self.collection = collection
         self.task_repository = task_repository
         self.logger = logger
+        self.search_max_time_ms = search_max_time_ms
+        # While migrating, every enrollment is written both to the course students array
+        # and to the enrollments collection, and the array guards the enrollment write
+        # (see enroll_student_in_course). Once the collection is backfilled, it becomes
+        # the only store: reads and the duplicate guard move to it, the course only keeps
+        # enrolled_count and migrations.drop_course_students removes the arrays.
+        self.enrollment_repository = enrollment_repository
+        self.read_enrollments_from_collection = (
+            enrollment_repository is not None and read_enrollments_from_collection
+        )
+        # Read-through cache of whole course documents by id (see repository.cache).
+        # Every write to a course must call invalidate_course.
+        self.cache = cache
+        self.invalidation_bus = invalidation_bus
+
+    def invalidate_course(self, course_id):
+        # Through the bus, so the other replicas (and the modules cache) hear about it too
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(COURSES, course_id)
+        elif self.cache:
+            self.cache.invalidate(str(course_id))
+
+    def _new_course_fields(self):
+        fields = {"enrolled_count": 0, "modules": [], **initial_version()}
+        if not self.read_enrollments_from_collection:
+            fields["students"] = []
+        return fields
 
     def create_course(self, course_dict):
-        course_dict["students"] = []
-        course_dict["modules"] = []
+        course_dict.update(self._new_course_fields())
         result = self.collection.insert_one(course_dict)
+        # Nothing cached yet, but the bus also tells the catalog facets (see repository.catalog_facets_repository)
+        self.invalidate_course(result.inserted_id)
 
         self.logger.debug(
             f"[REPOSITORY] CREATE: New course created with ID: {result.inserted_id}"
         )
         return str(result.inserted_id)
 
+    def create_courses(self, course_dicts):
+        """
+        Insert many courses in one unordered insert_many, a failing course doesn't stop
+        the others. Returns, in order, (course_id, error) for each course: error is None
+        if it was inserted, else the reason it wasn't.
+        """
+        for course_dict in course_dicts:
+            course_dict.update(self._new_course_fields())
+
+        try:
+            self.collection.insert_many(course_dicts, ordered=False)
+            errors = {}
+        except BulkWriteError as e:
+            errors = {
+                error["index"]: error["errmsg"]
+                for error in e.details.get("writeErrors", [])
+            }
+
+        self.logger.debug(
+            f"[REPOSITORY] CREATE: {len(course_dicts) - len(errors)} of {len(course_dicts)} courses created"
+        )
+
+        # insert_many sets the _id of every document before sending them
+        results = [
+            (str(course_dict["_id"]), errors.get(index))
+            for index, course_dict in enumerate(course_dicts)
+        ]
+
+        # Nothing cached yet, but the bus also tells the catalog facets
+        for course_id, error in results:
+            if error is None:
+                self.invalidate_course(course_id)
+
+        return results
+
     def update_course(self, course_id, course_dict):
         result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$set": course_dict}
+            {"_id": ObjectId(course_id)}, with_version_bump({"$set": course_dict})
         )
+        self.invalidate_course(course_id)
         self.logger.debug(f"[REPOSITORY] UPDATE: Course with ID: {course_id} updated")
         return result.modified_count > 0
 
     def delete_course(self, course_id):
         result = self.collection.delete_one({"_id": ObjectId(course_id)})
+        self.invalidate_course(course_id)
         self.logger.debug(f"[REPOSITORY] DELETE: Course with ID: {course_id} deleted")
+
+        if result.deleted_count > 0 and self.enrollment_repository:
+            self.enrollment_repository.remove_course_enrollments(course_id)
+
         return result.deleted_count > 0
 
     def get_course_by_id(self, course_id):
+        if self.cache:
+            course = self.cache.get(str(course_id))
+            if course:
+                return course
+            generation = self.cache.generation()
+
         object_id = ObjectId(course_id)
         self.logger.debug(
             f"[REPOSITORY] course_id: {course_id} - object_id: {object_id}"
         )
-        course = self.collection.find_one({"_id": object_id})
+        if not self.read_enrollments_from_collection:
+            course = self.collection.find_one({"_id": object_id})
+        else:
+            course = self.collection.find_one({"_id": object_id}, {"students": 0})
+            if course:
+                course["students"] = (
+                    self.enrollment_repository.get_student_ids_by_course(course_id)
+                )
 
         self.logger.debug(f"[REPOSITORY] course searched on repository: {course}")
 
         # we convert the course to a Course instance
         if course:
+            if self.cache:
+                self.cache.set(str(course_id), course, generation)
             return course
         else:
             return None
 
-    def search_course_by_partial_information(self, string_to_find):
-        # We need to search in the course name and description and creator name, we skip if the string is empty or none
-        # We need to use regex to find the string in the name and description
+    def get_course_version(self, course_id):
+        """
+        {"version", "updated_at"} of the course, None if it doesn't exist. Answered by the
+        cache when the course is there, else with a query that only projects those fields.
+        """
+        course = self.cache.get(str(course_id)) if self.cache else None
+        if not course:
+            course = self.collection.find_one(
+                {"_id": ObjectId(course_id)}, VERSION_PROJECTION
+            )
+        return version_of(course)
 
-        regex = {"$regex": string_to_find, "$options": "i"}
-        courses = self.collection.find(
-            {
-                "$or": [
-                    {"name": regex},
-                    {"description": regex},
-                    {"course_start_date": regex},
-                    {"course_end_date": regex},
-                    {"creator_name": regex},
-                ]
-            }
+    def _get_course_fields(self, course_id, *fields):
+        # For the checks that only need a couple of fields of the course.
+        # With the cache enabled the whole course is read through it instead
+        if self.cache:
+            return self.get_course_by_id(course_id)
+
+        return self.collection.find_one(
+            {"_id": ObjectId(course_id)}, {field: 1 for field in fields}
         )
 
-        self.logger.debug(f"[REPOSITORY] courses searched on repository: {courses}")
-        return list(courses)
+    def get_course_snapshot(self, course_id, student_id=None, use_cache=True):
+        """
+        Load, in a single round trip, only what the enrollment and ownership checks need.
+        The students array never leaves the database: we project its size and,
+        when a student is given, whether that student is already in it (or ask the
+        enrollments collection, once it is the store of the enrollments).
+        A cached course is used instead when there is one (unless use_cache is False).
+        """
+        if self.cache and use_cache:
+            course = self.cache.get(str(course_id))
+            if course:
+                return CourseSnapshot.from_dict(course, student_id)
+
+        projection = {
+            "creator_id": 1,
+            "assistants": 1,
+            "max_students": 1,
+            "status": 1,
+            "enroll_date_start": 1,
+            "enroll_date_end": 1,
+            "correlatives_required_id": 1,
+            "students_count": ENROLLED_COUNT,
+        }
+
+        if student_id is not None and not self.read_enrollments_from_collection:
+            projection["student_enrolled"] = {
+                "$in": [student_id, {"$ifNull": ["$students", []]}]
+            }
+
+        course = self.collection.find_one({"_id": ObjectId(course_id)}, projection)
+
+        if course and student_id is not None and self.read_enrollments_from_collection:
+            course["student_enrolled"] = self.enrollment_repository.is_student_enrolled(
+                course_id, student_id
+            )
+
+        self.logger.debug(f"[REPOSITORY] course snapshot for {course_id}: {course}")
 
-    def get_list_of_students_for_course(self, course_id):
-        course = self.get_course_by_id(course_id)
         if course:
-            return course.get("students", [])
+            return CourseSnapshot.from_dict(course, student_id)
         else:
             return None
 
-    def enroll_student_in_course(self, course_id, student_id):
-        result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$addToSet": {"students": student_id}}
+    def search_course_by_partial_information(
+        self, string_to_find, offset=0, max_results=None, cursor=None, max_time_ms=None
+    ):
+        """
+        Search courses by name, description or creator name.
+
+        Queries of SEARCH_MIN_TEXT_LENGTH characters or more use the text index and are
+        ranked by relevance. Shorter queries (or text queries without any match, so partial
+        words still find something) fall back to an escaped prefix match.
+
+        Returns (courses, next_cursor). next_cursor is None on the last page. With a
+        cursor the offset is ignored, "" is the first page.
+        """
+        string_to_find = string_to_find.strip()
+        max_results = max_results if max_results else SEARCH_DEFAULT_MAX_RESULTS
+        max_time_ms = max_time_ms if max_time_ms else self.search_max_time_ms
+        after = decode_cursor(cursor) if cursor else None
+        offset = 0 if cursor is not None else offset
+
+        if len(string_to_find) >= SEARCH_MIN_TEXT_LENGTH and (
+            after is None or after.get("mode") == "text"
+        ):
+            courses, next_cursor = self._search_courses_by_text(
+                string_to_find, offset, max_results, after, max_time_ms
+            )
+
+            first_page = offset == 0 and after is None
+            if courses or not first_page:
+                return courses, next_cursor
+
+        return self._search_courses_by_prefix(
+            string_to_find, offset, max_results, after, max_time_ms
         )
+
+    def _search_courses_by_text(self, text, offset, max_results, after, max_time_ms):
+        pipeline = [
+            {"$match": {"$text": {"$search": text}}},
+            {
+                "$project": {
+                    **COURSE_SUMMARY_PROJECTION,
+                    "score": {"$meta": "textScore"},
+                }
+            },
+        ]
+
+        if after:
+            # Keyset on (score desc, _id asc), so pages stay stable while courses are created
+            pipeline.append(
+                {
+                    "$match": {
+                        "$or": [
+                            {"score": {"$lt": after["score"]}},
+                            {
+                                "score": after["score"],
+                                "_id": {"$gt": ObjectId(after["_id"])},
+                            },
+                        ]
+                    }
+                }
+            )
+
+        pipeline.append({"$sort": {"score": -1, "_id": 1}})
+        if offset:
+            pipeline.append({"$skip": offset})
+        # We ask for one extra document to know if there is a next page
+        pipeline.append({"$limit": max_results + 1})
+
+        courses = list(self.collection.aggregate(pipeline, maxTimeMS=max_time_ms))
+
         self.logger.debug(
-            f"[REPOSITORY] Enroll student {student_id} in course {course_id}"
+            f"[REPOSITORY] text search '{text}' returned {len(courses)} courses"
         )
-        return result.modified_count > 0
 
-    def remove_student_from_course(self, course_id, student_id):
-        result = self.collection.update_one(
-            {"_id": course_id}, {"$pull": {"students": student_id}}
+        next_cursor = None
+        if len(courses) > max_results:
+            courses = courses[:max_results]
+            last = courses[-1]
+            next_cursor = encode_cursor(
+                {"mode": "text", "score": last["score"], "_id": str(last["_id"])}
+            )
+
+        for course in courses:
+            course.pop("score", None)
+
+        return courses, next_cursor
+
+    def _search_courses_by_prefix(self, text, offset, max_results, after, max_time_ms):
+        # User input is escaped, and anchored so the match can stop early on each field
+        regex = {"$regex": f"^{re.escape(text)}", "$options": "i"}
+        query = {"$or": [{"name": regex}, {"creator_name": regex}]}
+
+        if after:
+            query["_id"] = {"$gt": ObjectId(after["_id"])}
+
+        cursor = (
+            self.collection.find(query, COURSE_SUMMARY_PROJECTION)
+            .sort("_id", ASCENDING)
+            .skip(offset)
+            .limit(max_results + 1)
+            .max_time_ms(max_time_ms)
+        )
+        courses = list(cursor)
+
+        self.logger.debug(
+            f"[REPOSITORY] prefix search '{text}' returned {len(courses)} courses"
         )
-        return result.modified_count > 0
 
-    """ This method is used to find all courses that a student is enrolled in. """
+        next_cursor = None
+        if len(courses) > max_results:
+            courses = courses[:max_results]
+            next_cursor = encode_cursor(
+                {"mode": "prefix", "_id": str(courses[-1]["_id"])}
+            )
 
-    def get_course_owner(self, course_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            return course.get("creator_id")
-        else:
-            return None
+        return courses, next_cursor
 
-    """ This method is used to know if a player is already enrolled in a course. """
+    def get_list_of_students_for_course(self, course_id):
+        return self.get_students_in_course(course_id)
 
-    def is_student_enrolled_in_course(self, course_id, student_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            return student_id in course.get("students", [])
+    def enroll_student_in_course(self, course_id, student_id, approved_course_ids=None):
+        """
+        Enroll a student with a single guarded write. The course is only modified if
+        the course is open, the enrollment window is open, the student isn't enrolled yet
+        and there is still a place (and, when approved_course_ids is given, every
+        correlative is approved). Concurrent enrollments can't over-enroll the course.
+
+        Returns an EnrollmentOutcome. The course is read again only when the write
+        matched nothing, to tell the caller why.
+
+        Once the enrollments are read from their collection, its unique index keeps the
+        student from enrolling twice and the guarded write only moves enrolled_count.
+        """
+        now = datetime.now()
+
+        guard = [
+            {
+                "$eq": [
+                    {"$ifNull": ["$status", CourseStatus.OPEN.value]},
+                    CourseStatus.OPEN.value,
+                ]
+            },
+            {
+                "$or": [
+                    {"$eq": [{"$ifNull": ["$enroll_date_end", None]}, None]},
+                    {
+                        "$and": [
+                            {"$lte": ["$enroll_date_start", now]},
+                            {"$gte": ["$enroll_date_end", now]},
+                        ]
+                    },
+                ]
+            },
+            {"$lt": [ENROLLED_COUNT, {"$ifNull": ["$max_students", 0]}]},
+        ]
+        if not self.read_enrollments_from_collection:
+            guard.append(
+                {"$not": [{"$in": [student_id, {"$ifNull": ["$students", []]}]}]}
+            )
+
+        if approved_course_ids is not None:
+            guard.append(
+                {
+                    "$setIsSubset": [
+                        {"$ifNull": ["$correlatives_required_id", []]},
+                        list(approved_course_ids),
+                    ]
+                }
+            )
+
+        if self.read_enrollments_from_collection:
+            enrolled = self._enroll_in_collection(course_id, student_id, guard)
         else:
+            enrolled = self._enroll_in_course(course_id, student_id, guard)
+
+        if enrolled:
+            self.logger.debug(
+                f"[REPOSITORY] Enroll student {student_id} in course {course_id}"
+            )
+            return EnrollmentOutcome.ENROLLED
+
+        # The write matched nothing, only now we look at the course to know why
+        snapshot = self.get_course_snapshot(course_id, student_id, use_cache=False)
+        if not snapshot:
+            return EnrollmentOutcome.NOT_FOUND
+
+        outcome = snapshot.enrollment_rejection(student_id, approved_course_ids, now)
+        self.logger.debug(
+            f"[REPOSITORY] Enroll student {student_id} in course {course_id} rejected: {outcome.value}"
+        )
+        return outcome
+
+    def _enroll_in_course(self, course_id, student_id, guard):
+        course = self.collection.find_one_and_update(
+            {"_id": ObjectId(course_id), "$expr": {"$and": guard}},
+            enrollment_update(student_id, enrolled=True),
+            projection={"_id": 1},
+        )
+        if not course:
             return False
 
+        self.invalidate_course(course_id)
+        self._add_enrollment(course_id, student_id)
+        return True
+
+    def _enroll_in_collection(self, course_id, student_id, guard):
+        if not self.enrollment_repository.create_enrollment(course_id, student_id):
+            return False
+
+        try:
+            course = self.collection.find_one_and_update(
+                {"_id": ObjectId(course_id), "$expr": {"$and": guard}},
+                enrollment_update(student_id, enrolled=True, embedded=False),
+                projection={"_id": 1},
+            )
+        except Exception:
+            self.enrollment_repository.remove_enrollment(course_id, student_id)
+            raise
+
+        if not course:
+            # The course can't take the student, so the enrollment is undone
+            self.enrollment_repository.remove_enrollment(course_id, student_id)
+            return False
+
+        self.invalidate_course(course_id)
+        return True
+
+    def _add_enrollment(self, course_id, student_id):
+        if not self.enrollment_repository:
+            return
+
+        try:
+            self.enrollment_repository.add_enrollment(course_id, student_id)
+        except Exception as e:
+            # Both stores must agree, so we undo the enrollment in the course
+            self.logger.error(
+                f"[REPOSITORY] Enrollment of {student_id} in {course_id} could not be saved: {e}"
+            )
+            self.collection.update_one(
+                {"_id": ObjectId(course_id), "students": student_id},
+                enrollment_update(student_id, enrolled=False),
+            )
+            self.invalidate_course(course_id)
+            raise
+
     def is_user_owner(self, course_id, user_id):
-        course = self.get_course_by_id(course_id)
+        course = self._get_course_fields(course_id, "creator_id")
         if course:
             return course.get("creator_id", None) == user_id
         else:
             return False
 
     def get_all_courses(self):
-        courses = self.collection.find()
+        courses = self.collection.find({}, COURSE_SUMMARY_PROJECTION)
         return list(courses)
 
+    def iter_all_courses(self, batch_size=STREAM_DEFAULT_BATCH_SIZE):
+        # Lazy version of get_all_courses, only one batch is held at a time
+        return self.collection.find({}, COURSE_SUMMARY_PROJECTION).batch_size(
+            batch_size
+        )
+
     def get_enrolled_courses(self, student_id):
-        courses = self.collection.find({"students": student_id})
+        courses = self.collection.find(
+            self._enrolled_courses_query(student_id), COURSE_SUMMARY_PROJECTION
+        )
         return list(courses)
 
-    def check_if_course_has_place_to_enroll(self, course_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            return len(course.get("students", [])) < course.get("max_students", 0)
-        else:
-            return False
+    def iter_enrolled_courses(self, student_id, batch_size=STREAM_DEFAULT_BATCH_SIZE):
+        return self.collection.find(
+            self._enrolled_courses_query(student_id), COURSE_SUMMARY_PROJECTION
+        ).batch_size(batch_size)
+
+    def _enrolled_courses_query(self, student_id):
+        if not self.read_enrollments_from_collection:
+            return {"students": student_id}
+
+        course_ids = self.enrollment_repository.get_course_ids_by_student(student_id)
+        return {"_id": {"$in": [ObjectId(course_id) for course_id in course_ids]}}
+
+    def get_paginated_courses(self, offset, max_per_page, cursor=None):
+        # Pages are ordered by _id, so a cursor (see utils.next_page_cursor) can resume
+        # right after the last course seen instead of skipping over the previous pages.
+        # With a cursor the offset is ignored, "" is the first page.
+        query = {"status": "open"}
+        if cursor:
+            query["_id"] = {"$gt": ObjectId(decode_cursor(cursor)["_id"])}
+        skip = 0 if cursor is not None else offset
 
-    def get_paginated_courses(self, offset, max_per_page):
         courses = (
-            self.collection.find({"status": "open"}).skip(offset).limit(max_per_page)
+            self.collection.find(query, COURSE_SUMMARY_PROJECTION)
+            .sort("_id", ASCENDING)
+            .skip(skip)
+            .limit(max_per_page)
         )
         return list(courses)
 
-    def check_if_course_inscription_is_available(self, course_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            # In case enroll_date_end is None, we assume the course is open for enrollment
-            # So in that case, the enrollment is available, else, we check if the enroll_date_end is greater than now
-            if course.get("enroll_date_end") is None:
-                self.logger.debug(
-                    f"[REPOSITORY] Course {course_id} has no end date for enrollment, so it is available"
-                )
-                return True
-            else:
-                self.logger.debug(
-                    f"[REPOSITORY] Course {course_id} has an end date for enrollment, so we check if it is available"
-                )
-                return (
-                    course.get("enroll_date_start")
-                    <= datetime.now()
-                    <= course.get("enroll_date_end")
-                )
-        else:
-            return False
-
-    def get_courses_owned_by_user(self, user_id, offset, max_per_page):
+    def get_courses_owned_by_user(self, user_id, offset, max_per_page, cursor=None):
         # An owner of the course is either the creator or its assistant
         """courses = (
             self.collection.find({"creator_id": user_id})
             .skip(offset)
             .limit(max_per_page)
         )"""
+        query = {"$or": [{"creator_id": user_id}, {"assistants": user_id}]}
+        if cursor:
+            query["_id"] = {"$gt": ObjectId(decode_cursor(cursor)["_id"])}
+        skip = 0 if cursor is not None else offset
+
         courses = (
-            self.collection.find(
-                {"$or": [{"creator_id": user_id}, {"assistants": user_id}]}
-            )
-            .skip(offset)
+            self.collection.find(query)
+            .sort("_id", ASCENDING)
+            .skip(skip)
             .limit(max_per_page)
         )
 
@@ -176,8 +615,10 @@ class CoursesRepository:
 
     def add_assistant_to_course(self, course_id, assistant_id):
         result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$addToSet": {"assistants": assistant_id}}
+            {"_id": ObjectId(course_id)},
+            with_version_bump({"$addToSet": {"assistants": assistant_id}}),
         )
+        self.invalidate_course(course_id)
         self.logger.debug(
             f"[REPOSITORY] Add assistant {assistant_id} to course {course_id}"
         )
@@ -202,8 +643,10 @@ class CoursesRepository:
 
     def remove_assistant_from_course(self, course_id, assistant_id):
         result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$pull": {"assistants": assistant_id}}
+            {"_id": ObjectId(course_id)},
+            with_version_bump({"$pull": {"assistants": assistant_id}}),
         )
+        self.invalidate_course(course_id)
         self.logger.debug(
             f"[REPOSITORY] Remove assistant {assistant_id} from course {course_id}"
         )
@@ -231,47 +674,63 @@ class CoursesRepository:
         return None
     """
 
-    def get_course_correlatives(self, course_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            return course.get("correlatives_required_id", [])
-        else:
-            return None
-
     def remove_student_from_course(self, course_id, student_id):
+        if self.read_enrollments_from_collection:
+            # The counter only goes down when the enrollment was there
+            removed = self.enrollment_repository.remove_enrollment(course_id, student_id)
+            if removed:
+                self.collection.update_one(
+                    {"_id": ObjectId(course_id)},
+                    enrollment_update(student_id, enrolled=False, embedded=False),
+                )
+            self.invalidate_course(course_id)
+            return removed
+
+        # Matching the student, so the counter only goes down when the student was there
         result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$pull": {"students": student_id}}
+            {"_id": ObjectId(course_id), "students": student_id},
+            enrollment_update(student_id, enrolled=False),
         )
+        self.invalidate_course(course_id)
         self.logger.debug(
             f"[DEBUG] Remove student {student_id} from course {course_id}"
         )
+
+        if self.enrollment_repository:
+            self.enrollment_repository.remove_enrollment(course_id, student_id)
+
         return result.modified_count > 0
 
     def get_course_correlatives_by_id(self, course_id):
-        course = self.get_course_by_id(course_id)
+        course = self._get_course_fields(course_id, "correlatives_required_id")
         if course:
             return course.get("correlatives_required_id", [])
         else:
             return None
 
     def get_students_in_course(self, course_id):
-        course = self.get_course_by_id(course_id)
-        if course:
-            return course.get("students", [])
-        else:
+        if not self.read_enrollments_from_collection:
+            course = self._get_course_fields(course_id, "students")
+            return course.get("students", []) if course else None
+
+        if not self._get_course_fields(course_id, "_id"):
             return None
 
+        return self.enrollment_repository.get_student_ids_by_course(course_id)
+
     def remove_module_from_course(self, course_id, module_id):
         # This method is used to remove a module from a course
         # Course has a list of modules with the id inside.
         result = self.collection.update_one(
-            {"_id": ObjectId(course_id)}, {"$pull": {"modules": module_id}}
+            {"_id": ObjectId(course_id)},
+            with_version_bump({"$pull": {"modules": module_id}}),
         )
+        self.invalidate_course(course_id)
         return result.modified_count > 0
 
     def get_courses_by_student_id(self, student_id):
         try:
-            query = {"students": student_id}
+            query = self._enrolled_courses_query(student_id)
             courses = list(self.collection.find(query))
             return [Course.from_dict(course) for course in courses]
         except Exception as e:
@@ -281,6 +740,16 @@ class CoursesRepository:
             raise e
 
     def open_course(self, course_id, course_start_date, course_end_date):
+        """
+        Reopen a closed course for a new cohort: the students, enrollments and every task
+        of the course are reset. Returns (course, tasks_reset), course is None if it
+        doesn't exist or wasn't closed, and then nothing else is touched.
+
+        The reset runs while the course is still closed, so nobody can enroll or submit
+        in the middle of it, and every step of it can run again. It is retried, and if it
+        still fails the course stays closed: opening it again redoes the whole reset.
+        The course is only opened once the reset is done.
+        """
         try:
             start_date = datetime.strptime(course_start_date, "%Y-%m-%d")
             end_date = datetime.strptime(course_end_date, "%Y-%m-%d")
@@ -296,48 +765,67 @@ class CoursesRepository:
         if start_date <= yesterday:
             raise ValueError("The start date cannot be earlier than the current date.")
 
-        result = self.collection.update_one(
-            {
-                "_id": ObjectId(course_id),
-                "status": "closed",  # Solo si estaba cerrado antes
-            },
-            {
-                "$set": {
-                    "status": "open",
-                    "course_start_date": course_start_date,
-                    "course_end_date": course_end_date,
-                    "students": [],
-                }
-            },
+        closed_course = {
+            "_id": ObjectId(course_id),
+            "status": "closed",  # Solo si estaba cerrado antes
+        }
+        if not self.collection.find_one(closed_course, {"_id": 1}):
+            return None, 0
+
+        tasks_reset = self._reset_course_cohort(course_id)
+
+        reopened = {
+            "status": "open",
+            "course_start_date": course_start_date,
+            "course_end_date": course_end_date,
+            "enrolled_count": 0,
+        }
+        if not self.read_enrollments_from_collection:
+            reopened["students"] = []
+
+        updated_course = self.collection.find_one_and_update(
+            closed_course,
+            with_version_bump({"$set": reopened}),
+            return_document=ReturnDocument.AFTER,
         )
+        if not updated_course:
+            # Opened by a concurrent request, after its own reset
+            return None, 0
 
-        if result.modified_count < 0:
-            return None
-
+        self.invalidate_course(course_id)
         self.logger.debug(f"[REPOSITORY] UPDATE: Course with ID: {course_id} open")
-
-        tasks = self.task_repository.get_tasks_by_course_ids([course_id])
-        for task in tasks:
-            task_id = task._id
-            self.logger.debug(f"[REPOSITORY] Clean task: {task_id}")
-            result = self.task_repository.clean_task(task_id)
-
-        updated_course = self.collection.find_one({"_id": ObjectId(course_id)})
-        return updated_course
+        return updated_course, tasks_reset
+
+    def _reset_course_cohort(self, course_id):
+        # The enrollments, tasks and submissions of the previous cohort, see open_course
+        for attempt in range(1, OPEN_COURSE_RESET_ATTEMPTS + 1):
+            try:
+                if self.enrollment_repository:
+                    self.enrollment_repository.remove_course_enrollments(course_id)
+                return self.task_repository.reset_tasks_for_course(course_id)
+            except Exception as e:
+                self.logger.warning(
+                    f"[REPOSITORY] Reset of course {course_id} failed (attempt {attempt}): {e}"
+                )
+                if attempt == OPEN_COURSE_RESET_ATTEMPTS:
+                    raise
 
     def close_course(self, course_id):
-        result = self.collection.update_one(
+        updated_course = self.collection.find_one_and_update(
             {"_id": ObjectId(course_id), "status": "open"},
-            {
-                "$set": {
-                    "status": "closed",
+            with_version_bump(
+                {
+                    "$set": {
+                        "status": "closed",
+                    }
                 }
-            },
+            ),
+            return_document=ReturnDocument.AFTER,
         )
 
-        if result.modified_count < 0:
+        if not updated_course:
             return None
 
+        self.invalidate_course(course_id)
         self.logger.debug(f"[REPOSITORY] UPDATE: Course with ID: {course_id} closed")
-        updated_course = self.collection.find_one({"_id": ObjectId(course_id)})
         return updated_course
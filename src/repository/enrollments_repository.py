@@ -0,0 +1,130 @@
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+
+class EnrollmentsRepository:
+    # One document per (course_id, student_id). The unique index answers "is this student
+    # enrolled in this course" and "who is enrolled in this course", the reverse one
+    # answers "which courses is this student enrolled in" without scanning the courses.
+    INDEXES = {
+        "collection": [
+            IndexModel(
+                [("course_id", ASCENDING), ("student_id", ASCENDING)],
+                name="enrollments_course_student",
+                unique=True,
+            ),
+            IndexModel(
+                [("student_id", ASCENDING), ("course_id", ASCENDING)],
+                name="enrollments_student_course",
+            ),
+        ]
+    }
+    QUERY_SHAPES = {
+        "collection": [
+            ("students of a course", {"course_id": "course"}, None),
+            ("courses of a student", {"student_id": "student"}, None),
+        ]
+    }
+
+    def __init__(self, collection_enrollments, logger):
+        self.collection = collection_enrollments
+        self.logger = logger
+
+    def add_enrollment(self, course_id, student_id):
+        """
+        Idempotent: enrolling twice (a retried request, or the backfill running
+        over a dual-written enrollment) keeps a single document.
+        """
+        try:
+            self.collection.update_one(
+                {"course_id": str(course_id), "student_id": student_id},
+                {"$setOnInsert": {"enrolled_at": datetime.now()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Two concurrent upserts of the same pair, the other one already inserted it
+            pass
+
+        self.logger.debug(
+            f"[REPOSITORY] Enrollment of student {student_id} in course {course_id} saved"
+        )
+        return True
+
+    def create_enrollment(self, course_id, student_id):
+        """
+        Once the enrollments are read from this collection, the unique index is what
+        keeps a student from being enrolled twice. Returns False if they already were.
+        """
+        try:
+            self.collection.insert_one(
+                {
+                    "course_id": str(course_id),
+                    "student_id": student_id,
+                    "enrolled_at": datetime.now(),
+                }
+            )
+        except DuplicateKeyError:
+            return False
+
+        self.logger.debug(
+            f"[REPOSITORY] Enrollment of student {student_id} in course {course_id} created"
+        )
+        return True
+
+    def add_enrollments(self, course_id, student_ids):
+        # Used by the backfill, one round trip per course
+        if not student_ids:
+            return 0
+
+        operations = [
+            UpdateOne(
+                {"course_id": str(course_id), "student_id": student_id},
+                {"$setOnInsert": {"enrolled_at": datetime.now()}},
+                upsert=True,
+            )
+            for student_id in student_ids
+        ]
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def remove_enrollment(self, course_id, student_id):
+        result = self.collection.delete_one(
+            {"course_id": str(course_id), "student_id": student_id}
+        )
+        self.logger.debug(
+            f"[REPOSITORY] Enrollment of student {student_id} in course {course_id} removed"
+        )
+        return result.deleted_count > 0
+
+    def remove_enrollments(self, course_id, student_ids):
+        # Used by the backfill, for the students that left the course while it ran
+        result = self.collection.delete_many(
+            {"course_id": str(course_id), "student_id": {"$in": list(student_ids)}}
+        )
+        return result.deleted_count
+
+    def remove_course_enrollments(self, course_id):
+        result = self.collection.delete_many({"course_id": str(course_id)})
+        self.logger.debug(
+            f"[REPOSITORY] {result.deleted_count} enrollments of course {course_id} removed"
+        )
+        return result.deleted_count
+
+    def is_student_enrolled(self, course_id, student_id):
+        enrollment = self.collection.find_one(
+            {"course_id": str(course_id), "student_id": student_id}, {"_id": 1}
+        )
+        return enrollment is not None
+
+    def get_student_ids_by_course(self, course_id):
+        enrollments = self.collection.find(
+            {"course_id": str(course_id)}, {"_id": 0, "student_id": 1}
+        ).sort("student_id", ASCENDING)
+        return [enrollment["student_id"] for enrollment in enrollments]
+
+    def get_course_ids_by_student(self, student_id):
+        enrollments = self.collection.find(
+            {"student_id": student_id}, {"_id": 0, "course_id": 1}
+        ).sort("course_id", ASCENDING)
+        return [enrollment["course_id"] for enrollment in enrollments]
@@ -1,8 +1,29 @@
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 from models.feedback import FeedbackCourse, FeedbackStudent
 
 
 class FeedBackRepository:
+    # See repository.indexes
+    INDEXES = {
+        "collection_courses_feedback": [IndexModel([("course_id", ASCENDING)])],
+        "collection_students_feedback": [
+            IndexModel([("student_id", ASCENDING), ("course_id", ASCENDING)])
+        ],
+    }
+    QUERY_SHAPES = {
+        "collection_courses_feedback": [
+            ("feedback of a course", {"course_id": "course"}, None)
+        ],
+        "collection_students_feedback": [
+            (
+                "feedback of a student",
+                {"student_id": "student", "course_id": "course"},
+                None,
+            )
+        ],
+    }
+
     def __init__(
         self, collection_courses_feedback, collection_students_feedback, logger
     ):
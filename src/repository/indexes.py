@@ -0,0 +1,132 @@
+"""
+Index management. Every repository declares, by collection attribute, the indexes its
+queries need (INDEXES) and a sample of those queries (QUERY_SHAPES):
+
+    INDEXES = {"collection": [IndexModel([("creator_id", ASCENDING)])]}
+    QUERY_SHAPES = {"collection": [("owned courses", {"creator_id": "user"}, None)]}
+
+reconcile_indexes creates whatever is missing. It never drops an index, the ones that
+are not declared anymore are only reported. collscan_report explains every query shape
+and flags the ones that would still scan the whole collection.
+"""
+
+import threading
+from pymongo.errors import OperationFailure
+
+
+def declared_collections(repository):
+    """
+    Yields (collection, index_models, query_shapes) for every collection the repository declares.
+    """
+    indexes = getattr(repository, "INDEXES", {})
+    query_shapes = getattr(repository, "QUERY_SHAPES", {})
+
+    for attribute in sorted(set(indexes) | set(query_shapes)):
+        yield (
+            getattr(repository, attribute),
+            indexes.get(attribute, []),
+            query_shapes.get(attribute, []),
+        )
+
+
+def reconcile_indexes(repositories, logger):
+    """
+    Idempotent, can run on every startup. Returns, by collection name, the indexes
+    created, already existing, in conflict (same name, other spec) and not declared.
+    """
+    summary = {}
+
+    for repository in repositories:
+        for collection, index_models, _ in declared_collections(repository):
+            if not index_models:
+                continue
+
+            existing = collection.index_information()
+            result = summary.setdefault(
+                collection.name,
+                {"created": [], "existing": [], "conflicts": [], "undeclared": []},
+            )
+
+            declared_names = set()
+            for index_model in index_models:
+                name = index_model.document["name"]
+                declared_names.add(name)
+
+                if name in existing:
+                    result["existing"].append(name)
+                    continue
+
+                try:
+                    collection.create_indexes([index_model])
+                    result["created"].append(name)
+                    logger.info(f"[INDEXES] Created {name} on {collection.name}")
+                except OperationFailure as e:
+                    # Usually an index with the same keys and other options, it needs a manual fix
+                    result["conflicts"].append(name)
+                    logger.error(
+                        f"[INDEXES] Could not create {name} on {collection.name}: {e}"
+                    )
+
+            result["undeclared"] += [
+                name
+                for name in existing
+                if name != "_id_" and name not in declared_names
+            ]
+
+    return summary
+
+
+def reconcile_indexes_in_background(repositories, logger):
+    # Index builds don't block the collection, but they shouldn't hold the startup either
+    def run():
+        try:
+            reconcile_indexes(repositories, logger)
+        except Exception as e:
+            logger.error(f"[INDEXES] Reconciliation failed: {e}")
+
+    thread = threading.Thread(target=run, name="indexes-reconciler", daemon=True)
+    thread.start()
+    return thread
+
+
+def plan_stages(plan):
+    # Every stage name of an explained plan, whatever the plan format of the server version
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+def collscan_report(repositories, logger):
+    """
+    Returns the query shapes whose winning plan still scans the whole collection,
+    as dicts with the collection, the query name and its filter.
+    """
+    flagged = []
+
+    for repository in repositories:
+        for collection, _, query_shapes in declared_collections(repository):
+            for query_name, query_filter, sort in query_shapes:
+                cursor = collection.find(query_filter)
+                if sort:
+                    cursor = cursor.sort(sort)
+
+                winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+
+                if "COLLSCAN" in plan_stages(winning_plan):
+                    logger.warning(
+                        f"[INDEXES] '{query_name}' on {collection.name} scans the whole collection"
+                    )
+                    flagged.append(
+                        {
+                            "collection": collection.name,
+                            "query": query_name,
+                            "filter": str(query_filter),
+                        }
+                    )
+
+    return flagged
@@ -0,0 +1,156 @@
+"""
+Invalidation of the in-process caches (see repository.cache).
+
+Repositories publish (namespace, key) after writing, and each cache subscribes to
+the namespace of the documents it holds. Two backends:
+
+  - InProcessInvalidationBus: delivers to the caches of this process. Enough for a
+    single replica.
+  - ChangeStreamInvalidationBus: also watches the collections with a MongoDB change
+    stream, so writes made by any replica evict the keys here too. Change streams need
+    a replica set, a single node one is enough (mongod --replSet rs0, then rs.initiate()).
+"""
+
+import threading
+from collections import defaultdict
+from pymongo.errors import OperationFailure, PyMongoError
+
+COURSES = "courses"
+MODULES = "modules"
+USERS = "users"
+
+CHANGE_STREAM_RETRY_SECONDS = 1
+CHANGE_STREAM_MAX_AWAIT_TIME_MS = 1000
+
+
+class InProcessInvalidationBus:
+    def __init__(self, logger):
+        self.logger = logger
+        self._subscribers = defaultdict(list)
+
+    def subscribe(self, namespace, cache):
+        self._subscribers[namespace].append(cache)
+
+    def publish(self, namespace, key):
+        for cache in self._subscribers[namespace]:
+            cache.invalidate(str(key))
+
+    def clear(self, namespace=None):
+        namespaces = [namespace] if namespace else list(self._subscribers)
+        for name in namespaces:
+            for cache in self._subscribers[name]:
+                cache.clear()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def course_key(change):
+    return change["documentKey"]["_id"]
+
+
+def module_key(change):
+    # The modules document of a course is keyed by its course_id
+    return (change.get("fullDocument") or {}).get("course_id")
+
+
+def user_key(change):
+    return (change.get("fullDocument") or {}).get("student_id")
+
+
+class ChangeStreamInvalidationBus(InProcessInvalidationBus):
+    """
+    watched maps a collection name to (namespace, key_from_change). When the key can't be
+    told from the change (a delete of a document not keyed by _id) the whole namespace is cleared.
+
+    The stream resumes from the last token after an error. Changes may have been missed
+    meanwhile, so every cache is cleared before resuming.
+    """
+
+    def __init__(
+        self,
+        database,
+        watched,
+        logger,
+        retry_seconds=CHANGE_STREAM_RETRY_SECONDS,
+    ):
+        super().__init__(logger)
+        self.database = database
+        self.watched = watched
+        self.retry_seconds = retry_seconds
+        self.resume_token = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=self.retry_seconds * 2)
+
+    def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.watched)}}}]
+        return self.database.watch(
+            pipeline,
+            full_document="updateLookup",
+            resume_after=self.resume_token,
+            max_await_time_ms=CHANGE_STREAM_MAX_AWAIT_TIME_MS,
+        )
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with self._watch() as stream:
+                    while not self._stopped.is_set():
+                        change = stream.try_next()
+                        self.resume_token = stream.resume_token
+                        if change is not None:
+                            self.handle_change(change)
+
+                        # Closed by the server (an invalidate event), open a new one
+                        if not stream.alive:
+                            break
+            except PyMongoError as e:
+                if self._stopped.is_set():
+                    break
+
+                self.logger.error(f"[CACHE] Change stream interrupted: {e}")
+                self.clear()
+
+                if isinstance(e, OperationFailure):
+                    # The token is no longer in the oplog, start again from now
+                    self.resume_token = None
+
+                self._stopped.wait(self.retry_seconds)
+
+    def handle_change(self, change):
+        operation = change["operationType"]
+
+        if operation in ("invalidate", "dropDatabase"):
+            self.clear()
+            self.resume_token = None
+            return
+
+        collection_name = change.get("ns", {}).get("coll")
+        if collection_name not in self.watched:
+            return
+
+        namespace, key_from_change = self.watched[collection_name]
+        key = None if operation in ("drop", "rename") else key_from_change(change)
+
+        if key is None:
+            self.clear(namespace)
+        else:
+            self.publish(namespace, key)
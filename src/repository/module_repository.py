@@ -1,37 +1,103 @@
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 from models.module import Module
 from models.resource import Resource
+from repository.invalidation_bus import COURSES, MODULES
+from repository.versioning import (
+    VERSION_PROJECTION,
+    initial_version,
+    version_of,
+    with_version_bump,
+)
 
 
 class ModuleRepository:
-    def __init__(self, collection_modules_and_resources, collection_courses, logger):
+    # See repository.indexes
+    INDEXES = {"collection_modules": [IndexModel([("course_id", ASCENDING)])]}
+    QUERY_SHAPES = {
+        "collection_modules": [
+            ("modules of a course", {"course_id": ObjectId("0" * 24)}, None)
+        ]
+    }
+
+    def __init__(
+        self,
+        collection_modules_and_resources,
+        collection_courses,
+        logger,
+        cache=None,
+        invalidation_bus=None,
+    ):
         self.collection_modules = collection_modules_and_resources
         self.collection_courses = collection_courses
         self.logger = logger
-
-    def get_modules_from_course(self, course_id):
+        # Modules of a course by course_id (see repository.cache)
+        self.cache = cache
+        self.invalidation_bus = invalidation_bus
+
+    def _invalidate_modules(self, course_id):
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(MODULES, course_id)
+        elif self.cache:
+            self.cache.invalidate(str(course_id))
+
+    def _invalidate_course(self, course_id):
+        # The course documents we modify here are cached by CoursesRepository
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(COURSES, course_id)
+
+    def _get_modules_entry(self, course_id):
         """
-        Get all modules from a course.
+        {"modules", "version"} of a course, from the cache when it is on. The version is
+        cached with the modules and dropped with them, so a conditional request on a
+        cached course doesn't go to the database.
         """
+        if self.cache:
+            entry = self.cache.get(str(course_id))
+            if entry is not None:
+                return entry
+            generation = self.cache.generation()
 
         # Lets find all modules for the course
         course = self.collection_modules.find_one({"course_id": ObjectId(course_id)})
 
-        if not course:
+        if course:
+            self.logger.debug(
+                f"[MODULE REPOSITORY] Retrieved modules for course with ID: {course_id}"
+            )
+        else:
             self.logger.debug(
                 f"[MODULE REPOSITORY] Course with ID: {course_id} not found"
             )
-            return []
 
-        modules = course.get("modules", [])
+        entry = {
+            "modules": list(course.get("modules", [])) if course else [],
+            "version": version_of(course),
+        }
 
-        self.logger.debug(
-            f"[MODULE REPOSITORY] Retrieved modules for course with ID: {course_id}"
-        )
+        if self.cache:
+            self.cache.set(str(course_id), entry, generation)
 
-        self.logger.debug(f"[TYPE] {type(modules)} {type(self.collection_modules)}")
+        return entry
 
-        return list(modules)
+    def get_modules_version(self, course_id):
+        """
+        {"version", "updated_at"} of the modules of a course (their resources included),
+        None if the course has no modules yet.
+        """
+        if self.cache:
+            return self._get_modules_entry(course_id)["version"]
+
+        modules = self.collection_modules.find_one(
+            {"course_id": ObjectId(course_id)}, VERSION_PROJECTION
+        )
+        return version_of(modules)
+
+    def get_modules_from_course(self, course_id):
+        """
+        Get all modules from a course.
+        """
+        return self._get_modules_entry(course_id)["modules"]
 
     def add_module_to_course(self, course_id, module: Module):
 
@@ -44,7 +110,7 @@ class ModuleRepository:
             # If course exist, we update the module list
             self.collection_modules.update_one(
                 {"course_id": ObjectId(course_id)},
-                {"$addToSet": {"modules": module_as_dict}},
+                with_version_bump({"$addToSet": {"modules": module_as_dict}}),
             )
         else:
             # If course doesn't exist, we create it
@@ -52,14 +118,18 @@ class ModuleRepository:
                 {
                     "course_id": ObjectId(course_id),
                     "modules": [module_as_dict],
+                    **initial_version(),
                 }
             )
 
+        self._invalidate_modules(course_id)
+
         # We also update the course with the new module
         self.collection_courses.update_one(
             {"_id": ObjectId(course_id)},
-            {"$addToSet": {"modules": module_as_dict["_id"]}},
+            with_version_bump({"$addToSet": {"modules": module_as_dict["_id"]}}),
         )
+        self._invalidate_course(course_id)
 
         self.logger.debug(
             f"[MODULE REPOSITORY] Add module {module} to course {course_id}"
@@ -118,17 +188,20 @@ class ModuleRepository:
                     # Perform atomic swap using array filters
                     result = self.collection_modules.update_one(
                         {"course_id": course_id_obj},
-                        {
-                            "$set": {
-                                "modules.$[mod1].position": new_position,
-                                "modules.$[mod2].position": current_position,
+                        with_version_bump(
+                            {
+                                "$set": {
+                                    "modules.$[mod1].position": new_position,
+                                    "modules.$[mod2].position": current_position,
+                                }
                             }
-                        },
+                        ),
                         array_filters=[
                             {"mod1._id": module_id_obj},
                             {"mod2._id": swap_module["_id"]},
                         ],
                     )
+                    self._invalidate_modules(course_id)
                     self.logger.debug(
                         f"[MODULE REPOSITORY] Swapped positions between modules {module_id} and {swap_module['_id']}"
                     )
@@ -144,8 +217,9 @@ class ModuleRepository:
         if update_fields:
             result = self.collection_modules.update_one(
                 {"course_id": course_id_obj, "modules._id": module_id_obj},
-                {"$set": update_fields},
+                with_version_bump({"$set": update_fields}),
             )
+            self._invalidate_modules(course_id)
             self.logger.debug(
                 f"[MODULE REPOSITORY] Updated module {module_id} in course {course_id}: {update_fields}"
             )
@@ -167,7 +241,7 @@ class ModuleRepository:
 
         result = self.collection_modules.update_one(
             {"course_id": ObjectId(course_id)},
-            {"$pull": {"modules": {"_id": module_id}}},
+            with_version_bump({"$pull": {"modules": {"_id": module_id}}}),
         )
 
         if result.modified_count > 0:
@@ -177,15 +251,18 @@ class ModuleRepository:
                     "course_id": ObjectId(course_id),
                     "modules.position": {"$gt": pos_to_remove},
                 },
-                {"$inc": {"modules.$[elem].position": -1}},
+                with_version_bump({"$inc": {"modules.$[elem].position": -1}}),
                 array_filters=[{"elem.position": {"$gt": pos_to_remove}}],
             )
 
+        self._invalidate_modules(course_id)
+
         # Now, lets remove the module from the course
         self.collection_courses.update_one(
             {"_id": ObjectId(course_id)},
-            {"$pull": {"modules": module_id}},
+            with_version_bump({"$pull": {"modules": module_id}}),
         )
+        self._invalidate_course(course_id)
 
         self.logger.debug(
             f"[MODULE REPOSITORY] Deleted module {module_id} from course {course_id}"
@@ -277,8 +354,9 @@ class ModuleRepository:
 
         result = self.collection_modules.update_one(
             {"course_id": ObjectId(course_id), "modules._id": module_id},
-            {"$addToSet": {"modules.$.resources": resource_dict}},
+            with_version_bump({"$addToSet": {"modules.$.resources": resource_dict}}),
         )
+        self._invalidate_modules(course_id)
 
         if result.modified_count > 0:
             self.logger.debug(
@@ -304,7 +382,7 @@ class ModuleRepository:
 
         result = self.collection_modules.update_one(
             {"course_id": ObjectId(course_id), "modules._id": module_id},
-            {"$pull": {"modules.$.resources": {"_id": resource_id}}},
+            with_version_bump({"$pull": {"modules.$.resources": {"_id": resource_id}}}),
         )
 
         if result.modified_count > 0:
@@ -315,12 +393,15 @@ class ModuleRepository:
                     "modules._id": module_id,
                     "modules.resources.position": {"$gt": position_removed_resource},
                 },
-                {"$inc": {"modules.$[elem].resources.$[res].position": -1}},
+                with_version_bump(
+                    {"$inc": {"modules.$[elem].resources.$[res].position": -1}}
+                ),
                 array_filters=[
                     {"elem._id": module_id},
                     {"res.position": {"$gt": position_removed_resource}},
                 ],
             )
+            self._invalidate_modules(course_id)
 
             self.logger.debug(
                 f"[MODULE REPOSITORY] Resource {resource_id} deleted from module {module_id}"
@@ -0,0 +1,169 @@
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+# Fields of a submission document that belong to the Submission (see models.submission)
+SUBMISSION_FIELDS = {"_id": 0, "attachments": 1, "feedbacks": 1, "on_time": 1}
+SUBMISSION_PROJECTION = {**SUBMISSION_FIELDS, "task_id": 1, "student_id": 1}
+
+
+class SubmissionsRepository:
+    # One document per (task_id, student_id), instead of the submissions.<student_id> map
+    # embedded in every task. The unique index answers "the submission of this student"
+    # and "every submission of these tasks", the second one "what did this student submit
+    # in this course", which the embedded map can't index.
+    INDEXES = {
+        "collection": [
+            IndexModel(
+                [("task_id", ASCENDING), ("student_id", ASCENDING)],
+                name="submissions_task_student",
+                unique=True,
+            ),
+            IndexModel(
+                [("student_id", ASCENDING), ("course_id", ASCENDING)],
+                name="submissions_student_course",
+            ),
+        ]
+    }
+    QUERY_SHAPES = {
+        "collection": [
+            ("submissions of tasks", {"task_id": {"$in": ["task"]}}, None),
+            (
+                "submission of a student",
+                {"task_id": "task", "student_id": "student"},
+                None,
+            ),
+            (
+                "submissions of a student in a course",
+                {"student_id": "student", "course_id": "course"},
+                None,
+            ),
+        ]
+    }
+
+    def __init__(self, collection_submissions, logger):
+        self.collection = collection_submissions
+        self.logger = logger
+
+    def save_submission(self, task_id, course_id, student_id, submission):
+        """
+        Insert or replace the submission of the student, as submitting again replaces
+        the embedded one. submission is a Submission.to_dict().
+        """
+        query = {"task_id": str(task_id), "student_id": student_id}
+        update = {
+            "$set": {"course_id": course_id, **submission},
+            "$setOnInsert": {"submitted_at": datetime.now()},
+        }
+
+        try:
+            self.collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Two concurrent upserts of the same pair, the other one inserted it first
+            self.collection.update_one(query, update)
+
+        self.logger.debug(
+            f"[REPOSITORY] Submission of student {student_id} on task {task_id} saved"
+        )
+
+    def save_submissions(self, submissions):
+        """
+        Used by the backfill, submissions are (task_id, course_id, student_id, submission)
+        and are written in one round trip. Returns how many were new.
+
+        Only missing submissions are inserted: one already there was written by the dual
+        write after the backfill read the task, so it is newer than this copy.
+        """
+        operations = [
+            UpdateOne(
+                {"task_id": str(task_id), "student_id": student_id},
+                {
+                    "$setOnInsert": {
+                        "course_id": course_id,
+                        **submission,
+                        "submitted_at": datetime.now(),
+                    }
+                },
+                upsert=True,
+            )
+            for task_id, course_id, student_id, submission in submissions
+        ]
+        if not operations:
+            return 0
+
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def get_submission(self, task_id, student_id):
+        submission = self.collection.find_one(
+            {"task_id": str(task_id), "student_id": student_id}, SUBMISSION_PROJECTION
+        )
+        if submission:
+            del submission["task_id"], submission["student_id"]
+        return submission
+
+    def get_submissions_by_task_ids(self, task_ids):
+        # {task_id: {student_id: submission}}, the embedded layout, for a page of tasks at once
+        submissions_by_task = {}
+        if not task_ids:
+            return submissions_by_task
+
+        submissions = self.collection.find(
+            {"task_id": {"$in": [str(task_id) for task_id in task_ids]}},
+            SUBMISSION_PROJECTION,
+        )
+        for submission in submissions:
+            task_id = submission.pop("task_id")
+            student_id = submission.pop("student_id")
+            submissions_by_task.setdefault(task_id, {})[student_id] = submission
+
+        return submissions_by_task
+
+    def student_submission_lookup(self, student_id, as_field):
+        """
+        $lookup stage for aggregations over the tasks: as_field gets [the submission of the
+        student] through the unique (task_id, student_id) index, or [] without one.
+        """
+        return {
+            "$lookup": {
+                "from": self.collection.name,
+                "localField": "_id",
+                "foreignField": "task_id",
+                "pipeline": [
+                    {"$match": {"student_id": student_id}},
+                    {"$project": SUBMISSION_FIELDS},
+                ],
+                "as": as_field,
+            }
+        }
+
+    def get_task_ids_by_student(self, student_id, course_id=None):
+        query = {"student_id": student_id}
+        if course_id is not None:
+            query["course_id"] = course_id
+
+        submissions = self.collection.find(query, {"_id": 0, "task_id": 1})
+        return [submission["task_id"] for submission in submissions]
+
+    def set_feedback(self, task_id, student_id, corrector_id, feedback):
+        self.collection.update_one(
+            {"task_id": str(task_id), "student_id": student_id},
+            {"$set": {f"feedbacks.{corrector_id}": feedback}},
+        )
+
+    def unset_feedback(self, task_id, student_id, corrector_id):
+        self.collection.update_one(
+            {"task_id": str(task_id), "student_id": student_id},
+            {"$unset": {f"feedbacks.{corrector_id}": ""}},
+        )
+
+    def remove_task_submissions(self, task_id):
+        result = self.collection.delete_many({"task_id": str(task_id)})
+        return result.deleted_count
+
+    def remove_course_submissions(self, course_id):
+        result = self.collection.delete_many({"course_id": str(course_id)})
+        self.logger.debug(
+            f"[REPOSITORY] {result.deleted_count} submissions of course {course_id} removed"
+        )
+        return result.deleted_count
@@ -1,18 +1,212 @@
-from pymongo import ReturnDocument
+from itertools import islice
+from pymongo import ASCENDING, IndexModel, ReturnDocument
 from bson import ObjectId
 
 from models.submission import Submission
-from models.task import Task
+from models.task import Task, TaskStatus
+from utils import (
+    STREAM_DEFAULT_BATCH_SIZE,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+
+# Order of the task feeds, unique so the pages are stable and a cursor can resume them
+TASK_FEED_SORT = [("due_date", ASCENDING), ("_id", ASCENDING)]
+
+
+def task_filters(status=None, due_date=None, start_date=None, end_date=None):
+    # Filters of the task list endpoints, the dates are timestamps in ms
+    query = {}
+
+    if status:
+        query["status"] = status
+
+    # If exact due_date was passed:
+    if due_date:
+        query["due_date"] = due_date
+    # If a date range was passed:
+    elif start_date and end_date:
+        query["due_date"] = {"$gte": start_date, "$lte": end_date}
+
+    return query
+
+
+# Statuses of a task for a student, computed from their submission and the due date
+STUDENT_TASK_STATUSES = (TaskStatus.COMPLETED, TaskStatus.OVERDUE, TaskStatus.PENDING)
+
+# Only a non empty object is a submission, Task.from_dict drops null and {} entries
+HAS_SUBMISSION = {
+    "$gt": [{"$size": {"$objectToArray": {"$ifNull": ["$submission", {}]}}}, 0]
+}
+
+# Completed once submitted, overdue if the due date passed without a submission,
+# pending otherwise
+STUDENT_TASK_STATUS = {
+    "$switch": {
+        "branches": [
+            {"case": HAS_SUBMISSION, "then": TaskStatus.COMPLETED.value},
+            {
+                "case": {
+                    "$and": [
+                        {"$isNumber": "$due_date"},
+                        {"$gt": [{"$toLong": "$$NOW"}, "$due_date"]},
+                    ]
+                },
+                "then": TaskStatus.OVERDUE.value,
+            },
+        ],
+        "default": TaskStatus.PENDING.value,
+    }
+}
+
+
+def student_submission_projection(student_id):
+    # Every task field, but only this student's entry of the submissions map
+    projection = {field: 1 for field in Task.__slots__ if field != "submissions"}
+    projection[f"submissions.{student_id}"] = 1
+    return projection
+
+
+def after_task_cursor(cursor):
+    """
+    Filter of the tasks that come after the (due_date, _id) of the cursor in TASK_FEED_SORT.
+    Tasks without a due date sort first.
+    """
+    after = decode_cursor(cursor)
+    due_date = after.get("due_date")
+    # Tasks are stored with the string of their ObjectId as _id (see Task.to_dict)
+    last_id = after.get("_id")
+    if not isinstance(last_id, str) or not ObjectId.is_valid(last_id):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    if due_date is None:
+        return {
+            "$or": [
+                {"due_date": None, "_id": {"$gt": last_id}},
+                {"due_date": {"$ne": None}},
+            ]
+        }
+
+    return {
+        "$or": [
+            {"due_date": {"$gt": due_date}},
+            {"due_date": due_date, "_id": {"$gt": last_id}},
+        ]
+    }
+
+
+def next_task_cursor(tasks, limit):
+    # Cursor right after the last task of a page, None if the page wasn't full
+    if not tasks or len(tasks) < limit:
+        return None
+
+    return encode_cursor({"due_date": tasks[-1].due_date, "_id": str(tasks[-1]._id)})
 
 
 class TasksRepository:
-    def __init__(self, collection, logger):
+    # See repository.indexes
+    INDEXES = {
+        "collection": [
+            # Equality, sort, range: the feeds filter by course (and status), sort and
+            # page by (due_date, _id) and filter ranges of due_date. The $in over the
+            # courses is merged in order from the index, without a blocking sort.
+            IndexModel(
+                [("course_id", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)]
+            ),
+            IndexModel(
+                [
+                    ("course_id", ASCENDING),
+                    ("status", ASCENDING),
+                    ("due_date", ASCENDING),
+                    ("_id", ASCENDING),
+                ]
+            ),
+        ]
+    }
+    QUERY_SHAPES = {
+        "collection": [
+            ("tasks of courses", {"course_id": {"$in": ["course"]}}, TASK_FEED_SORT),
+            (
+                "tasks of courses by due date",
+                {"course_id": {"$in": ["course"]}, "due_date": {"$gte": 0}},
+                TASK_FEED_SORT,
+            ),
+            (
+                "tasks of courses by status",
+                {"course_id": {"$in": ["course"]}, "status": "open"},
+                TASK_FEED_SORT,
+            ),
+            (
+                "completed tasks of a course",
+                {"course_id": "course", "status": "completed"},
+                None,
+            ),
+        ]
+    }
+
+    def __init__(
+        self,
+        collection,
+        logger,
+        collection_courses=None,
+        submissions_repository=None,
+        read_submissions_from_collection=False,
+    ):
         self.collection = collection
         self.logger = logger
+        # Only needed by get_tasks_by_teacher, which starts from the teacher's courses
+        self.collection_courses = collection_courses
+        # While migrating, every submission is written both to the submissions map of the
+        # task and to the submissions collection. Once it is backfilled (see
+        # migrations.backfill_submissions) the collection is the only store: the tasks
+        # are read without their map, get the submissions of the collection instead and
+        # the map is no longer written.
+        self.submissions_repository = submissions_repository
+        self.read_submissions_from_collection = (
+            submissions_repository is not None and read_submissions_from_collection
+        )
+
+    def _find(self, query):
+        if self.read_submissions_from_collection:
+            return self.collection.find(query, {"submissions": 0})
+        return self.collection.find(query)
+
+    def _find_one(self, query):
+        if self.read_submissions_from_collection:
+            return self.collection.find_one(query, {"submissions": 0})
+        return self.collection.find_one(query)
+
+    def _tasks_from_documents(self, documents):
+        documents = [document for document in documents if document is not None]
+
+        if self.read_submissions_from_collection and documents:
+            # One query for the submissions of the whole page
+            submissions = self.submissions_repository.get_submissions_by_task_ids(
+                [document["_id"] for document in documents]
+            )
+            for document in documents:
+                document["submissions"] = submissions.get(str(document["_id"]), {})
+
+        return [Task.from_dict(document) for document in documents]
+
+    def _iter_tasks(self, documents, batch_size):
+        if not self.read_submissions_from_collection:
+            return (Task.from_dict(task) for task in documents if task is not None)
+
+        def batches():
+            iterator = iter(documents)
+            while batch := list(islice(iterator, batch_size)):
+                yield from self._tasks_from_documents(batch)
+
+        return batches()
 
     def create_task(self, task: Task):
         try:
-            result = self.collection.insert_one(task.to_dict())
+            document = task.to_dict()
+            if self.read_submissions_from_collection:
+                del document["submissions"]
+            result = self.collection.insert_one(document)
             self.logger.debug(
                 f"[TASKS][REPOSITORY] Task created with id: {result.inserted_id}"
             )
@@ -23,8 +217,8 @@ class TasksRepository:
 
     def get_task_by_id(self, task_id: str):
         try:
-            task = self.collection.find_one({"_id": task_id})
-            return Task.from_dict(task) if task else None
+            task = self._find_one({"_id": task_id})
+            return self._tasks_from_documents([task])[0] if task else None
         except Exception as e:
             self.logger.error(
                 f"[TASKS][REPOSITORY] Error getting task {task_id}: {str(e)}"
@@ -34,6 +228,8 @@ class TasksRepository:
     def delete_task(self, task_id: str):
         try:
             result = self.collection.delete_one({"_id": task_id})
+            if result.deleted_count > 0 and self.submissions_repository:
+                self.submissions_repository.remove_task_submissions(task_id)
             return result.deleted_count > 0
         except Exception as e:
             self.logger.error(
@@ -43,93 +239,260 @@ class TasksRepository:
 
     def get_tasks_by_query(self, query: dict):
         try:
-            tasks = self.collection.find(query)
-            return [Task.from_dict(task) for task in tasks if task is not None]
+            return self._tasks_from_documents(self._find(query))
         except Exception as e:
             self.logger.error(
                 f"[TASKS][REPOSITORY] Error getting tasks by query: {str(e)}"
             )
             raise e
 
+    def iter_tasks_by_query(self, query: dict, batch_size=STREAM_DEFAULT_BATCH_SIZE):
+        # Lazy version of get_tasks_by_query, the tasks are built as they are read
+        tasks = self._find(query).batch_size(batch_size)
+        return self._iter_tasks(tasks, batch_size)
+
     def get_task_with_submission_for_student(self, task_id, student_id):
         query = {"_id": task_id}
-        task = self.get_tasks_by_query(query)[0]
-        if not task:
-            return None
 
-        # Filter submissions to have only the student_id
-        filtered_submissions = {}
-        if student_id in task.submissions:
-            filtered_submissions[student_id] = task.submissions[student_id]
+        if self.read_submissions_from_collection:
+            # Only this student's submission is read
+            task = self._find_one(query)
+            if not task:
+                return None
 
-        task.submissions = filtered_submissions
+            submission = self.submissions_repository.get_submission(task_id, student_id)
+            task["submissions"] = {student_id: submission} if submission else {}
+            return Task.from_dict(task)
 
-        return task
+        # The server drops the other students' submissions
+        task = self.collection.find_one(query, student_submission_projection(student_id))
+        return Task.from_dict(task) if task else None
 
     def add_task_submission(self, task_id, student_id, attachments: list[dict], on_time):
 
         submission = Submission(attachments=attachments, feedbacks=None, on_time=on_time)
 
-        update_result = self.collection.update_one(
+        if self.read_submissions_from_collection:
+            task = self._find_one({"_id": task_id})
+            if task is None:
+                raise ValueError("Task not found")
+
+            self.submissions_repository.save_submission(
+                task_id, task.get("course_id"), student_id, submission.to_dict()
+            )
+            self.logger.info(
+                f"[TASKS][REPOSITORY] Submission recorded for student {student_id} on task {task_id}"
+            )
+            task["submissions"] = {student_id: submission.to_dict()}
+            return Task.from_dict(task)
+
+        # The task comes back with the write, with only this student's submission
+        task = self.collection.find_one_and_update(
             {"_id": task_id},
             {"$set": {f"submissions.{student_id}": submission.to_dict()}},
+            projection=student_submission_projection(student_id),
+            return_document=ReturnDocument.AFTER,
         )
 
-        if update_result.matched_count == 0:
+        if task is None:
             raise ValueError("Task not found")
 
+        if self.submissions_repository:
+            self.submissions_repository.save_submission(
+                task_id, task.get("course_id"), student_id, submission.to_dict()
+            )
+
         self.logger.info(
             f"[TASKS][REPOSITORY] Submission recorded for student {student_id} on task {task_id}"
         )
 
-        task = self.get_task_with_submission_for_student(task_id, student_id)
-        return task
+        return Task.from_dict(task)
 
-    def get_tasks_by_course_ids(
+    def get_student_tasks_by_course_ids(
         self,
         course_ids,
+        student_id,
+        student_status=None,
         status=None,
         due_date=None,
         start_date=None,
         end_date=None,
         page=1,
         limit=10,
+        cursor=None,
     ):
-        query = {"course_id": {"$in": course_ids}}
+        """
+        Tasks of the courses as the student sees them: status is their STUDENT_TASK_STATUSES
+        one and submissions only holds their own submission, both computed by the server.
+        student_status filters on that computed status before the page is cut, so a page of
+        pending tasks is full even when most tasks are completed. status still filters the
+        stored status of the task.
+
+        Sorted in TASK_FEED_SORT order. With a cursor (see next_task_cursor) the page starts
+        right after it and page is ignored, so deep pages cost the same as the first one.
+        "" is the first page.
+        """
+        query = {
+            "course_id": {"$in": course_ids},
+            **task_filters(status, due_date, start_date, end_date),
+        }
+        if cursor:
+            query.update(after_task_cursor(cursor))
+        skip = 0 if cursor is not None else (page - 1) * limit
 
-        if status:
-            query["status"] = status
+        pipeline = [{"$match": query}, {"$sort": dict(TASK_FEED_SORT)}]
 
-        # If exact due_date was passed:
-        if due_date:
-            query["due_date"] = due_date
-        # If a date range was passed:
-        elif start_date and end_date:
-            date_range = {}
-            if start_date:
-                date_range["$gte"] = start_date  # timestamp in ms
-            if end_date:
-                date_range["$lte"] = end_date
-            query["due_date"] = date_range
+        if self.read_submissions_from_collection:
+            pipeline += [
+                self.submissions_repository.student_submission_lookup(
+                    student_id, "submission"
+                ),
+                {"$set": {"submission": {"$first": "$submission"}}},
+            ]
+        else:
+            pipeline.append(
+                {
+                    "$set": {
+                        "submission": {
+                            "$getField": {
+                                "field": {"$literal": student_id},
+                                "input": {"$ifNull": ["$submissions", {}]},
+                            }
+                        }
+                    }
+                }
+            )
 
-        skip = (page - 1) * limit
+        pipeline.append(
+            {
+                "$set": {
+                    "status": STUDENT_TASK_STATUS,
+                    "submissions": {
+                        "$cond": [
+                            HAS_SUBMISSION,
+                            {
+                                "$arrayToObject": [
+                                    [{"k": {"$literal": student_id}, "v": "$submission"}]
+                                ]
+                            },
+                            {},
+                        ]
+                    },
+                }
+            }
+        )
+        if student_status:
+            pipeline.append({"$match": {"status": student_status}})
+        pipeline.append({"$unset": "submission"})
+        if skip:
+            pipeline.append({"$skip": skip})
+        pipeline.append({"$limit": limit})
+
+        return [Task.from_dict(task) for task in self.collection.aggregate(pipeline)]
+
+    def get_tasks_by_teacher(
+        self,
+        teacher_id,
+        status=None,
+        due_date=None,
+        start_date=None,
+        end_date=None,
+        page=1,
+        limit=10,
+        cursor=None,
+    ):
+        """
+        Tasks of the courses the teacher created or assists, in one aggregation: the
+        course ids come from the (creator_id, _id) and (assistants, _id) indexes and each
+        course joins its tasks through the (course_id, due_date, _id) index. Sorted and
+        paged like get_student_tasks_by_course_ids.
+        """
+        task_query = task_filters(status, due_date, start_date, end_date)
+        if cursor:
+            task_query.update(after_task_cursor(cursor))
+        skip = 0 if cursor is not None else (page - 1) * limit
 
-        tasks = list(self.collection.find(query).skip(skip).limit(limit))
+        task_pipeline = [{"$match": task_query}]
+        if self.read_submissions_from_collection:
+            task_pipeline.append({"$project": {"submissions": 0}})
 
-        return [Task.from_dict(t) for t in tasks]
+        pipeline = [
+            {"$match": {"$or": [{"creator_id": teacher_id}, {"assistants": teacher_id}]}},
+            # Tasks reference their course by the string of its _id
+            {"$project": {"_id": 0, "course_id": {"$toString": "$_id"}}},
+            {
+                "$lookup": {
+                    "from": self.collection.name,
+                    "localField": "course_id",
+                    "foreignField": "course_id",
+                    "pipeline": task_pipeline,
+                    "as": "task",
+                }
+            },
+            {"$unwind": "$task"},
+            {"$replaceRoot": {"newRoot": "$task"}},
+            {"$sort": dict(TASK_FEED_SORT)},
+        ]
+        if skip:
+            pipeline.append({"$skip": skip})
+        pipeline.append({"$limit": limit})
+
+        tasks = self.collection_courses.aggregate(pipeline)
+        return self._tasks_from_documents(tasks)
 
     def update_task(self, task_id: str, update_data: dict):
+        # The updated task, None if it doesn't exist
         try:
+            projection = (
+                {"submissions": 0} if self.read_submissions_from_collection else None
+            )
             updated_task = self.collection.find_one_and_update(
-                {"_id": task_id}, update_data, return_document=ReturnDocument.AFTER
+                {"_id": task_id},
+                update_data,
+                projection=projection,
+                return_document=ReturnDocument.AFTER,
             )
-            return Task.from_dict(updated_task)
+            return self._tasks_from_documents([updated_task])[0] if updated_task else None
         except Exception as e:
             self.logger.error(
                 f"[TASKS][REPOSITORY] Error updating task {task_id}: {str(e)}"
             )
             raise e
 
+    def set_submission_feedback(self, task_id, student_id, corrector_id, feedback):
+        """
+        Add or replace the feedback of corrector_id on the submission of the student.
+        feedback is a Feedback.to_dict(). Returns the updated task, None if it doesn't exist.
+        """
+        if self.read_submissions_from_collection:
+            self.submissions_repository.set_feedback(
+                task_id, student_id, corrector_id, feedback
+            )
+            return self.get_task_by_id(task_id)
+
+        task = self.update_task(
+            task_id,
+            {"$set": {f"submissions.{student_id}.feedbacks.{corrector_id}": feedback}},
+        )
+        if task and self.submissions_repository:
+            self.submissions_repository.set_feedback(
+                task_id, student_id, corrector_id, feedback
+            )
+        return task
+
+    def unset_submission_feedback(self, task_id, student_id, corrector_id):
+        if self.read_submissions_from_collection:
+            self.submissions_repository.unset_feedback(task_id, student_id, corrector_id)
+            return self.get_task_by_id(task_id)
+
+        task = self.update_task(
+            task_id,
+            {"$unset": {f"submissions.{student_id}.feedbacks.{corrector_id}": ""}},
+        )
+        if task and self.submissions_repository:
+            self.submissions_repository.unset_feedback(task_id, student_id, corrector_id)
+        return task
+
     def get_tasks_done_by_student(self, student_id: str, course_id: str = None):
         """
         Get all tasks done by a student for a certain course.
@@ -139,22 +502,43 @@ class TasksRepository:
         then search submittions with status completed
         """
 
-        query = {
-            "course_id": course_id,
-            "status": "completed",
-            # Now search on submissions (dictionary) contains the # student_id as key
-            "submissions": {"$exists": True, "$ne": {}},
-            "submissions." + student_id: {"$exists": True},
-        }
+        if self.read_submissions_from_collection:
+            # From the (student_id, course_id) index of the submissions instead of the
+            # submissions.<student_id> path, which can't be indexed
+            task_ids = self.submissions_repository.get_task_ids_by_student(
+                student_id, course_id
+            )
+            query = {
+                "_id": {"$in": task_ids},
+                "course_id": course_id,
+                "status": "completed",
+            }
+        else:
+            query = {
+                "course_id": course_id,
+                "status": "completed",
+                # Now search on submissions (dictionary) contains the # student_id as key
+                "submissions": {"$exists": True, "$ne": {}},
+                "submissions." + student_id: {"$exists": True},
+            }
 
-        task = self.collection.find(query)
+        return self._tasks_from_documents(self._find(query))
 
-        return [Task.from_dict(t) for t in task if t is not None]
+    def reset_tasks_for_course(self, course_id):
+        """
+        Every task of the course back to inactive and without submissions, in one
+        update. Returns how many tasks were reset.
+        """
+        if self.read_submissions_from_collection:
+            # Tasks the migration didn't reach yet lose their stale map too
+            update = {"$set": {"status": "inactive"}, "$unset": {"submissions": ""}}
+        else:
+            update = {"$set": {"status": "inactive", "submissions": {}}}
 
-    def clean_task(self, task_id):
-        self.collection.update_one(
-            {
-                "_id": str(task_id),
-            },
-            {"$set": {"status": "inactive", "submissions": {}}},
+        result = self.collection.update_many({"course_id": str(course_id)}, update)
+        self.logger.debug(
+            f"[TASKS][REPOSITORY] {result.modified_count} tasks of course {course_id} reset"
         )
+        if self.submissions_repository:
+            self.submissions_repository.remove_course_submissions(course_id)
+        return result.modified_count
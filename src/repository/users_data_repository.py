@@ -1,12 +1,57 @@
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 from headers import MISSING_FIELDS
+from repository.invalidation_bus import USERS
 
 
 class UsersDataRepository:
-    def __init__(self, collection_users, user_approved_courses_collection, logger):
+    # See repository.indexes
+    INDEXES = {
+        "collection": [IndexModel([("student_id", ASCENDING)], unique=True)],
+        "user_approved_courses_collection": [IndexModel([("student_id", ASCENDING)])],
+    }
+    QUERY_SHAPES = {
+        "collection": [("user data", {"student_id": "student"}, None)],
+        "user_approved_courses_collection": [
+            ("approved courses", {"student_id": "student"}, None)
+        ],
+    }
+
+    def __init__(
+        self,
+        collection_users,
+        user_approved_courses_collection,
+        logger,
+        cache=None,
+        invalidation_bus=None,
+    ):
         self.collection = collection_users
         self.user_approved_courses_collection = user_approved_courses_collection
         self.logger = logger
+        # Users documents by student_id, they hold the assistant permissions (see repository.cache)
+        self.cache = cache
+        self.invalidation_bus = invalidation_bus
+
+    def _invalidate_user(self, student_id):
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(USERS, student_id)
+        elif self.cache:
+            self.cache.invalidate(str(student_id))
+
+    def _get_user(self, student_id):
+        # Read-through for the permission checks, done on almost every request of an assistant
+        if not self.cache:
+            return self.collection.find_one({"student_id": student_id})
+
+        user = self.cache.get(str(student_id))
+        if user:
+            return user
+
+        generation = self.cache.generation()
+        user = self.collection.find_one({"student_id": student_id})
+        if user:
+            self.cache.set(str(student_id), user, generation)
+        return user
 
     # This function will set a favourite course for a certain user
     def set_favourite_course(self, course_id, student_id):
@@ -28,6 +73,8 @@ class UsersDataRepository:
                 {"$addToSet": {"favourite_courses": course_id}},
             )
 
+        self._invalidate_user(student_id)
+
         self.logger.debug(
             f"[REPOSITORY] Course with ID: {course_id} set as favourite for student with ID: {student_id}"
         )
@@ -60,6 +107,7 @@ class UsersDataRepository:
             {"student_id": student_id},
             {"$pull": {"favourite_courses": course_id}},
         )
+        self._invalidate_user(student_id)
 
         self.logger.debug(
             f"[REPOSITORY] Course with ID: {course_id} removed from favourites for student with ID: {student_id}"
@@ -209,7 +257,7 @@ class UsersDataRepository:
             f"[REPOSITORY] Checking if assistant with ID: {assistant_id} is in course with ID: {course_id}"
         )
 
-        user = self.collection.find_one({"student_id": assistant_id})
+        user = self._get_user(assistant_id)
 
         if not user:
             self.logger.debug(
@@ -254,6 +302,8 @@ class UsersDataRepository:
                 {"$set": {f"assistant.{course_id}": perms_as_dict}},
             )
 
+        self._invalidate_user(assistant_id)
+
     def get_assistant_permissions_for_course(self, course_id, assistant_id):
         """
         Get the assistant permissions for a course.
@@ -262,7 +312,7 @@ class UsersDataRepository:
             f"[REPOSITORY] Getting assistant permissions for course with ID: {course_id} and assistant with ID: {assistant_id}"
         )
 
-        user = self.collection.find_one({"student_id": assistant_id})
+        user = self._get_user(assistant_id)
 
         if not user:
             self.logger.debug(
@@ -304,6 +354,7 @@ class UsersDataRepository:
             {"student_id": assistant_id},
             {"$set": {f"assistant.{course_id}": perms_as_dict}},
         )
+        self._invalidate_user(assistant_id)
 
         self.logger.debug(
             f"[REPOSITORY] Assistant permissions for course with ID: {course_id} and assistant with ID: {assistant_id} updated"
@@ -322,6 +373,7 @@ class UsersDataRepository:
         update_result = self.collection.update_one(
             {"student_id": assistant_id}, {"$unset": {f"assistant.{course_id}": ""}}
         )
+        self._invalidate_user(assistant_id)
 
         return update_result.modified_count > 0
 
@@ -333,7 +385,7 @@ class UsersDataRepository:
             f"[REPOSITORY] Checking if assistant with ID: {assistant_id} has permissions for course with ID: {course_id}"
         )
 
-        user = self.collection.find_one({"student_id": assistant_id})
+        user = self._get_user(assistant_id)
 
         if not user:
             self.logger.debug(
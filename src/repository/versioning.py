@@ -0,0 +1,53 @@
+"""
+Course and modules documents carry a version, increased by every write, and the
+updated_at date of that write. They are the ETag and Last-Modified of the responses
+(see endpoints.conditional). Documents written before versioning have neither, their
+version is 0 until the next write.
+"""
+
+from datetime import datetime, timezone
+
+VERSION_PROJECTION = {"_id": 0, "version": 1, "updated_at": 1}
+
+
+def initial_version():
+    # For the documents we insert
+    return {"version": 1, "updated_at": datetime.now(timezone.utc)}
+
+
+def with_version_bump(update):
+    """
+    Add the version increase to an update document. updated_at takes the date of the server.
+    """
+    return {
+        **update,
+        "$inc": {**update.get("$inc", {}), "version": 1},
+        "$currentDate": {**update.get("$currentDate", {}), "updated_at": True},
+    }
+
+
+def pipeline_with_version_bump(pipeline):
+    """
+    with_version_bump for pipeline updates, which take stages instead of operators.
+    updated_at is also the date of the server.
+    """
+    return [
+        *pipeline,
+        {
+            "$set": {
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+                "updated_at": "$$NOW",
+            }
+        },
+    ]
+
+
+def version_of(document):
+    # {"version", "updated_at"} of a (possibly projected) document, None if there is no document
+    if not document:
+        return None
+
+    return {
+        "version": document.get("version", 0),
+        "updated_at": document.get("updated_at"),
+    }
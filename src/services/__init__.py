@@ -13,7 +13,35 @@ load_dotenv()
 import logging
 import os
 from pymongo import MongoClient
+from repository.cache import (
+    CACHE_DEFAULT_MAX_ENTRIES,
+    CACHE_DEFAULT_TTL_SECONDS,
+    LRUCache,
+)
+from repository.catalog_facets_repository import (
+    CATALOG_FACETS_DEFAULT_MAX_AGE_SECONDS,
+    CATALOG_FACETS_DEFAULT_REFRESH_SECONDS,
+    CatalogFacetsRefresher,
+    CatalogFacetsRepository,
+)
 from repository.courses_repository import CoursesRepository
+from repository.invalidation_bus import (
+    COURSES,
+    MODULES,
+    USERS,
+    ChangeStreamInvalidationBus,
+    InProcessInvalidationBus,
+    course_key,
+    module_key,
+    user_key,
+)
+from repository.enrollments_repository import EnrollmentsRepository
+from repository.indexes import reconcile_indexes_in_background
+from repository.submissions_repository import SubmissionsRepository
+from repository.attachment_storage import (
+    GCSAttachmentStorage,
+    LocalAttachmentStorage,
+)
 from repository.users_data_repository import UsersDataRepository
 from services.users_data_service import UsersDataService
 from .course_service import CourseService
@@ -43,32 +71,177 @@ collection_approved_courses_students = db[
     os.getenv("APPROVED_COURSES_STUDENTS_COLLECTION_NAME")
 ]
 
-# Indexes for courses will be the student id.
-collection_users_data.create_index(["student_id"], unique=True)
+collection_enrollments = db[os.getenv("ENROLLMENTS_COLLECTION_NAME", "enrollments")]
+
+collection_submissions = db[os.getenv("SUBMISSIONS_COLLECTION_NAME", "submissions")]
+
+collection_catalog_facets = db[
+    os.getenv("CATALOG_FACETS_COLLECTION_NAME", "catalog_facets")
+]
+
+""" CACHES """
+
+# "in_process" only sees the writes of this replica, with more than one replica
+# use "change_stream" (needs MongoDB running as a replica set).
+cache_invalidation_backend = os.getenv("CACHE_INVALIDATION_BACKEND", "in_process")
+
+if cache_invalidation_backend == "change_stream":
+    invalidation_bus = ChangeStreamInvalidationBus(
+        db,
+        {
+            collection_courses_data.name: (COURSES, course_key),
+            collection_modules_and_resources.name: (MODULES, module_key),
+            collection_users_data.name: (USERS, user_key),
+        },
+        logger,
+    )
+else:
+    invalidation_bus = InProcessInvalidationBus(logger)
+
+
+def cache_from_env(prefix, default_max_entries=CACHE_DEFAULT_MAX_ENTRIES):
+    # <prefix>_CACHE_MAX_ENTRIES=0 disables the cache
+    max_entries = int(os.getenv(f"{prefix}_CACHE_MAX_ENTRIES", default_max_entries))
+    if max_entries <= 0:
+        return None
+
+    return LRUCache(
+        max_entries=max_entries,
+        ttl_seconds=float(
+            os.getenv(f"{prefix}_CACHE_TTL_SECONDS", CACHE_DEFAULT_TTL_SECONDS)
+        ),
+    )
+
+
+# The caches are only on by default when every replica hears about the changes. With
+# the in_process bus another replica would keep serving (and validating the ETags of)
+# the permissions, courses and modules it cached until they expire.
+cache_default_max_entries = (
+    CACHE_DEFAULT_MAX_ENTRIES if cache_invalidation_backend == "change_stream" else 0
+)
+
+# Course documents are read on almost every request and rarely written.
+courses_cache = cache_from_env("COURSES", cache_default_max_entries)
+modules_cache = cache_from_env("MODULES", cache_default_max_entries)
+users_cache = cache_from_env("USERS", cache_default_max_entries)
+
+caches = {COURSES: courses_cache, MODULES: modules_cache, USERS: users_cache}
+for namespace, cache in caches.items():
+    if cache:
+        invalidation_bus.subscribe(namespace, cache)
+
+invalidation_bus.start()
 
 """ REPOSITORY CREATION """
 
 repository_users_data = UsersDataRepository(
-    collection_users_data, collection_approved_courses_students, logger
+    collection_users_data,
+    collection_approved_courses_students,
+    logger,
+    cache=users_cache,
+    invalidation_bus=invalidation_bus,
 )
 
 repository_feedbacks = FeedBackRepository(
     collection_feedback_courses, collection_feedback_students, logger
 )
 
-repository_tasks = TasksRepository(collection_tasks, logger)
+repository_submissions = SubmissionsRepository(collection_submissions, logger)
+
+repository_tasks = TasksRepository(
+    collection_tasks,
+    logger,
+    collection_courses=collection_courses_data,
+    submissions_repository=repository_submissions,
+    # Only once the submissions were backfilled (see migrations.backfill_submissions)
+    read_submissions_from_collection=os.getenv(
+        "SUBMISSIONS_READ_FROM_COLLECTION", "false"
+    ).lower()
+    == "true",
+)
+
+repository_enrollments = EnrollmentsRepository(collection_enrollments, logger)
 
 repository_courses_data = CoursesRepository(
-    collection_courses_data, repository_tasks, logger
+    collection_courses_data,
+    repository_tasks,
+    logger,
+    search_max_time_ms=int(os.getenv("COURSES_SEARCH_MAX_TIME_MS", 2000)),
+    enrollment_repository=repository_enrollments,
+    # Only once the enrollments were backfilled (see migrations.backfill_enrollments)
+    read_enrollments_from_collection=os.getenv(
+        "ENROLLMENTS_READ_FROM_COLLECTION", "false"
+    ).lower()
+    == "true",
+    cache=courses_cache,
+    invalidation_bus=invalidation_bus,
 )
 
 repository_modules_and_resources = ModuleRepository(
-    collection_modules_and_resources, collection_courses_data, logger
+    collection_modules_and_resources,
+    collection_courses_data,
+    logger,
+    cache=modules_cache,
+    invalidation_bus=invalidation_bus,
 )
 
+repository_catalog_facets = CatalogFacetsRepository(
+    collection_courses_data, collection_catalog_facets, logger
+)
+
+# Course writes mark the facets stale, the refresher recomputes them in the background
+if os.getenv("CATALOG_FACETS_REFRESH_ENABLED", "true").lower() == "true":
+    catalog_facets_refresher = CatalogFacetsRefresher(
+        repository_catalog_facets,
+        logger,
+        refresh_seconds=float(
+            os.getenv(
+                "CATALOG_FACETS_REFRESH_SECONDS", CATALOG_FACETS_DEFAULT_REFRESH_SECONDS
+            )
+        ),
+        max_age_seconds=float(
+            os.getenv(
+                "CATALOG_FACETS_MAX_AGE_SECONDS", CATALOG_FACETS_DEFAULT_MAX_AGE_SECONDS
+            )
+        ),
+    )
+    invalidation_bus.subscribe(COURSES, catalog_facets_refresher)
+    catalog_facets_refresher.start()
+
+# Every repository declares the indexes of its queries (see repository.indexes)
+repositories = [
+    repository_users_data,
+    repository_feedbacks,
+    repository_tasks,
+    repository_submissions,
+    repository_enrollments,
+    repository_courses_data,
+    repository_modules_and_resources,
+]
+
+if os.getenv("INDEXES_RECONCILE_ON_STARTUP", "true").lower() == "true":
+    reconcile_indexes_in_background(repositories, logger)
+
+""" ATTACHMENTS """
+
+# "gcs" uploads to GCS_BUCKET_NAME, "local" to a directory (tests, offline deployments)
+if os.getenv("ATTACHMENT_STORAGE_BACKEND", "gcs") == "local":
+    attachment_storage = LocalAttachmentStorage(
+        os.getenv("ATTACHMENT_STORAGE_DIRECTORY", "attachments"),
+        logger,
+        base_url=os.getenv("ATTACHMENT_STORAGE_BASE_URL"),
+    )
+else:
+    attachment_storage = GCSAttachmentStorage(
+        os.getenv("GOOGLE_CREDENTIALS_JSON"), os.getenv("GCS_BUCKET_NAME"), logger
+    )
 
 """ SERVICE CREATION """
-service_courses = CourseService(repository_courses_data, logger)
+service_courses = CourseService(
+    repository_courses_data,
+    logger,
+    catalog_facets_repository=repository_catalog_facets,
+)
 
 # Service users requires the course service to check if the course exists and other checks
 service_users = UsersDataService(repository_users_data, service_courses, logger)
@@ -79,7 +252,12 @@ service_feedbacks = FeedbackService(
 )
 
 service_tasks = TaskService(
-    repository_tasks, service_courses, service_users, repository_courses_data, logger
+    repository_tasks,
+    service_courses,
+    service_users,
+    repository_courses_data,
+    logger,
+    attachment_storage=attachment_storage,
 )
 
 service_enrollment = EnrollmentService(
@@ -1,61 +1,74 @@
+from pymongo.errors import ExecutionTimeout
+
 from headers import (
     ASSISTANT_ADDED,
     ASSISTANT_REMOVED,
     COURSE_CREATED,
     COURSE_DELETED,
-    COURSE_IS_FULL,
+    COURSES_IMPORTED,
+    COURSES_NOT_IMPORTED,
+    COURSES_PARTIALLY_IMPORTED,
     COURSE_NOT_FOUND,
+    COURSE_NOT_IMPORTED,
     INTERNAL_SERVER_ERROR,
+    INVALID_COURSE,
+    INVALID_CURSOR,
     MISSING_FIELDS,
     MODULE_CREATED,
     MODULE_MODIFIED,
+    SEARCH_TIMEOUT,
     UNAUTHORIZED,
-    USER_HAS_NOT_ENOUGH_CORRELATIVES_APPROVED_TO_ENROLL,
     USER_IS_ALREADY_AN_ASSISTANT,
     USER_NOT_ALLOWED_TO_ADD_ASSISTANT,
     USER_NOT_AN_ASSISTANT,
 )
 from error.error import error_generator
-from models.course import Course
+from models.course import Course, course_response_from_dict, course_summary_from_dict
 from models.module import Module
 from repository.courses_repository import CoursesRepository
+from utils import (
+    STREAM_DEFAULT_BATCH_SIZE,
+    InvalidCursorError,
+    next_page_cursor,
+    non_empty_iterator,
+)
 
-
-class CourseService:
-    def __init__(self, course_repository: CoursesRepository, course_logger):
-        self.course_repository = course_repository
-        self.logger = course_logger
-
-    def create_course(self, data):
-        data_required = [
-            "name",
-            "description",
-            "creator_id",
-            "course_start_date",
-            "course_end_date",
-            "max_students",
-            "creator_name",
-        ]
-        optional_data = ["enroll_date_end", "correlatives_required_id", "background"]
-
-        for field in data_required:
-            if field not in data:
-                self.logger.debug(
-                    f"[SERVICE] CREATE: field {field} not found in data, so we throw error"
-                )
-                return error_generator(
-                    MISSING_FIELDS, f"Field {field} is required", 400, "create_course"
-                )
-
-        # lets drop other fields that doesn't exists either on data or optional_data
-        for field in list(data.keys()):
-            if field not in data_required and field not in optional_data:
-                self.logger.debug(
-                    f"[SERVICE] CREATE: field {field} not found in data, so we drop it"
-                )
-                del data[field]
-
-        course = Course(
+COURSE_REQUIRED_FIELDS = [
+    "name",
+    "description",
+    "creator_id",
+    "course_start_date",
+    "course_end_date",
+    "max_students",
+    "creator_name",
+]
+COURSE_OPTIONAL_FIELDS = ["enroll_date_end", "correlatives_required_id", "background"]
+
+# Courses sent to the database per insert_many by create_courses
+COURSES_BULK_CHUNK_SIZE = 500
+
+
+class InvalidCourseError(ValueError):
+    def __init__(self, detail, title=INVALID_COURSE):
+        super().__init__(detail)
+        # Title of the 400 response
+        self.title = title
+
+
+def course_from_data(data):
+    """
+    Build the Course of a creation request. Fields that aren't part of a new course
+    are ignored. Raises InvalidCourseError if the data can't be a course.
+    """
+    if not isinstance(data, dict):
+        raise InvalidCourseError("A course must be a JSON object")
+
+    for field in COURSE_REQUIRED_FIELDS:
+        if field not in data:
+            raise InvalidCourseError(f"Field {field} is required", MISSING_FIELDS)
+
+    try:
+        return Course(
             data["name"],
             data["description"],
             data["max_students"],
@@ -63,16 +76,31 @@ class CourseService:
             data["course_end_date"],
             data["creator_id"],
             data["creator_name"],
-            enroll_date_end=(
-                data["enroll_date_end"] if "enroll_date_end" in data else None
-            ),
-            correlatives_required_id=(
-                data["correlatives_required_id"]
-                if "correlatives_required_id" in data
-                else None
-            ),
-            background=(data["background"] if "background" in data else None),
+            enroll_date_end=data.get("enroll_date_end"),
+            correlatives_required_id=data.get("correlatives_required_id"),
+            background=data.get("background"),
         )
+    except (TypeError, ValueError) as e:
+        raise InvalidCourseError(f"Invalid course: {e}")
+
+
+class CourseService:
+    def __init__(
+        self,
+        course_repository: CoursesRepository,
+        course_logger,
+        catalog_facets_repository=None,
+    ):
+        self.course_repository = course_repository
+        self.logger = course_logger
+        self.catalog_facets_repository = catalog_facets_repository
+
+    def create_course(self, data):
+        try:
+            course = course_from_data(data)
+        except InvalidCourseError as e:
+            self.logger.debug(f"[SERVICE] CREATE: invalid course data: {e}")
+            return error_generator(e.title, str(e), 400, "create_course")
 
         dict_course = course.to_dict()
 
@@ -99,6 +127,101 @@ class CourseService:
                 "create_course",
             )
 
+    def create_courses(self, items, chunk_size=COURSES_BULK_CHUNK_SIZE):
+        """
+        Bulk import. items is any iterable (it is consumed lazily, so it may be a stream) of
+        course data, or of InvalidCourseError for the items that couldn't even be parsed.
+        Valid courses are written chunk_size at a time and every item gets its own result.
+        The response is 201 if all were created, 207 if only some and 400 if none, or 500
+        when every course failed on the database.
+        """
+        results = []
+        chunk = []
+
+        def flush():
+            results.extend(self._insert_courses_chunk(chunk))
+            chunk.clear()
+
+        for index, data in enumerate(items):
+            try:
+                if isinstance(data, InvalidCourseError):
+                    raise data
+                course = course_from_data(data)
+            except InvalidCourseError as e:
+                results.append(
+                    {"index": index, "status": 400, "title": e.title, "detail": str(e)}
+                )
+                continue
+
+            chunk.append((index, course.to_dict()))
+            if len(chunk) >= chunk_size:
+                flush()
+
+        if chunk:
+            flush()
+
+        results.sort(key=lambda result: result["index"])
+        created = sum(1 for result in results if result["status"] == 201)
+        self.logger.debug(
+            f"[SERVICE] BULK CREATE: {created} of {len(results)} courses created"
+        )
+
+        if results and created == len(results):
+            title, code_status = COURSES_IMPORTED, 201
+        elif created:
+            title, code_status = COURSES_PARTIALLY_IMPORTED, 207
+        elif results and all(result["status"] == 500 for result in results):
+            title, code_status = COURSES_NOT_IMPORTED, 500
+        else:
+            title, code_status = COURSES_NOT_IMPORTED, 400
+
+        return {
+            "response": {
+                "type": "about:blank",
+                "title": title,
+                "status": code_status,
+                "detail": f"{created} of {len(results)} courses created",
+                "instance": "/courses/bulk",
+                "created": created,
+                "failed": len(results) - created,
+                "results": results,
+            },
+            "code_status": code_status,
+        }
+
+    def _insert_courses_chunk(self, chunk):
+        indexes = [index for index, _ in chunk]
+
+        try:
+            inserted = self.course_repository.create_courses(
+                [course for _, course in chunk]
+            )
+        except Exception as e:
+            self.logger.error(f"[Course Service Error] Error importing courses: {e}")
+            return [
+                {
+                    "index": index,
+                    "status": 500,
+                    "title": INTERNAL_SERVER_ERROR,
+                    "detail": str(e),
+                }
+                for index in indexes
+            ]
+
+        return [
+            (
+                {"index": index, "status": 201, "_id": course_id}
+                if error is None
+                else {
+                    "index": index,
+                    "status": 409,
+                    "title": COURSE_NOT_IMPORTED,
+                    "detail": error,
+                }
+            )
+            for index, (course_id, error) in zip(indexes, inserted)
+        ]
+
     def update_course(self, course_id, data, owner_id):
         optional_data = [
             "name",
@@ -172,29 +295,29 @@ class CourseService:
 
     def delete_course(self, course_id, owner_id):
         try:
-            if not self.course_repository.is_user_owner(course_id, owner_id):
+            # Existence and ownership are both answered by a single snapshot
+            course = self.course_repository.get_course_snapshot(course_id)
+
+            self.logger.debug(f"[SERVICE] Delete: course exists: {course is not None}")
+            if not course:
                 self.logger.debug(
-                    f"[SERVICE] Delete: owner with id {owner_id} is not the owner of the course with id {course_id}, return error"
+                    f"[SERVICE] Delete: course with id {course_id} not found, return error"
                 )
                 return error_generator(
-                    UNAUTHORIZED,
-                    f"User {owner_id} is not authorized to delete this course",
-                    403,
+                    COURSE_NOT_FOUND,
+                    f"Course with ID {course_id} not found",
+                    404,
                     "delete_course",
                 )
 
-            # Lets check if the course exists
-            course_exists = self.course_repository.get_course_by_id(course_id)
-
-            self.logger.debug(f"[SERVICE] Delete: course exists: {course_exists}")
-            if not course_exists:
+            if not course.is_owner(owner_id):
                 self.logger.debug(
-                    f"[SERVICE] Delete: course with id {course_id} not found, return error"
+                    f"[SERVICE] Delete: owner with id {owner_id} is not the owner of the course with id {course_id}, return error"
                 )
                 return error_generator(
-                    COURSE_NOT_FOUND,
-                    f"Course with ID {course_id} not found",
-                    404,
+                    UNAUTHORIZED,
+                    f"User {owner_id} is not authorized to delete this course",
+                    403,
                     "delete_course",
                 )
 
@@ -235,9 +358,7 @@ class CourseService:
             self.logger.debug(f"[SERVICE] course searched: {course}")
             self.logger.debug(f"[SERVICE] course_id: [{course_id}]")
             if course:
-                # we change the _id to str since isn't serializable
-                course_as_json_response = Course.from_dict(course).to_dict()
-                return {"response": course_as_json_response, "code_status": 200}
+                return {"response": course_response_from_dict(course), "code_status": 200}
             else:
                 return error_generator(
                     COURSE_NOT_FOUND,
@@ -254,19 +375,45 @@ class CourseService:
                 "get_course",
             )
 
-    def search_course_by_query(self, string_to_find):
+    def get_course_version(self, course_id):
+        """
+        Version of the course for the conditional GETs, None when it is unknown
+        (the course doesn't exist or the lookup failed) and the course has to be read.
+        """
         try:
-            courses = self.course_repository.search_course_by_partial_information(
-                string_to_find
+            return self.course_repository.get_course_version(course_id)
+        except Exception as e:
+            self.logger.error(f"[Course Service Error] Error getting course version: {e}")
+            return None
+
+    def search_course_by_query(
+        self, string_to_find, offset=0, max_per_page=None, cursor=None
+    ):
+        """
+        Search courses ranked by relevance.
+        When cursor is None the response is the plain list of courses (as always),
+        otherwise ("" for the first page) it is {"data": [...], "next_cursor": ...}.
+        """
+        try:
+            courses, next_cursor = (
+                self.course_repository.search_course_by_partial_information(
+                    string_to_find, offset, max_per_page, cursor
+                )
             )
             self.logger.debug(f"[SERVICE] courses searched: {courses}")
             self.logger.debug(f"[SERVICE] string_to_find: {string_to_find}")
             if courses:
 
                 # We do this to print it propertly in the response
-                courses = [Course.from_dict(course).to_dict() for course in courses]
+                courses = [course_summary_from_dict(course) for course in courses]
 
-                return {"response": courses, "code_status": 200}
+                if cursor is None:
+                    return {"response": courses, "code_status": 200}
+
+                return {
+                    "response": {"data": courses, "next_cursor": next_cursor},
+                    "code_status": 200,
+                }
             else:
                 return error_generator(
                     COURSE_NOT_FOUND,
@@ -274,6 +421,16 @@ class CourseService:
                     404,
                     "search_course",
                 )
+        except InvalidCursorError as e:
+            return error_generator(INVALID_CURSOR, str(e), 400, "search_course")
+        except ExecutionTimeout as e:
+            self.logger.error(f"[Course Service Error] Search timed out: {e}")
+            return error_generator(
+                SEARCH_TIMEOUT,
+                f"The search for {string_to_find} took too long, try a more specific query",
+                503,
+                "search_course",
+            )
         except Exception as e:
             self.logger.error(f"[Course Service Error] Error searching course: {e}")
             return error_generator(
@@ -283,13 +440,26 @@ class CourseService:
                 "search_course",
             )
 
-    def get_all_courses(self):
+    def get_all_courses(self, stream=False, batch_size=STREAM_DEFAULT_BATCH_SIZE):
+        """
+        With stream the response is an iterator of the courses, read from the database
+        batch_size at a time while the response is being sent (see endpoints.streaming).
+        """
         try:
-            courses = self.course_repository.get_all_courses()
+            if stream:
+                courses = non_empty_iterator(
+                    self.course_repository.iter_all_courses(batch_size)
+                )
+                if courses:
+                    courses = map(course_summary_from_dict, courses)
+                    return {"response": courses, "code_status": 200}
+            else:
+                courses = self.course_repository.get_all_courses()
+
             if courses:
                 # we make a fix to _id since isn't serializable
                 self.logger.debug(f"[SERVICE] courses searched: {courses}")
-                courses = [Course.from_dict(course).to_dict() for course in courses]
+                courses = [course_summary_from_dict(course) for course in courses]
 
                 return {"response": courses, "code_status": 200}
             else:
@@ -305,117 +475,21 @@ class CourseService:
                 "get_all_courses",
             )
 
-    def enroll_student_in_course(
-        self, course_id, student_id, approved_signatures_from_user
-    ):
+    def get_catalog_facets(self):
+        """
+        Course counts by status, creator, start month and open seats, as last
+        materialized (see repository.catalog_facets_repository).
+        """
         try:
-            # We check if the course inscription is still open
-            inscription_available = (
-                self.course_repository.check_if_course_inscription_is_available(
-                    course_id
-                )
-            )
-
-            if not inscription_available:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: inscription is not available for course with ID {course_id}"
-                )
-                return error_generator(
-                    UNAUTHORIZED,
-                    f"Course with ID {course_id} inscription is no longer available",
-                    403,
-                    "enroll_student",
-                )
-
-            # First we check if the user is already enrolled in the course
-            is_already_enrolled = self.course_repository.is_student_enrolled_in_course(
-                course_id, student_id
-            )
-
-            if is_already_enrolled:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: student with ID {student_id} is already enrolled in course with ID {course_id}"
-                )
-                return error_generator(
-                    UNAUTHORIZED,
-                    f"Student with ID {student_id} is already enrolled in course with ID {course_id}",
-                    403,
-                    "enroll_student",
-                )
-
-            # then we check if the course still has a place to enroll an user
-            still_has_place = (
-                self.course_repository.check_if_course_has_place_to_enroll(course_id)
-            )
-
-            if not still_has_place:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: course with ID {course_id} is full"
-                )
-                return error_generator(
-                    COURSE_IS_FULL,
-                    f"Course with ID {course_id} is full",
-                    403,
-                    "enroll_student",
-                )
-
-            # In order an user to be able to enroll in a course, the user MUST have the correlatives signatures approved.
-            # We check if the user has ALL the correlatives approved from approved_signatures_from_user
-            courses_correlatives = self.course_repository.get_course_correlatives(
-                course_id
-            )
-
-            if (
-                courses_correlatives
-            ):  # if the course has correlatives, we need to check them, else we skip this step
-                for assignatures_aproved in approved_signatures_from_user:
-                    if assignatures_aproved not in courses_correlatives:
-                        self.logger.debug(
-                            f"[SERVICE] Enroll: student with ID {student_id} doesn't have the correlatives approved to enroll in course with ID {course_id}"
-                        )
-                        return error_generator(
-                            USER_HAS_NOT_ENOUGH_CORRELATIVES_APPROVED_TO_ENROLL,
-                            f"Student with ID {student_id} doesn't have the correlatives approved to enroll in course with ID {course_id}",
-                            403,
-                            "enroll_student",
-                        )
-
-            enrolled = self.course_repository.enroll_student_in_course(
-                course_id, student_id
-            )
-            if enrolled:
-                self.logger.debug(
-                    f"[SERVICE] Enroll: student with ID {student_id} enrolled in course with ID {course_id}"
-                )
-                return {
-                    "response": {
-                        "type": "about:blank",
-                        "title": COURSE_CREATED,
-                        "status": 200,
-                        "detail": f"Student with ID {student_id} enrolled in course with ID {course_id}",
-                        "instance": f"/courses/enroll/{course_id}",
-                    },
-                    "code_status": 200,
-                }
-            else:
-                return error_generator(
-                    COURSE_NOT_FOUND,
-                    f"Course with ID {course_id} not found",
-                    404,
-                    "enroll_student",
-                )
+            facets = self.catalog_facets_repository.get_facets()
+            return {"response": facets, "code_status": 200}
         except Exception as e:
-            self.logger.error(
-                f"[Course Service Error] Error enrolling student in course: {e}"
-            )
+            self.logger.error(f"[Course Service Error] Error getting catalog facets: {e}")
             return error_generator(
                 INTERNAL_SERVER_ERROR,
-                f"An error occurred while enrolling the student in the course: {str(e)}",
+                f"An error occurred while getting the catalog facets: {str(e)}",
                 500,
-                "enroll_student",
+                "facets",
             )
 
     def get_enrolled_courses(self, student_id):
@@ -423,7 +497,7 @@ class CourseService:
             courses = self.course_repository.get_enrolled_courses(student_id)
             if courses:
                 # we make a fix to _id since isn't serializable
-                courses = [Course.from_dict(course).to_dict() for course in courses]
+                courses = [course_summary_from_dict(course) for course in courses]
 
                 self.logger.debug(f"[SERVICE] courses searched: {courses}")
                 return {"response": courses, "code_status": 200}
@@ -532,18 +606,33 @@ class CourseService:
                 "add_module_to_course",
             )
 
-    def get_paginated_courses(self, offset, max_per_page):
+    def get_paginated_courses(self, offset, max_per_page, cursor=None):
+        """
+        When cursor is None the response is the plain list of courses (as always),
+        otherwise ("" for the first page) it is {"data": [...], "next_cursor": ...}.
+        """
         try:
-            courses = self.course_repository.get_paginated_courses(offset, max_per_page)
+            courses = self.course_repository.get_paginated_courses(
+                offset, max_per_page, cursor
+            )
             if courses:
+                next_cursor = next_page_cursor(courses, max_per_page)
                 # we make a fix to _id since isn't serializable
-                courses = [Course.from_dict(course).to_dict() for course in courses]
+                courses = [course_summary_from_dict(course) for course in courses]
 
-                return {"response": courses, "code_status": 200}
+                if cursor is None:
+                    return {"response": courses, "code_status": 200}
+
+                return {
+                    "response": {"data": courses, "next_cursor": next_cursor},
+                    "code_status": 200,
+                }
             else:
                 return error_generator(
                     COURSE_NOT_FOUND, f"No courses found", 404, "get_paginated_courses"
                 )
+        except InvalidCursorError as e:
+            return error_generator(INVALID_CURSOR, str(e), 400, "get_paginated_courses")
         except Exception as e:
             self.logger.error(
                 f"[Course Service Error] Error getting paginated courses: {e}"
@@ -559,8 +648,7 @@ class CourseService:
         try:
             course = self.course_repository.get_course_by_id(course_id)
             if course:
-                # we make a fix to _id since isn't serializable
-                course = Course.from_dict(course).to_dict()
+                course = course_response_from_dict(course)
 
                 return {"response": course, "code_status": 200}
             else:
@@ -579,16 +667,18 @@ class CourseService:
                 "get_course_by_id",
             )
 
-    def get_courses_owned_by_user(self, user_id, offset=0, max_per_page=1000):
+    def get_courses_owned_by_user(
+        self, user_id, offset=0, max_per_page=1000, cursor=None
+    ):
         try:
             courses = self.course_repository.get_courses_owned_by_user(
-                user_id, offset, max_per_page
+                user_id, offset, max_per_page, cursor
             )
 
             if not courses:
                 return []
 
-            return [Course.from_dict(course) for course in courses]
+            return [course_response_from_dict(course) for course in courses]
 
         except Exception as e:
             self.logger.error(f"[Service Error] Error getting courses: {e}")
@@ -739,16 +829,16 @@ class CourseService:
                     f"/open/{course_id}",
                 )
 
-            course = self.course_repository.open_course(
+            course, tasks_reset = self.course_repository.open_course(
                 course_id, course_start_date, course_end_date
             )
-            course = Course.from_dict(course).to_dict()
-
             self.logger.debug(f"[SERVICE] Course Open: {course}")
             if course:
+                course = course_response_from_dict(course)
                 return {
                     "response": {
                         "course": course,
+                        "tasks_reset": tasks_reset,
                         "type": "about:blank",
                         "title": COURSE_CREATED,
                         "status": 200,
@@ -789,7 +879,7 @@ class CourseService:
             course = self.course_repository.close_course(course_id)
             self.logger.debug(f"[SERVICE] Course Close: {course}")
             if course:
-                course = Course.from_dict(course).to_dict()
+                course = course_response_from_dict(course)
                 return {
                     "response": {
                         "course": course,
@@ -2,14 +2,70 @@ from headers import (
     COURSE_ALREADY_APPROVED,
     COURSE_IS_FULL,
     COURSE_NOT_FOUND,
+    ENROLLMENT_CONFLICT,
     INTERNAL_SERVER_ERROR,
     UNAUTHORIZED,
     USER_ENROLLED,
 )
-from models.course import Course
+from models.course import course_summary_from_dict
+from models.course_snapshot import EnrollmentOutcome
 from repository.courses_repository import CoursesRepository
 from repository.users_data_repository import UsersDataRepository
 from src.error.error import error_generator
+from utils import STREAM_DEFAULT_BATCH_SIZE, non_empty_iterator
+
+
+def enrollment_error(outcome: EnrollmentOutcome, course_id, student_id):
+    """
+    Translate a rejected EnrollmentOutcome into the error response for the client.
+    """
+    if outcome == EnrollmentOutcome.NOT_FOUND:
+        return error_generator(
+            COURSE_NOT_FOUND,
+            f"Course with ID {course_id} not found",
+            404,
+            "enroll_student",
+        )
+
+    if outcome == EnrollmentOutcome.CLOSED:
+        return error_generator(
+            UNAUTHORIZED,
+            f"Course with ID {course_id} inscription is no longer available",
+            403,
+            "enroll_student",
+        )
+
+    if outcome == EnrollmentOutcome.ALREADY_ENROLLED:
+        return error_generator(
+            UNAUTHORIZED,
+            f"Student with ID {student_id} is already enrolled in course with ID {course_id}",
+            403,
+            "enroll_student",
+        )
+
+    if outcome == EnrollmentOutcome.FULL:
+        return error_generator(
+            COURSE_IS_FULL,
+            f"Course with ID {course_id} is full",
+            403,
+            "enroll_student",
+        )
+
+    if outcome == EnrollmentOutcome.MISSING_CORRELATIVES:
+        return error_generator(
+            UNAUTHORIZED,
+            f"Student with ID {student_id} does not have the correlatives signatures approved",
+            403,
+            "enroll_student",
+        )
+
+    return error_generator(
+        ENROLLMENT_CONFLICT,
+        f"Course with ID {course_id} changed while enrolling student with ID {student_id}, please retry",
+        409,
+        "enroll_student",
+    )
+
 
 class EnrollmentService:
     def __init__(
@@ -24,64 +80,6 @@ class EnrollmentService:
 
     def enroll_student_in_course(self, course_id, student_id):
         try:
-            # We check if the course inscription is still open
-            inscription_available = (
-                self.course_repository.check_if_course_inscription_is_available(
-                    course_id
-                )
-            )
-
-            if not inscription_available:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: inscription is not available for course with ID {course_id}"
-                )
-                return error_generator(
-                    UNAUTHORIZED,
-                    f"Course with ID {course_id} inscription is no longer available",
-                    403,
-                    "enroll_student",
-                )
-
-            # First we check if the user is already enrolled in the course
-            is_already_enrolled = self.course_repository.is_student_enrolled_in_course(
-                course_id, student_id
-            )
-
-            if is_already_enrolled:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: student with ID {student_id} is already enrolled in course with ID {course_id}"
-                )
-                return error_generator(
-                    UNAUTHORIZED,
-                    f"Student with ID {student_id} is already enrolled in course with ID {course_id}",
-                    403,
-                    "enroll_student",
-                )
-
-            # then we check if the course still has a place to enroll an user
-            still_has_place = (
-                self.course_repository.check_if_course_has_place_to_enroll(course_id)
-            )
-
-            if not still_has_place:
-
-                self.logger.debug(
-                    f"[SERVICE] Enroll: course with ID {course_id} is full"
-                )
-                return error_generator(
-                    COURSE_IS_FULL,
-                    f"Course with ID {course_id} is full",
-                    403,
-                    "enroll_student",
-                )
-
-            # In order an user to be able to enroll in a course, the user MUST have the correlatives signatures approved.
-            # We check if the user has the correlatives signatures approved
-            courses_correlatives = self.course_repository.get_course_correlatives(
-                course_id
-            )
             student_approved_courses = (
                 self.user_repository.get_student_approved_courses(student_id)
             )
@@ -98,21 +96,14 @@ class EnrollmentService:
                     403,
                     "enroll_student",
                 )
-            if not self.user_available_to_enroll(courses_correlatives, course_ids):
-                self.logger.debug(
-                    f"[SERVICE] Enroll: student with ID {student_id} does not have the correlatives signatures approved"
-                )
-                return error_generator(
-                    UNAUTHORIZED,
-                    f"Student with ID {student_id} does not have the correlatives signatures approved",
-                    403,
-                    "enroll_student",
-                )
 
-            enrolled = self.course_repository.enroll_student_in_course(
-                course_id, student_id
+            # Every other check (window, status, already enrolled, places and correlatives)
+            # is done by the database within the same write, so concurrent requests can't over-enroll
+            outcome = self.course_repository.enroll_student_in_course(
+                course_id, student_id, course_ids
             )
-            if enrolled:
+
+            if outcome == EnrollmentOutcome.ENROLLED:
                 self.logger.debug(
                     f"[DEBUG] Enroll: student with ID {student_id} enrolled in course with ID {course_id}"
                 )
@@ -127,13 +118,11 @@ class EnrollmentService:
                     },
                     "code_status": 200,
                 }
-            else:
-                return error_generator(
-                    COURSE_NOT_FOUND,
-                    f"Course with ID {course_id} not found",
-                    404,
-                    "enroll_student",
-                )
+
+            self.logger.debug(
+                f"[SERVICE] Enroll: student with ID {student_id} rejected from course with ID {course_id}: {outcome.value}"
+            )
+            return enrollment_error(outcome, course_id, student_id)
         except Exception as e:
             return error_generator(
                 INTERNAL_SERVER_ERROR,
@@ -142,12 +131,24 @@ class EnrollmentService:
                 "enroll_student",
             )
 
-    def get_enrolled_courses(self, student_id):
+    def get_enrolled_courses(
+        self, student_id, stream=False, batch_size=STREAM_DEFAULT_BATCH_SIZE
+    ):
+        # With stream the response is an iterator, see CourseService.get_all_courses
         try:
-            courses = self.course_repository.get_enrolled_courses(student_id)
+            if stream:
+                courses = non_empty_iterator(
+                    self.course_repository.iter_enrolled_courses(student_id, batch_size)
+                )
+                if courses:
+                    courses = map(course_summary_from_dict, courses)
+                    return {"response": courses, "code_status": 200}
+            else:
+                courses = self.course_repository.get_enrolled_courses(student_id)
+
             if courses:
                 # we make a fix to _id since isn't serializable
-                courses = [Course.from_dict(course).to_dict() for course in courses]
+                courses = [course_summary_from_dict(course) for course in courses]
 
                 self.logger.debug(f"[DEBUG] courses searched: {courses}")
                 return {"response": courses, "code_status": 200}
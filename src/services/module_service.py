@@ -32,6 +32,20 @@ class ModuleService:
         self.service_users = service_users
         self.logger = logger
 
+    def get_modules_version(self, course_id):
+        """
+        Version of the modules of a course (and their resources) for the conditional GETs,
+        None when it is unknown. The modules aren't removed with the course, so it also
+        checks the course still exists.
+        """
+        try:
+            if not self.repository_courses.get_course_version(course_id):
+                return None
+            return self.repository_modules.get_modules_version(course_id)
+        except Exception as e:
+            self.logger.error(f"[SERVICE MODULE] Error getting modules version: {e}")
+            return None
+
     def get_modules_from_course(self, course_id):
         """
         Get all modules from a course.
@@ -1,7 +1,6 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 import time
 from typing import Optional
-from google.cloud import storage
 from flask import jsonify
 import os
 
@@ -9,8 +8,28 @@ from error.error import error_generator
 from models.submission import Feedback
 from headers import MISSING_FIELDS, COURSE_NOT_FOUND, USER_NOT_ALLOWED_TO_CREATE
 from models.task import Task, TaskStatus, TaskType
-from repository.tasks_repository import TasksRepository
-from utils import parse_date_to_timestamp_ms, parse_to_timestamp_ms_now
+from repository.tasks_repository import (
+    STUDENT_TASK_STATUSES,
+    TasksRepository,
+    next_task_cursor,
+)
+from utils import (
+    STREAM_DEFAULT_BATCH_SIZE,
+    non_empty_iterator,
+    parse_date_to_timestamp_ms,
+    parse_to_timestamp_ms_now,
+)
+
+
+def task_feed_page(tasks, limit, cursor):
+    """
+    The tasks as they always were returned when cursor is None, otherwise
+    ("" for the first page) {"data": [...], "next_cursor": ...}.
+    """
+    if cursor is None:
+        return tasks
+
+    return {"data": tasks, "next_cursor": next_task_cursor(tasks, limit)}
 
 
 class TaskService:
@@ -21,12 +40,15 @@ class TaskService:
         user_service,
         repository_courses,
         logger,
+        attachment_storage=None,
     ):
         self.repository = tasks_repository
         self.service_users = user_service
         self.repository_courses = repository_courses
         self.course_service = course_service
         self.logger = logger
+        # Where upload_task stores the files (see repository.attachment_storage)
+        self.attachment_storage = attachment_storage
 
     def create_task(self, data: dict, creator_user_uuid: str):
 
@@ -361,8 +383,14 @@ class TaskService:
             )
 
     def get_tasks_by_course(
-        self, course_id: str, status: str = None, module_id: str = None
+        self,
+        course_id: str,
+        status: str = None,
+        module_id: str = None,
+        stream=False,
+        batch_size=STREAM_DEFAULT_BATCH_SIZE,
     ):
+        # With stream the response is an iterator, see CourseService.get_all_courses
         try:
             # Validar que el curso exista
             course = self.course_service.get_course_by_id(course_id)
@@ -390,6 +418,13 @@ class TaskService:
             if module_id:
                 query["module_id"] = module_id
 
+            if stream:
+                tasks = non_empty_iterator(
+                    self.repository.iter_tasks_by_query(query, batch_size)
+                )
+                tasks = (task.to_dict() for task in tasks or ())
+                return {"response": tasks, "code_status": 200}
+
             # Obtener tareas
             tasks = self.repository.get_tasks_by_query(query)
 
@@ -455,37 +490,17 @@ class TaskService:
             )
 
         url = self._save_file(uuid, num, file)
-        self.logger.info(f"[TASKS][SERVICE] File saved in Google Cloud Storage ")
+        self.logger.info("[TASKS][SERVICE] File saved in the attachment storage")
 
         return url
 
     def _save_file(self, uuid, num, file):
-        """Save the file to GCP."""
-        bucket = self._get_gcp_bucket()
+        """Save the file to the attachment storage."""
         ext = os.path.splitext(file.filename)[
             1
         ]  # Extract extension (.pdf, .jpg, .png, etc.)
         filename = f"{uuid}{num}{ext}"
-        blob = bucket.blob(filename)
-        blob.upload_from_file(file, content_type=file.content_type)
-        url = blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=15),
-            method="GET",
-        )
-        return url
-
-    def _get_gcp_bucket(self):
-        # Reconstruct JSON file from environment variable:
-        credentials_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
-        json_path = "/tmp/gcs-key.json"
-        with open(json_path, "w") as f:
-            f.write(credentials_json)
-
-        # Initialize GCS:
-        storage_client = storage.Client.from_service_account_json(json_path)
-        bucket = storage_client.bucket(os.getenv("GCS_BUCKET_NAME"))
-        return bucket
+        return self.attachment_storage.save(filename, file, file.content_type)
 
     def get_tasks_by_teacher(
         self,
@@ -496,29 +511,22 @@ class TaskService:
         end_date=None,
         page=1,
         limit=10,
+        cursor=None,
     ):
         try:
-            courses = self.course_service.get_courses_owned_by_user(teacher_id)
-
-            if not courses:
-                self.logger.info(
-                    f"[TAKS][SERVICES] Teacher {teacher_id} has not courses."
-                )
-                return []
-
-            course_ids = [c._id for c in courses]
-
-            tasks = self.repository.get_tasks_by_course_ids(
-                course_ids=course_ids,
+            # One aggregation from the teacher's courses to their tasks
+            tasks = self.repository.get_tasks_by_teacher(
+                teacher_id,
                 status=status,
                 due_date=due_date,
                 start_date=start_date,
                 end_date=end_date,
                 page=page,
                 limit=limit,
+                cursor=cursor,
             )
 
-            return tasks
+            return task_feed_page(tasks, limit, cursor)
 
         except Exception as e:
             self.logger.error(
@@ -536,73 +544,43 @@ class TaskService:
         end_date=None,
         page=1,
         limit=10,
+        cursor=None,
     ):
         try:
             # Obtain courses you are enrolled in
             courses = self.course_service.get_courses_by_student_id(student_id)
             if not courses:
-                return []
+                return task_feed_page([], limit, cursor)
 
             course_ids = [c._id for c in courses]
 
             if course_id and course_id in course_ids:
                 course_ids = [course_id]  # filter by course
 
-            tasks = self.repository.get_tasks_by_course_ids(
+            # pending, overdue and completed are computed per student, the others
+            # are the stored status of the task
+            student_status = status if status in STUDENT_TASK_STATUSES else None
+
+            tasks = self.repository.get_student_tasks_by_course_ids(
                 course_ids=course_ids,
-                status=status,
+                student_id=student_id,
+                student_status=student_status,
+                status=None if student_status else status,
                 due_date=due_date,
                 start_date=start_date,
                 end_date=end_date,
                 page=page,
                 limit=limit,
+                cursor=cursor,
             )
 
-            final_tasks = []
-            for task in tasks:
-                task.status = self._calculate_status(task, student_id)
-                task.submissions = self._get_submission(task, student_id)
-                final_tasks.append(task)
-
-            return final_tasks
+            return task_feed_page(tasks, limit, cursor)
         except Exception as e:
             self.logger.error(
                 f"[TASKS][SERVICE] Error getting tasks for student {student_id}: {str(e)}"
             )
             raise e
 
-    def _calculate_status(self, task: Task, student_id: str) -> str:
-        """
-        Determines the status of a task for a given student.
-
-        The status is calculated based on whether the student has submitted the task
-        and whether the due date has passed.
-
-        Returns:
-            - "completed" if the student has submitted the task.
-            - "overdue" if the due date has passed and the student has not submitted.
-            - "pending" if the due date has not passed and there is no submission.
-        """
-        submissions = task.submissions
-
-        if student_id in submissions:
-            return TaskStatus.COMPLETED
-
-        due_date_ts = task.due_date
-
-        if due_date_ts and isinstance(due_date_ts, int):
-            now_ts = parse_to_timestamp_ms_now()
-            if now_ts > due_date_ts:
-                return TaskStatus.OVERDUE
-
-        return TaskStatus.PENDING
-
-    def _get_submission(self, task, student_id):
-        submission = task.submissions.get(student_id)
-        if submission:
-            return {student_id: submission}
-        return {}
-
     def add_or_update_feedback(
         self,
         task_id: str,
@@ -677,11 +655,9 @@ class TaskService:
                 if comment is not None:
                     feedback.comment = comment
                 feedback.created_at = parse_to_timestamp_ms_now()
-                update_data = {
-                    "$set": {
-                        f"submissions.{student_id}.feedbacks.{corrector_id}": feedback.to_dict()
-                    }
-                }
+                updated = self.repository.set_submission_feedback(
+                    task_id, student_id, corrector_id, feedback.to_dict()
+                )
             elif corrector_id is not None:
                 self.logger.debug(
                     f"[TASK][SERVICE] Corrector had not been assigned. Create new feedback."
@@ -689,22 +665,16 @@ class TaskService:
                 feedback = Feedback(
                     corrector_id=corrector_id, grade=grade, comment=comment
                 )
-                update_data = {
-                    "$set": {
-                        f"submissions.{student_id}.feedbacks.{corrector_id}": feedback.to_dict()
-                    }
-                }
+                updated = self.repository.set_submission_feedback(
+                    task_id, student_id, corrector_id, feedback.to_dict()
+                )
             elif existing_corrector_id and corrector_id is None:
                 self.logger.debug(
                     f"[TASK][SERVICE] A corrector is unassigned, setting it to null"
                 )
-                update_data = {
-                    "$unset": {
-                        f"submissions.{student_id}.feedbacks.{existing_corrector_id}": ""
-                    }
-                }
-
-            updated = self.repository.update_task(task_id, update_data)
+                updated = self.repository.unset_submission_feedback(
+                    task_id, student_id, existing_corrector_id
+                )
 
             if updated:
                 return {"response": jsonify(updated.to_dict()), "code_status": 200}
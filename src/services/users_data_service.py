@@ -13,7 +13,6 @@ from headers import (
     MISSING_FIELDS,
     USER_NOT_ENROLLED_INTO_THE_COURSE,
 )
-from models.course import Course
 from models.permissions import AssistantPermissions
 from repository.users_data_repository import UsersDataRepository
 from services.course_service import CourseService
@@ -179,18 +178,14 @@ class UsersDataService:
                 "code_status": 204,
             }
 
-        # Filter the favourites list based on the query
-        # To be helpful, lets convert it to a Instance of Courses then return as dict
+        # Filter the favourites list based on the query, the courses are already response dicts
+        query = query.lower()
         filtered_favourites = [
-            Course.from_dict(course) for course in favourites["response"]
-        ]
-        self.logger.debug(f"[UsersDataService] Favourites list: {filtered_favourites}")
-        filtered_favourites = [
-            course.to_dict()
-            for course in filtered_favourites
-            if query.lower() in course.name.lower()
-            or query.lower() in course.description.lower()
-            or query.lower() in course.creator_name.lower()
+            course
+            for course in favourites["response"]
+            if query in (course["name"] or "").lower()
+            or query in (course["description"] or "").lower()
+            or query in (course["creator_name"] or "").lower()
         ]
         """filtered_favourites = [
             course
@@ -1,6 +1,36 @@
+import base64
+import itertools
+import json
 from datetime import datetime, timezone
+from functools import lru_cache
 from dateutil.parser import parse as parse_date
 
+# Distinct ISO date strings remembered by parse_date_to_timestamp_ms
+DATE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_iso_date_string_to_timestamp_ms(value: str) -> int:
+    # ISO 8601 only (what the API and the stored documents use), ValueError otherwise
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def parse_date_string_to_timestamp_ms(value: str) -> int:
+    # dateutil only gets the other formats, and isn't cached: they can be relative to
+    # the current date ("10:00" is today at 10)
+    try:
+        return parse_iso_date_string_to_timestamp_ms(value)
+    except ValueError:
+        pass
+
+    dt = parse_date(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
 
 def parse_date_to_timestamp_ms(value) -> int:
     """
@@ -22,10 +52,7 @@ def parse_date_to_timestamp_ms(value) -> int:
             return int(value * 1000)
 
         if isinstance(value, str):
-            dt = parse_date(value)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return int(dt.timestamp() * 1000)
+            return parse_date_string_to_timestamp_ms(value)
 
         if isinstance(value, datetime):
             dt = value
@@ -39,6 +66,77 @@ def parse_date_to_timestamp_ms(value) -> int:
     raise ValueError(f"Cannot parse to timestamp ms: {value}")
 
 
+def timestamp_ms(value) -> int:
+    # parse_date_to_timestamp_ms for the stored dates, which are already ms timestamps
+    if type(value) is int and value > 10**12:
+        return value
+    return parse_date_to_timestamp_ms(value)
+
+
+def parse_dates_to_timestamp_ms(values) -> list:
+    """
+    parse_date_to_timestamp_ms of every value, in order. The ms timestamps (what is
+    stored) are kept as they are, see timestamp_ms.
+    """
+    return list(map(timestamp_ms, values))
+
+
 def parse_to_timestamp_ms_now() -> int:
     """Returns current UTC timestamp in milliseconds."""
     return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Builds an opaque pagination cursor from the sort key values of the last item of a page.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of encode_cursor. Raises InvalidCursorError if the cursor was tampered or is invalid."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+    if not isinstance(values, dict):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    return values
+
+
+def next_page_cursor(items: list, page_size: int):
+    """
+    Cursor pointing right after the last item of a page keyed on _id, or None if
+    the page wasn't full (so there is nothing else to read).
+    """
+    if not items or len(items) < page_size:
+        return None
+
+    return encode_cursor({"_id": str(items[-1]["_id"])})
+
+
+# Documents fetched per round trip by the streamed list endpoints
+STREAM_DEFAULT_BATCH_SIZE = 200
+STREAM_MAX_BATCH_SIZE = 1000
+
+
+def non_empty_iterator(iterable):
+    """
+    Iterator over the same items, or None if there are none. Reading the first item
+    runs the query, so its errors are raised here and not once the response started.
+    """
+    iterator = iter(iterable)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return None
+
+    return itertools.chain((first,), iterator)
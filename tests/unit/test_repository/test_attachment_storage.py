@@ -0,0 +1,71 @@
+import io
+import pytest
+from unittest.mock import MagicMock, patch
+from src.repository.attachment_storage import (
+    GCSAttachmentStorage,
+    LocalAttachmentStorage,
+)
+
+CREDENTIALS_JSON = '{"type": "service_account", "client_email": "svc@example.com"}'
+
+
+@pytest.fixture
+def logger_mock():
+    return MagicMock()
+
+
+@patch("src.repository.attachment_storage.storage")
+def test_gcs_client_is_built_once(mock_storage, logger_mock):
+    client = mock_storage.Client.from_service_account_info.return_value
+    blob = client.bucket.return_value.blob.return_value
+    blob.generate_signed_url.return_value = "http://signed-url"
+    gcs = GCSAttachmentStorage(CREDENTIALS_JSON, "bucket", logger_mock)
+
+    for i in range(3):
+        url = gcs.save(f"file{i}.pdf", io.BytesIO(b"pdf"), "application/pdf")
+
+    assert url == "http://signed-url"
+    # The credentials are read from memory, never written to a key file
+    mock_storage.Client.from_service_account_info.assert_called_once_with(
+        {"type": "service_account", "client_email": "svc@example.com"}
+    )
+    client.bucket.assert_called_once_with("bucket")
+    assert blob.upload_from_file.call_count == 3
+
+
+def test_gcs_client_is_not_built_until_the_first_upload(logger_mock):
+    with patch("src.repository.attachment_storage.storage") as mock_storage:
+        GCSAttachmentStorage(None, "bucket", logger_mock)
+
+    mock_storage.Client.from_service_account_info.assert_not_called()
+
+
+def test_local_storage_saves_the_file(tmp_path, logger_mock):
+    local = LocalAttachmentStorage(tmp_path / "attachments", logger_mock)
+
+    url = local.save("uuid1.pdf", io.BytesIO(b"pdf bytes"), "application/pdf")
+
+    path = tmp_path / "attachments" / "uuid1.pdf"
+    assert path.read_bytes() == b"pdf bytes"
+    assert url == path.resolve().as_uri()
+
+
+def test_local_storage_with_base_url(tmp_path, logger_mock):
+    local = LocalAttachmentStorage(tmp_path, logger_mock, base_url="http://files/")
+
+    assert local.save("uuid1.pdf", io.BytesIO(b"pdf")) == "http://files/uuid1.pdf"
+
+
+@pytest.mark.parametrize("filename", ["../uuid1.pdf", "dir/uuid1.pdf", ".."])
+def test_local_storage_rejects_paths(tmp_path, logger_mock, filename):
+    local = LocalAttachmentStorage(tmp_path / "attachments", logger_mock)
+
+    with pytest.raises(ValueError):
+        local.save(filename, io.BytesIO(b"pdf"))
+
+
+def test_attachment_storage_is_abstract():
+    from src.repository.attachment_storage import AttachmentStorage
+
+    with pytest.raises(TypeError):
+        AttachmentStorage()
@@ -0,0 +1,67 @@
+import pytest
+from src.repository.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return LRUCache(max_entries=2, ttl_seconds=10, clock=clock)
+
+
+def test_get_counts_hits_and_misses(cache):
+    assert cache.get("c1") is None
+    cache.set("c1", {"name": "Math"})
+
+    assert cache.get("c1") == {"name": "Math"}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_entries_expire(cache, clock):
+    cache.set("c1", {"name": "Math"})
+    clock.now = 10
+
+    assert cache.get("c1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_is_evicted(cache):
+    cache.set("c1", {"name": "Math"})
+    cache.set("c2", {"name": "Physics"})
+    cache.get("c1")
+    cache.set("c3", {"name": "Chemistry"})
+
+    assert cache.get("c2") is None
+    assert cache.get("c1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_values_are_copies(cache):
+    course = {"students": ["s1"]}
+    cache.set("c1", course)
+    course["students"].append("s2")
+    cache.get("c1")["students"].append("s3")
+
+    assert cache.get("c1") == {"students": ["s1"]}
+
+
+def test_stale_read_is_not_cached_after_invalidation(cache):
+    generation = cache.generation()
+    cache.invalidate("c1")
+    cache.set("c1", {"name": "Old"}, generation)
+
+    assert cache.get("c1") is None
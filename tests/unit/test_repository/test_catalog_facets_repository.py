@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo.errors import PyMongoError
+from src.repository.catalog_facets_repository import (
+    CATALOG_FACETS_ID,
+    CatalogFacetsRefresher,
+    CatalogFacetsRepository,
+)
+from src.repository.invalidation_bus import COURSES, InProcessInvalidationBus
+
+
+@pytest.fixture
+def courses_collection():
+    return MagicMock()
+
+
+@pytest.fixture
+def facets_collection():
+    collection = MagicMock()
+    collection.name = "catalog_facets"
+    return collection
+
+
+@pytest.fixture
+def repo(courses_collection, facets_collection):
+    return CatalogFacetsRepository(courses_collection, facets_collection, MagicMock())
+
+
+def test_refresh_merges_one_facet_aggregation(repo, courses_collection):
+    repo.refresh()
+
+    pipeline = courses_collection.aggregate.call_args[0][0]
+    stages = [next(iter(stage)) for stage in pipeline]
+    assert stages == ["$project", "$facet", "$set", "$merge"]
+    assert "students" not in pipeline[0]["$project"]
+    assert set(pipeline[1]["$facet"]) == {
+        "total",
+        "status",
+        "creators",
+        "start_months",
+        "has_open_seats",
+    }
+    assert pipeline[2]["$set"]["_id"] == CATALOG_FACETS_ID
+    assert pipeline[3]["$merge"] == {
+        "into": "catalog_facets",
+        "on": "_id",
+        "whenMatched": "replace",
+        "whenNotMatched": "insert",
+    }
+
+
+def test_get_facets_reads_summary_by_id(repo, courses_collection, facets_collection):
+    facets_collection.find_one.return_value = {"total": 3}
+
+    assert repo.get_facets() == {"total": 3}
+    facets_collection.find_one.assert_called_once_with(
+        {"_id": CATALOG_FACETS_ID}, {"_id": 0}
+    )
+    courses_collection.aggregate.assert_not_called()
+
+
+def test_get_facets_computes_them_the_first_time(
+    repo, courses_collection, facets_collection
+):
+    facets_collection.find_one.side_effect = [None, {"total": 0}]
+
+    assert repo.get_facets() == {"total": 0}
+    courses_collection.aggregate.assert_called_once()
+
+
+def test_refresher_only_refreshes_after_writes_or_max_age():
+    repository = MagicMock()
+    refresher = CatalogFacetsRefresher(repository, MagicMock(), max_age_seconds=60)
+    bus = InProcessInvalidationBus(MagicMock())
+    bus.subscribe(COURSES, refresher)
+
+    # Never refreshed yet
+    assert refresher.refresh_if_due() is True
+    assert refresher.refresh_if_due() is False
+
+    bus.publish(COURSES, "course1")
+    bus.publish(COURSES, "course2")
+    assert refresher.refresh_if_due() is True
+    assert refresher.refresh_if_due() is False
+
+    refresher.refreshed_at -= 60
+    assert refresher.refresh_if_due() is True
+    assert repository.refresh.call_count == 3
+
+
+def test_refresher_retries_after_a_failed_refresh():
+    repository = MagicMock()
+    repository.refresh.side_effect = [PyMongoError("down"), None]
+    refresher = CatalogFacetsRefresher(repository, MagicMock())
+    refresher.refreshed_at = 0
+    refresher.invalidate("course1")
+
+    assert refresher.refresh_if_due() is False
+    assert refresher.refresh_if_due() is True
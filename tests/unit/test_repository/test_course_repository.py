@@ -2,7 +2,17 @@ import pytest
 from unittest.mock import MagicMock, patch
 from bson import ObjectId
 from datetime import datetime, timedelta
-from src.repository.courses_repository import CoursesRepository
+from src.repository.courses_repository import (
+    COURSE_SUMMARY_PROJECTION,
+    ENROLLED_COUNT,
+    OPEN_COURSE_RESET_ATTEMPTS,
+    CoursesRepository,
+    enrollment_update,
+)
+from src.models.course_snapshot import EnrollmentOutcome
+from src.repository.versioning import with_version_bump
+from src.migrations.drop_course_students import drop_course_students
+from src.migrations.repair_enrolled_counts import repair_enrolled_counts
 
 @pytest.fixture
 def mock_collection():
@@ -10,10 +20,7 @@ def mock_collection():
 
 @pytest.fixture
 def mock_task_repo():
-    repo = MagicMock()
-    repo.get_tasks_by_course_ids.return_value = []
-    repo.clean_task.return_value = True
-    return repo
+    return MagicMock()
 
 @pytest.fixture
 def mock_logger():
@@ -34,6 +41,34 @@ def test_create_course(repo, mock_collection, mock_logger):
     assert course_data["students"] == []
     assert course_data["modules"] == []
 
+def test_create_courses_unordered_with_errors(repo, mock_collection):
+    from pymongo.errors import BulkWriteError
+
+    courses = [{"_id": ObjectId(), "name": "A"}, {"_id": ObjectId(), "name": "B"}]
+    mock_collection.insert_many.side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 1, "errmsg": "duplicate key"}]}
+    )
+
+    result = repo.create_courses(courses)
+
+    assert mock_collection.insert_many.call_args[1]["ordered"] is False
+    assert result == [(str(courses[0]["_id"]), None), (str(courses[1]["_id"]), "duplicate key")]
+    assert courses[0]["students"] == [] and courses[0]["modules"] == []
+
+def test_create_courses_invalidates_the_inserted_courses(mock_collection, mock_task_repo, mock_logger):
+    from pymongo.errors import BulkWriteError
+
+    bus = MagicMock()
+    repo = CoursesRepository(mock_collection, mock_task_repo, mock_logger, invalidation_bus=bus)
+    courses = [{"_id": ObjectId(), "name": "A"}, {"_id": ObjectId(), "name": "B"}]
+    mock_collection.insert_many.side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 0, "errmsg": "duplicate key"}]}
+    )
+
+    repo.create_courses(courses)
+
+    bus.publish.assert_called_once_with("courses", str(courses[1]["_id"]))
+
 def test_update_course_success(repo, mock_collection, mock_logger):
     mock_collection.update_one.return_value.modified_count = 1
     result = repo.update_course("64b81e3f4a8f1c1a9f123456", {"name": "Updated"})
@@ -69,40 +104,112 @@ def test_get_course_by_id_not_found(repo, mock_collection):
     assert result is None
 
 def test_enroll_student_in_course_success(repo, mock_collection, mock_logger):
-    mock_collection.update_one.return_value.modified_count = 1
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId("64b81e3f4a8f1c1a9f123456")}
     result = repo.enroll_student_in_course("64b81e3f4a8f1c1a9f123456", "student123")
-    assert result is True
+    assert result == EnrollmentOutcome.ENROLLED
+    mock_collection.find_one.assert_not_called()
     mock_logger.debug.assert_called()
 
-def test_enroll_student_in_course_fail(repo, mock_collection):
-    mock_collection.update_one.return_value.modified_count = 0
+def test_enroll_student_in_course_guard(repo, mock_collection):
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId("64b81e3f4a8f1c1a9f123456")}
+    repo.enroll_student_in_course("64b81e3f4a8f1c1a9f123456", "student123", ["c1"])
+
+    query, update = mock_collection.find_one_and_update.call_args[0]
+    guard = query["$expr"]["$and"]
+    assert {"$not": [{"$in": ["student123", {"$ifNull": ["$students", []]}]}]} in guard
+    assert {"$setIsSubset": [{"$ifNull": ["$correlatives_required_id", []]}, ["c1"]]} in guard
+    assert {"$lt": [ENROLLED_COUNT, {"$ifNull": ["$max_students", 0]}]} in guard
+    assert update == enrollment_update("student123", enrolled=True)
+
+def test_enroll_student_in_course_not_found(repo, mock_collection):
+    mock_collection.find_one_and_update.return_value = None
+    mock_collection.find_one.return_value = None
     result = repo.enroll_student_in_course("64b81e3f4a8f1c1a9f123456", "student123")
-    assert result is False
+    assert result == EnrollmentOutcome.NOT_FOUND
+
+@pytest.mark.parametrize(
+    "course, approved, expected",
+    [
+        ({"status": "closed", "max_students": 5}, None, EnrollmentOutcome.CLOSED),
+        ({"students_count": 1, "student_enrolled": True, "max_students": 5}, None, EnrollmentOutcome.ALREADY_ENROLLED),
+        ({"students_count": 5, "max_students": 5}, None, EnrollmentOutcome.FULL),
+        ({"max_students": 5, "correlatives_required_id": ["c1"]}, [], EnrollmentOutcome.MISSING_CORRELATIVES),
+        ({"max_students": 5}, None, EnrollmentOutcome.CONFLICT),
+    ],
+)
+def test_enroll_student_in_course_rejection_reason(repo, mock_collection, course, approved, expected):
+    mock_collection.find_one_and_update.return_value = None
+    mock_collection.find_one.return_value = {"_id": ObjectId("64b81e3f4a8f1c1a9f123456"), **course}
+    result = repo.enroll_student_in_course("64b81e3f4a8f1c1a9f123456", "student123", approved)
+    assert result == expected
 
-def test_is_student_enrolled_in_course(repo, mock_collection):
-    course = {"students": ["student123"]}
-    repo.get_course_by_id = MagicMock(return_value=course)
-    assert repo.is_student_enrolled_in_course("anyid", "student123") is True
-    assert repo.is_student_enrolled_in_course("anyid", "other") is False
+def test_snapshot_counts_like_enrolled_count():
+    from src.models.course_snapshot import CourseSnapshot
 
-def test_check_if_course_has_place_to_enroll(repo, mock_collection):
-    course = {"students": ["s1", "s2"], "max_students": 3}
-    repo.get_course_by_id = MagicMock(return_value=course)
-    assert repo.check_if_course_has_place_to_enroll("anyid") is True
+    counted = CourseSnapshot.from_dict({"students": ["s1"], "enrolled_count": 2, "max_students": 2})
+    legacy = CourseSnapshot.from_dict({"students": ["s1"], "max_students": 2})
+
+    assert counted.students_count == 2
+    assert not counted.has_place_to_enroll()
+    assert legacy.students_count == 1
 
-    course_full = {"students": ["s1", "s2", "s3"], "max_students": 3}
-    repo.get_course_by_id = MagicMock(return_value=course_full)
-    assert repo.check_if_course_has_place_to_enroll("anyid") is False
 
 def test_open_course_success(repo, mock_collection, mock_task_repo, mock_logger):
-    # Setup mock collection.update_one to pretend successful update
-    mock_collection.update_one.return_value.modified_count = 1
-    mock_collection.find_one.return_value = {"_id": ObjectId(), "status": "open"}
-    mock_task_repo.get_tasks_by_course_ids.return_value = []
+    mock_collection.find_one.return_value = {"_id": ObjectId()}
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(), "status": "open"}
+    mock_task_repo.reset_tasks_for_course.return_value = 25
 
-    result = repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01")
-    assert result is not None
+    course, tasks_reset = repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01")
+    assert course is not None
+    assert tasks_reset == 25
+    mock_task_repo.reset_tasks_for_course.assert_called_once_with("64b81e3f4a8f1c1a9f123456")
     mock_logger.debug.assert_called()
+    query, update = mock_collection.find_one_and_update.call_args[0]
+    assert query["status"] == "closed"
+    assert update["$set"]["students"] == []
+    assert update["$set"]["enrolled_count"] == 0
+
+def test_open_course_not_closed_resets_nothing(repo, mock_collection, mock_task_repo):
+    mock_collection.find_one.return_value = None
+
+    assert repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01") == (None, 0)
+    mock_task_repo.reset_tasks_for_course.assert_not_called()
+    mock_collection.find_one_and_update.assert_not_called()
+
+def test_open_course_resets_before_opening(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection, mock_task_repo, mock_logger, enrollment_repository=mock_enrollment_repo
+    )
+    calls = MagicMock()
+    calls.attach_mock(mock_enrollment_repo.remove_course_enrollments, "remove_enrollments")
+    calls.attach_mock(mock_task_repo.reset_tasks_for_course, "reset_tasks")
+    calls.attach_mock(mock_collection.find_one_and_update, "open")
+    mock_collection.find_one.return_value = {"_id": ObjectId()}
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId()}
+
+    repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01")
+
+    assert [call[0] for call in calls.mock_calls] == ["remove_enrollments", "reset_tasks", "open"]
+
+def test_open_course_retries_the_reset(repo, mock_collection, mock_task_repo):
+    mock_collection.find_one.return_value = {"_id": ObjectId()}
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(), "status": "open"}
+    mock_task_repo.reset_tasks_for_course.side_effect = [Exception("network error"), 3]
+
+    course, tasks_reset = repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01")
+
+    assert course is not None and tasks_reset == 3
+    assert mock_task_repo.reset_tasks_for_course.call_count == 2
+
+def test_open_course_keeps_the_course_closed_when_the_reset_fails(repo, mock_collection, mock_task_repo):
+    mock_collection.find_one.return_value = {"_id": ObjectId()}
+    mock_task_repo.reset_tasks_for_course.side_effect = Exception("network error")
+
+    with pytest.raises(Exception):
+        repo.open_course("64b81e3f4a8f1c1a9f123456", "2099-01-01", "2099-02-01")
+
+    assert mock_task_repo.reset_tasks_for_course.call_count == OPEN_COURSE_RESET_ATTEMPTS
+    mock_collection.find_one_and_update.assert_not_called()
 
 def test_open_course_invalid_dates(repo):
     with pytest.raises(ValueError):
@@ -113,9 +220,467 @@ def test_open_course_invalid_dates(repo):
         repo.open_course("id", yesterday, "2099-02-01")  # start date too early
 
 def test_close_course_success(repo, mock_collection, mock_logger):
-    mock_collection.update_one.return_value.modified_count = 1
-    mock_collection.find_one.return_value = {"_id": ObjectId(), "status": "closed"}
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(), "status": "closed"}
 
     result = repo.close_course("64b81e3f4a8f1c1a9f123456")
     assert result is not None
     mock_logger.debug.assert_called()
+
+def test_close_course_not_open(repo, mock_collection):
+    mock_collection.find_one_and_update.return_value = None
+
+    assert repo.close_course("64b81e3f4a8f1c1a9f123456") is None
+    mock_collection.find_one.assert_not_called()
+
+def test_get_course_snapshot_projects_students(repo, mock_collection):
+    mock_collection.find_one.return_value = {
+        "_id": ObjectId("64b81e3f4a8f1c1a9f123456"),
+        "creator_id": "owner1",
+        "max_students": 2,
+        "students_count": 1,
+        "student_enrolled": True,
+        "correlatives_required_id": ["c1"],
+    }
+
+    snapshot = repo.get_course_snapshot("64b81e3f4a8f1c1a9f123456", "student123")
+
+    mock_collection.find_one.assert_called_once()
+    _, projection = mock_collection.find_one.call_args[0]
+    assert "students" not in projection
+    assert projection["student_enrolled"] == {"$in": ["student123", {"$ifNull": ["$students", []]}]}
+    assert snapshot.is_owner("owner1") is True
+    assert snapshot.is_student_enrolled("student123") is True
+    assert snapshot.has_place_to_enroll() is True
+    assert snapshot.is_inscription_available() is True
+    assert snapshot.correlatives_required_id == ["c1"]
+
+def test_get_course_snapshot_not_found(repo, mock_collection):
+    mock_collection.find_one.return_value = None
+    assert repo.get_course_snapshot("64b81e3f4a8f1c1a9f123456", "student123") is None
+
+def test_course_snapshot_enrollment_window():
+    from src.models.course_snapshot import CourseSnapshot
+
+    snapshot = CourseSnapshot.from_dict({
+        "_id": "c1",
+        "enroll_date_start": datetime.now() - timedelta(days=5),
+        "enroll_date_end": datetime.now() - timedelta(days=1),
+        "students": ["s1"],
+        "max_students": 1,
+    })
+
+    assert snapshot.is_inscription_available() is False
+    assert snapshot.is_student_enrolled("s1") is True
+    assert snapshot.has_place_to_enroll() is False
+
+def test_search_uses_text_index_ranked_by_score(repo, mock_collection):
+    ids = [ObjectId() for _ in range(3)]
+    mock_collection.aggregate.return_value = [
+        {"_id": ids[0], "name": "Python", "score": 3.0},
+        {"_id": ids[1], "name": "Python II", "score": 2.0},
+        {"_id": ids[2], "name": "Intro", "score": 1.0},
+    ]
+
+    courses, next_cursor = repo.search_course_by_partial_information("python", max_results=2, max_time_ms=100)
+
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"$text": {"$search": "python"}}}
+    assert {"$sort": {"score": -1, "_id": 1}} in pipeline
+    assert {"$limit": 3} in pipeline
+    assert mock_collection.aggregate.call_args[1] == {"maxTimeMS": 100}
+    assert [c["name"] for c in courses] == ["Python", "Python II"]
+    assert "score" not in courses[0]
+    assert next_cursor is not None
+
+    # The next page continues right after the last (score, _id) seen
+    mock_collection.aggregate.return_value = []
+    repo.search_course_by_partial_information("python", max_results=2, cursor=next_cursor)
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[2] == {
+        "$match": {
+            "$or": [
+                {"score": {"$lt": 2.0}},
+                {"score": 2.0, "_id": {"$gt": ids[1]}},
+            ]
+        }
+    }
+
+def test_search_ignores_offset_with_cursor(repo, mock_collection):
+    from src.utils import encode_cursor
+
+    mock_collection.aggregate.return_value = []
+    text_cursor = encode_cursor({"mode": "text", "score": 2.0, "_id": str(ObjectId())})
+
+    repo.search_course_by_partial_information("python", offset=10, cursor=text_cursor)
+
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert all("$skip" not in stage for stage in pipeline)
+
+    find = mock_collection.find.return_value
+    find.sort.return_value.skip.return_value.limit.return_value.max_time_ms.return_value = []
+    prefix_cursor = encode_cursor({"mode": "prefix", "_id": str(ObjectId())})
+
+    repo.search_course_by_partial_information("py", offset=10, cursor=prefix_cursor)
+
+    find.sort.return_value.skip.assert_called_once_with(0)
+
+def test_search_short_query_uses_escaped_prefix(repo, mock_collection):
+    mock_collection.find.return_value.sort.return_value.skip.return_value.limit.return_value.max_time_ms.return_value = []
+
+    courses, next_cursor = repo.search_course_by_partial_information("c+")
+
+    mock_collection.aggregate.assert_not_called()
+    query = mock_collection.find.call_args[0][0]
+    assert query["$or"][0] == {"name": {"$regex": "^c\\+", "$options": "i"}}
+    assert courses == []
+    assert next_cursor is None
+
+def test_search_without_text_matches_falls_back_to_prefix(repo, mock_collection):
+    mock_collection.aggregate.return_value = []
+    found = [{"_id": ObjectId(), "name": "Pythonic"}]
+    mock_collection.find.return_value.sort.return_value.skip.return_value.limit.return_value.max_time_ms.return_value = found
+
+    courses, _ = repo.search_course_by_partial_information("pyth")
+
+    assert courses == found
+
+def test_search_invalid_cursor(repo):
+    with pytest.raises(ValueError):
+        repo.search_course_by_partial_information("python", cursor="not-a-cursor")
+
+def test_get_paginated_courses_with_cursor(repo, mock_collection):
+    from src.utils import encode_cursor
+
+    last_id = ObjectId()
+    find = mock_collection.find.return_value
+    find.sort.return_value.skip.return_value.limit.return_value = []
+
+    repo.get_paginated_courses(0, 5, encode_cursor({"_id": str(last_id)}))
+
+    mock_collection.find.assert_called_once_with(
+        {"status": "open", "_id": {"$gt": last_id}}, COURSE_SUMMARY_PROJECTION
+    )
+    find.sort.assert_called_once_with("_id", 1)
+    find.sort.return_value.skip.assert_called_once_with(0)
+    find.sort.return_value.skip.return_value.limit.assert_called_once_with(5)
+
+def test_get_paginated_courses_ignores_offset_with_cursor(repo, mock_collection):
+    from src.utils import encode_cursor
+
+    find = mock_collection.find.return_value
+    find.sort.return_value.skip.return_value.limit.return_value = []
+
+    repo.get_paginated_courses(20, 5, encode_cursor({"_id": str(ObjectId())}))
+
+    find.sort.return_value.skip.assert_called_once_with(0)
+
+def test_get_courses_owned_by_user_ignores_offset_with_cursor(repo, mock_collection):
+    from src.utils import encode_cursor
+
+    last_id = ObjectId()
+    find = mock_collection.find.return_value
+    find.sort.return_value.skip.return_value.limit.return_value = []
+
+    repo.get_courses_owned_by_user("user1", 10, 5, encode_cursor({"_id": str(last_id)}))
+
+    assert mock_collection.find.call_args[0][0]["_id"] == {"$gt": last_id}
+    find.sort.return_value.skip.assert_called_once_with(0)
+
+def test_list_views_exclude_heavy_arrays(repo, mock_collection):
+    mock_collection.find.return_value = []
+
+    repo.get_all_courses()
+    repo.get_enrolled_courses("student1")
+
+    for call in mock_collection.find.call_args_list:
+        projection = call[0][1]
+        assert projection == COURSE_SUMMARY_PROJECTION
+        assert not {"students", "modules", "assistants"} & projection.keys()
+
+def test_get_courses_owned_by_user_keeps_offset(repo, mock_collection):
+    find = mock_collection.find.return_value
+    find.sort.return_value.skip.return_value.limit.return_value = [{"_id": ObjectId()}]
+
+    courses = repo.get_courses_owned_by_user("user1", 10, 5)
+
+    mock_collection.find.assert_called_once_with(
+        {"$or": [{"creator_id": "user1"}, {"assistants": "user1"}]}
+    )
+    find.sort.return_value.skip.assert_called_once_with(10)
+    assert len(courses) == 1
+
+@pytest.fixture
+def mock_enrollment_repo():
+    return MagicMock()
+
+def test_enroll_student_dual_writes_enrollment(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection, mock_task_repo, mock_logger, enrollment_repository=mock_enrollment_repo
+    )
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(course_id)}
+
+    assert repo.enroll_student_in_course(course_id, "student1") == EnrollmentOutcome.ENROLLED
+    mock_enrollment_repo.add_enrollment.assert_called_once_with(course_id, "student1")
+
+def test_enroll_student_undone_when_enrollment_fails(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection, mock_task_repo, mock_logger, enrollment_repository=mock_enrollment_repo
+    )
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(course_id)}
+    mock_enrollment_repo.add_enrollment.side_effect = Exception("write error")
+
+    with pytest.raises(Exception):
+        repo.enroll_student_in_course(course_id, "student1")
+
+    mock_collection.update_one.assert_called_once_with(
+        {"_id": ObjectId(course_id), "students": "student1"},
+        enrollment_update("student1", enrolled=False),
+    )
+
+def test_remove_student_dual_writes_enrollment(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection, mock_task_repo, mock_logger, enrollment_repository=mock_enrollment_repo
+    )
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.update_one.return_value.modified_count = 1
+
+    assert repo.remove_student_from_course(course_id, "student1") is True
+
+    mock_enrollment_repo.remove_enrollment.assert_called_once_with(course_id, "student1")
+    # Only a student that was enrolled lowers the counter
+    mock_collection.update_one.assert_called_once_with(
+        {"_id": ObjectId(course_id), "students": "student1"},
+        enrollment_update("student1", enrolled=False),
+    )
+
+def test_get_enrolled_courses_reads_enrollments_collection(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection,
+        mock_task_repo,
+        mock_logger,
+        enrollment_repository=mock_enrollment_repo,
+        read_enrollments_from_collection=True,
+    )
+    course_id = ObjectId()
+    mock_enrollment_repo.get_course_ids_by_student.return_value = [str(course_id)]
+    mock_collection.find.return_value = [{"_id": course_id}]
+
+    courses = repo.get_enrolled_courses("student1")
+
+    mock_collection.find.assert_called_once_with(
+        {"_id": {"$in": [course_id]}}, COURSE_SUMMARY_PROJECTION
+    )
+    assert courses == [{"_id": course_id}]
+
+def test_get_course_by_id_fills_students_from_enrollments(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    repo = CoursesRepository(
+        mock_collection,
+        mock_task_repo,
+        mock_logger,
+        enrollment_repository=mock_enrollment_repo,
+        read_enrollments_from_collection=True,
+    )
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id)}
+    mock_enrollment_repo.get_student_ids_by_course.return_value = ["s1", "s2"]
+
+    course = repo.get_course_by_id(course_id)
+
+    mock_collection.find_one.assert_called_once_with({"_id": ObjectId(course_id)}, {"students": 0})
+    assert course["students"] == ["s1", "s2"]
+
+@pytest.fixture
+def collection_repo(mock_collection, mock_task_repo, mock_logger, mock_enrollment_repo):
+    return CoursesRepository(
+        mock_collection,
+        mock_task_repo,
+        mock_logger,
+        enrollment_repository=mock_enrollment_repo,
+        read_enrollments_from_collection=True,
+    )
+
+def test_collection_mode_enroll_only_moves_the_counter(collection_repo, mock_collection, mock_enrollment_repo):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_enrollment_repo.create_enrollment.return_value = True
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(course_id)}
+
+    assert collection_repo.enroll_student_in_course(course_id, "student1") == EnrollmentOutcome.ENROLLED
+
+    mock_enrollment_repo.create_enrollment.assert_called_once_with(course_id, "student1")
+    query, update = mock_collection.find_one_and_update.call_args[0]
+    # The unique index of the enrollments guards the duplicates, not the array
+    assert all("$not" not in condition for condition in query["$expr"]["$and"])
+    assert update == enrollment_update("student1", enrolled=True, embedded=False)
+    assert "students" not in update[0]["$set"]
+
+def test_collection_mode_enroll_twice(collection_repo, mock_collection, mock_enrollment_repo):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_enrollment_repo.create_enrollment.return_value = False
+    mock_enrollment_repo.is_student_enrolled.return_value = True
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "status": "open", "max_students": 10, "students_count": 1}
+
+    outcome = collection_repo.enroll_student_in_course(course_id, "student1")
+
+    assert outcome == EnrollmentOutcome.ALREADY_ENROLLED
+    mock_collection.find_one_and_update.assert_not_called()
+
+def test_collection_mode_enroll_in_full_course_undoes_the_enrollment(collection_repo, mock_collection, mock_enrollment_repo):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_enrollment_repo.create_enrollment.return_value = True
+    mock_enrollment_repo.is_student_enrolled.return_value = False
+    mock_collection.find_one_and_update.return_value = None
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "status": "open", "max_students": 1, "students_count": 1}
+
+    assert collection_repo.enroll_student_in_course(course_id, "student1") == EnrollmentOutcome.FULL
+    mock_enrollment_repo.remove_enrollment.assert_called_once_with(course_id, "student1")
+
+def test_collection_mode_remove_student(collection_repo, mock_collection, mock_enrollment_repo):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_enrollment_repo.remove_enrollment.return_value = True
+
+    assert collection_repo.remove_student_from_course(course_id, "student1") is True
+    mock_collection.update_one.assert_called_once_with(
+        {"_id": ObjectId(course_id)},
+        enrollment_update("student1", enrolled=False, embedded=False),
+    )
+
+def test_collection_mode_remove_student_not_enrolled(collection_repo, mock_collection, mock_enrollment_repo):
+    mock_enrollment_repo.remove_enrollment.return_value = False
+
+    assert collection_repo.remove_student_from_course("64b81e3f4a8f1c1a9f123456", "student1") is False
+    mock_collection.update_one.assert_not_called()
+
+def test_collection_mode_create_course_without_students(collection_repo, mock_collection):
+    collection_repo.create_course({"name": "New"})
+
+    inserted = mock_collection.insert_one.call_args[0][0]
+    assert "students" not in inserted
+    assert inserted["enrolled_count"] == 0
+
+def test_drop_course_students_keeps_the_count(mock_collection, mock_logger):
+    mock_collection.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": 1}, {"_id": 2}, {"_id": 3},
+    ]
+    mock_collection.update_many.return_value.modified_count = 1
+
+    assert drop_course_students(mock_collection, mock_logger, batch_size=2) == (3, 2)
+
+    query, update = mock_collection.update_many.call_args[0]
+    assert query == {"_id": {"$in": [3]}, "students": {"$exists": True}}
+    assert update == [{"$set": {"enrolled_count": ENROLLED_COUNT}}, {"$unset": "students"}]
+
+@pytest.fixture
+def cached_repo(mock_collection, mock_task_repo, mock_logger):
+    from src.repository.cache import LRUCache
+
+    return CoursesRepository(mock_collection, mock_task_repo, mock_logger, cache=LRUCache())
+
+def test_get_course_by_id_reads_through_cache(cached_repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "creator_id": "u1"}
+
+    cached_repo.get_course_by_id(course_id)
+    assert cached_repo.is_user_owner(course_id, "u1") is True
+
+    mock_collection.find_one.assert_called_once()
+    assert cached_repo.cache.stats()["hits"] == 1
+
+def test_course_writes_invalidate_cache(cached_repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "assistants": []}
+    mock_collection.update_one.return_value.modified_count = 1
+
+    cached_repo.get_course_by_id(course_id)
+    cached_repo.add_assistant_to_course(course_id, "a1")
+    cached_repo.get_course_by_id(course_id)
+
+    assert mock_collection.find_one.call_count == 2
+
+def test_enrollment_invalidates_cache(cached_repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "students": []}
+    mock_collection.find_one_and_update.return_value = {"_id": ObjectId(course_id)}
+
+    cached_repo.get_course_by_id(course_id)
+    cached_repo.enroll_student_in_course(course_id, "s1")
+
+    assert cached_repo.cache.stats()["entries"] == 0
+
+def test_course_writes_bump_version(repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.update_one.return_value.modified_count = 1
+
+    repo.update_course(course_id, {"name": "Updated"})
+
+    update = mock_collection.update_one.call_args[0][1]
+    assert update["$inc"] == {"version": 1}
+    assert update["$currentDate"] == {"updated_at": True}
+
+def test_get_course_version_projects_version_only(repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    updated_at = datetime(2025, 1, 1)
+    mock_collection.find_one.return_value = {"version": 3, "updated_at": updated_at}
+
+    assert repo.get_course_version(course_id) == {"version": 3, "updated_at": updated_at}
+    mock_collection.find_one.assert_called_once_with(
+        {"_id": ObjectId(course_id)}, {"_id": 0, "version": 1, "updated_at": 1}
+    )
+
+def test_get_course_version_of_course_without_version(repo, mock_collection):
+    mock_collection.find_one.return_value = {}
+    assert repo.get_course_version("64b81e3f4a8f1c1a9f123456") is None
+
+    mock_collection.find_one.return_value = {"name": "Legacy"}
+    assert repo.get_course_version("64b81e3f4a8f1c1a9f123456") == {"version": 0, "updated_at": None}
+
+def test_get_course_version_answered_by_cache(cached_repo, mock_collection):
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    mock_collection.find_one.return_value = {"_id": ObjectId(course_id), "version": 2}
+
+    cached_repo.get_course_by_id(course_id)
+
+    assert cached_repo.get_course_version(course_id)["version"] == 2
+    mock_collection.find_one.assert_called_once()
+
+def test_iter_all_courses_reads_in_batches(repo, mock_collection):
+    cursor = mock_collection.find.return_value.batch_size.return_value
+
+    assert repo.iter_all_courses(batch_size=100) is cursor
+    mock_collection.find.assert_called_once_with({}, COURSE_SUMMARY_PROJECTION)
+    mock_collection.find.return_value.batch_size.assert_called_once_with(100)
+
+def test_create_course_starts_enrolled_count(repo, mock_collection):
+    repo.create_course({"name": "New"})
+
+    inserted = mock_collection.insert_one.call_args[0][0]
+    assert inserted["students"] == []
+    assert inserted["enrolled_count"] == 0
+
+def test_summary_projection_counts_without_the_students_array():
+    assert "students" not in COURSE_SUMMARY_PROJECTION
+    assert COURSE_SUMMARY_PROJECTION["enrolled_count"] == ENROLLED_COUNT
+
+def test_repair_enrolled_counts_in_batches(mock_collection, mock_logger):
+    mock_collection.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": 1}, {"_id": 2}, {"_id": 3},
+    ]
+    mock_collection.update_many.return_value.modified_count = 1
+
+    assert repair_enrolled_counts(mock_collection, mock_logger, batch_size=2) == (3, 2)
+
+    batches = [call[0][0]["_id"]["$in"] for call in mock_collection.update_many.call_args_list]
+    assert batches == [[1, 2], [3]]
+    # The count is computed from the array in the same write
+    update = mock_collection.update_many.call_args[0][1]
+    assert update == [{"$set": {"enrolled_count": {"$size": {"$ifNull": ["$students", []]}}}}]
+
+def test_enrollment_update_counts_from_the_array_when_there_is_no_counter():
+    # An $inc would start a missing counter at 1 or -1
+    enroll_stage = enrollment_update("student1", enrolled=True)[0]["$set"]
+    remove_stage = enrollment_update("student1", enrolled=False)[0]["$set"]
+
+    assert enroll_stage["enrolled_count"] == {"$add": [ENROLLED_COUNT, 1]}
+    assert remove_stage["enrolled_count"] == {"$subtract": [ENROLLED_COUNT, 1]}
+    assert enroll_stage["students"]["$concatArrays"][1] == [{"$literal": "student1"}]
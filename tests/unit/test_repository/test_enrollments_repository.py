@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo.errors import DuplicateKeyError
+from src.repository.enrollments_repository import EnrollmentsRepository
+from src.migrations.backfill_enrollments import backfill_enrollments
+
+
+@pytest.fixture
+def collection_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def logger_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def repo(collection_mock, logger_mock):
+    return EnrollmentsRepository(collection_mock, logger_mock)
+
+
+def test_declared_indexes():
+    unique_index, reverse_index = EnrollmentsRepository.INDEXES["collection"]
+
+    assert unique_index.document["key"] == {"course_id": 1, "student_id": 1}
+    assert unique_index.document["unique"] is True
+    assert reverse_index.document["key"] == {"student_id": 1, "course_id": 1}
+
+
+def test_add_enrollment_is_an_upsert(repo, collection_mock):
+    assert repo.add_enrollment("course1", "student1") is True
+
+    query, update = collection_mock.update_one.call_args[0]
+    assert query == {"course_id": "course1", "student_id": "student1"}
+    assert "$setOnInsert" in update
+    assert collection_mock.update_one.call_args[1]["upsert"] is True
+
+
+def test_add_enrollment_concurrent_duplicate(repo, collection_mock):
+    collection_mock.update_one.side_effect = DuplicateKeyError("duplicate")
+
+    assert repo.add_enrollment("course1", "student1") is True
+
+
+def test_remove_enrollment(repo, collection_mock):
+    collection_mock.delete_one.return_value.deleted_count = 1
+
+    assert repo.remove_enrollment("course1", "student1") is True
+    collection_mock.delete_one.assert_called_once_with(
+        {"course_id": "course1", "student_id": "student1"}
+    )
+
+
+def test_get_course_ids_by_student(repo, collection_mock):
+    collection_mock.find.return_value.sort.return_value = [
+        {"course_id": "course1"},
+        {"course_id": "course2"},
+    ]
+
+    assert repo.get_course_ids_by_student("student1") == ["course1", "course2"]
+    collection_mock.find.assert_called_once_with(
+        {"student_id": "student1"}, {"_id": 0, "course_id": 1}
+    )
+
+
+def test_backfill_enrollments(repo, collection_mock, logger_mock):
+    courses_mock = MagicMock()
+    courses_mock.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": "course1", "students": ["s1", "s2"]},
+        {"_id": "course2", "students": ["s3"]},
+    ]
+    courses_mock.find_one.side_effect = [
+        {"_id": "course1", "students": ["s1", "s2"]},
+        {"_id": "course2", "students": ["s3"]},
+    ]
+    collection_mock.bulk_write.return_value.upserted_count = 1
+
+    processed, created = backfill_enrollments(courses_mock, repo, logger_mock)
+
+    assert processed == 2
+    assert created == 2
+    first_batch = collection_mock.bulk_write.call_args_list[0]
+    assert len(first_batch[0][0]) == 2
+    assert first_batch[1]["ordered"] is False
+
+
+def test_backfill_enrollments_removes_students_that_left(repo, collection_mock, logger_mock):
+    courses_mock = MagicMock()
+    courses_mock.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": "course1", "students": ["s1", "s2"]},
+    ]
+    # s2 was removed from the course after the cursor read it
+    courses_mock.find_one.return_value = {"_id": "course1", "students": ["s1"]}
+    collection_mock.bulk_write.return_value.upserted_count = 2
+    collection_mock.delete_many.return_value.deleted_count = 1
+
+    processed, created = backfill_enrollments(courses_mock, repo, logger_mock)
+
+    assert (processed, created) == (1, 1)
+    collection_mock.delete_many.assert_called_once_with(
+        {"course_id": "course1", "student_id": {"$in": ["s2"]}}
+    )
+
+
+def test_backfill_enrollments_skips_verification_without_new_enrollments(
+    repo, collection_mock, logger_mock
+):
+    courses_mock = MagicMock()
+    courses_mock.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": "course1", "students": ["s1"]},
+    ]
+    collection_mock.bulk_write.return_value.upserted_count = 0
+
+    backfill_enrollments(courses_mock, repo, logger_mock)
+
+    courses_mock.find_one.assert_not_called()
@@ -0,0 +1,108 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from src.repository.indexes import collscan_report, declared_collections, reconcile_indexes
+from src.repository.courses_repository import CoursesRepository
+from src.repository.enrollments_repository import EnrollmentsRepository
+from src.repository.feedback_repository import FeedBackRepository
+from src.repository.module_repository import ModuleRepository
+from src.repository.tasks_repository import TasksRepository
+from src.repository.users_data_repository import UsersDataRepository
+
+
+class FakeRepository:
+    INDEXES = {
+        "collection": [
+            IndexModel([("course_id", ASCENDING)]),
+            IndexModel([("student_id", ASCENDING)], name="by_student"),
+        ]
+    }
+    QUERY_SHAPES = {"collection": [("by course", {"course_id": "c1"}, None)]}
+
+    def __init__(self, collection):
+        self.collection = collection
+
+
+@pytest.fixture
+def collection():
+    collection = MagicMock()
+    collection.name = "fake"
+    collection.index_information.return_value = {"_id_": {}, "old_index": {}}
+    return collection
+
+
+def test_reconcile_creates_missing_indexes(collection):
+    collection.index_information.return_value["course_id_1"] = {}
+
+    summary = reconcile_indexes([FakeRepository(collection)], MagicMock())
+
+    assert summary["fake"]["existing"] == ["course_id_1"]
+    assert summary["fake"]["created"] == ["by_student"]
+    assert summary["fake"]["undeclared"] == ["old_index"]
+    collection.create_indexes.assert_called_once()
+
+
+def test_reconcile_reports_conflicts(collection):
+    collection.create_indexes.side_effect = OperationFailure("IndexOptionsConflict")
+
+    summary = reconcile_indexes([FakeRepository(collection)], MagicMock())
+
+    assert summary["fake"]["conflicts"] == ["course_id_1", "by_student"]
+    assert summary["fake"]["created"] == []
+
+
+@pytest.mark.parametrize(
+    "winning_plan, flagged",
+    [
+        ({"stage": "COLLSCAN"}, True),
+        ({"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}, False),
+        ({"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}, True),
+    ],
+)
+def test_collscan_report(collection, winning_plan, flagged):
+    collection.find.return_value.explain.return_value = {
+        "queryPlanner": {"winningPlan": winning_plan}
+    }
+
+    report = collscan_report([FakeRepository(collection)], MagicMock())
+
+    assert bool(report) is flagged
+
+
+def test_every_repository_declaration_resolves():
+    repositories = [
+        CoursesRepository(MagicMock(), MagicMock(), MagicMock()),
+        EnrollmentsRepository(MagicMock(), MagicMock()),
+        FeedBackRepository(MagicMock(), MagicMock(), MagicMock()),
+        ModuleRepository(MagicMock(), MagicMock(), MagicMock()),
+        TasksRepository(MagicMock(), MagicMock()),
+        UsersDataRepository(MagicMock(), MagicMock(), MagicMock()),
+    ]
+
+    for repository in repositories:
+        declared = list(declared_collections(repository))
+        assert declared
+        for _, index_models, query_shapes in declared:
+            assert index_models
+            assert query_shapes
+
+
+def test_reconcile_script_declares_every_repository_without_services():
+    import sys
+    from src.migrations.reconcile_indexes import declared_repositories
+
+    repositories = declared_repositories(MagicMock(), MagicMock())
+
+    assert {type(repository).__name__ for repository in repositories} == {
+        "UsersDataRepository",
+        "FeedBackRepository",
+        "TasksRepository",
+        "SubmissionsRepository",
+        "EnrollmentsRepository",
+        "CoursesRepository",
+        "ModuleRepository",
+    }
+    for repository in repositories:
+        assert list(declared_collections(repository))
+    assert "services" not in sys.modules
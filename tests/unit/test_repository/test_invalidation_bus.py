@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from src.repository.cache import LRUCache
+from src.repository.invalidation_bus import (
+    COURSES,
+    MODULES,
+    USERS,
+    ChangeStreamInvalidationBus,
+    InProcessInvalidationBus,
+    course_key,
+    module_key,
+    user_key,
+)
+
+COURSE_ID = ObjectId("64b81e3f4a8f1c1a9f123456")
+
+
+@pytest.fixture
+def caches():
+    return {COURSES: LRUCache(), MODULES: LRUCache(), USERS: LRUCache()}
+
+
+def subscribe_all(bus, caches):
+    for namespace, cache in caches.items():
+        bus.subscribe(namespace, cache)
+    return bus
+
+
+@pytest.fixture
+def change_stream_bus(caches):
+    bus = ChangeStreamInvalidationBus(
+        MagicMock(),
+        {
+            "courses": (COURSES, course_key),
+            "modules": (MODULES, module_key),
+            "users": (USERS, user_key),
+        },
+        MagicMock(),
+        retry_seconds=0,
+    )
+    return subscribe_all(bus, caches)
+
+
+def test_in_process_publish_invalidates_subscribers(caches):
+    bus = subscribe_all(InProcessInvalidationBus(MagicMock()), caches)
+    caches[COURSES].set(str(COURSE_ID), {"name": "Math"})
+    caches[MODULES].set(str(COURSE_ID), [])
+
+    bus.publish(COURSES, COURSE_ID)
+
+    assert caches[COURSES].get(str(COURSE_ID)) is None
+    assert caches[MODULES].get(str(COURSE_ID)) == []
+
+
+def test_change_on_course_evicts_its_key(change_stream_bus, caches):
+    caches[COURSES].set(str(COURSE_ID), {"name": "Math"})
+    caches[COURSES].set("other", {"name": "Physics"})
+
+    change_stream_bus.handle_change(
+        {"operationType": "update", "ns": {"coll": "courses"}, "documentKey": {"_id": COURSE_ID}}
+    )
+
+    assert caches[COURSES].get(str(COURSE_ID)) is None
+    assert caches[COURSES].get("other") is not None
+
+
+def test_change_on_user_evicts_by_student_id(change_stream_bus, caches):
+    caches[USERS].set("assistant1", {"assistant": {}})
+
+    change_stream_bus.handle_change(
+        {
+            "operationType": "update",
+            "ns": {"coll": "users"},
+            "documentKey": {"_id": ObjectId()},
+            "fullDocument": {"student_id": "assistant1"},
+        }
+    )
+
+    assert caches[USERS].get("assistant1") is None
+
+
+def test_delete_without_key_clears_namespace(change_stream_bus, caches):
+    caches[MODULES].set(str(COURSE_ID), [])
+    caches[COURSES].set(str(COURSE_ID), {"name": "Math"})
+
+    change_stream_bus.handle_change(
+        {"operationType": "delete", "ns": {"coll": "modules"}, "documentKey": {"_id": ObjectId()}}
+    )
+
+    assert caches[MODULES].stats()["entries"] == 0
+    assert caches[COURSES].stats()["entries"] == 1
+
+
+class FakeStream:
+    def __init__(self, bus, changes):
+        self.bus = bus
+        self.changes = list(changes)
+        self.alive = True
+        self.resume_token = {"_data": "new"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def try_next(self):
+        if not self.changes:
+            self.bus.stop()
+            return None
+        return self.changes.pop(0)
+
+
+def test_stream_error_clears_caches_and_resumes(change_stream_bus, caches):
+    caches[COURSES].set(str(COURSE_ID), {"name": "Math"})
+    change_stream_bus.resume_token = {"_data": "old"}
+    change_stream_bus.database.watch.side_effect = [
+        OperationFailure("resume token not found", code=286),
+        FakeStream(change_stream_bus, []),
+    ]
+
+    change_stream_bus._run()
+
+    assert caches[COURSES].stats()["entries"] == 0
+    # The lost token was dropped, the new stream started from now
+    assert change_stream_bus.database.watch.call_args_list[1][1]["resume_after"] is None
+    assert change_stream_bus.resume_token == {"_data": "new"}
+
+
+def test_stream_changes_are_applied(change_stream_bus, caches):
+    caches[COURSES].set(str(COURSE_ID), {"name": "Math"})
+    change = {"operationType": "update", "ns": {"coll": "courses"}, "documentKey": {"_id": COURSE_ID}}
+    change_stream_bus.database.watch.return_value = FakeStream(change_stream_bus, [change])
+
+    change_stream_bus._run()
+
+    assert caches[COURSES].get(str(COURSE_ID)) is None
@@ -4,6 +4,7 @@ from bson import ObjectId
 from src.repository.module_repository import ModuleRepository
 from src.models.module import Module
 from src.models.resource import Resource
+from src.repository.versioning import with_version_bump
 
 ID = "6498ef1b9a8f4b1234567890"  # string hex de 24 caracteres
 ID_OBJ = ObjectId(ID)
@@ -62,11 +63,11 @@ def test_add_module_to_course_existing_course(repo, mock_collection_modules, moc
 
     mock_collection_modules.update_one.assert_called_once_with(
         {"course_id": ObjectId(course_id)},
-        {"$addToSet": {"modules": module.to_dict()}}
+        with_version_bump({"$addToSet": {"modules": module.to_dict()}})
     )
     mock_collection_courses.update_one.assert_called_once_with(
         {"_id": ObjectId(course_id)},
-        {"$addToSet": {"modules": "module_id"}}
+        with_version_bump({"$addToSet": {"modules": "module_id"}})
     )
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Add module {module} to course {course_id}")
     assert returned_id == "module_id"
@@ -80,12 +81,13 @@ def test_add_module_to_course_new_course(repo, mock_collection_modules, mock_col
 
     returned_id = repo.add_module_to_course(course_id, module)
 
-    mock_collection_modules.insert_one.assert_called_once_with(
-        {"course_id": ObjectId(course_id), "modules": [module.to_dict()]}
-    )
+    inserted = mock_collection_modules.insert_one.call_args[0][0]
+    assert inserted["course_id"] == ObjectId(course_id)
+    assert inserted["modules"] == [module.to_dict()]
+    assert inserted["version"] == 1
     mock_collection_courses.update_one.assert_called_once_with(
         {"_id": ObjectId(course_id)},
-        {"$addToSet": {"modules": "module_id"}}
+        with_version_bump({"$addToSet": {"modules": "module_id"}})
     )
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Add module {module} to course {course_id}")
     assert returned_id == "module_id"
@@ -134,10 +136,10 @@ def test_modify_module_in_course_update_fields_only(repo, mock_collection_module
 
     mock_collection_modules.update_one.assert_called_once_with(
         {"course_id": ObjectId(course_id), "modules._id": module_id},
-        {"$set": {
+        with_version_bump({"$set": {
             "modules.$.name": "Updated Module",
             "modules.$.description": "New Desc"
-        }}
+        }})
     )
     mock_logger.debug.assert_any_call(
         f"[MODULE REPOSITORY] Updated module {module_id} in course {course_id}: "
@@ -171,12 +173,12 @@ def test_delete_module_from_course_success(repo, mock_collection_modules, mock_c
     repo.get_module_by_id.assert_called_once_with(course_id, module_id)
     mock_collection_modules.update_one.assert_called_with(
         {"course_id": ObjectId(course_id)},
-        {"$pull": {"modules": {"_id": module_id}}}
+        with_version_bump({"$pull": {"modules": {"_id": module_id}}})
     )
     mock_collection_modules.update_many.assert_called_once()
     mock_collection_courses.update_one.assert_called_once_with(
         {"_id": ObjectId(course_id)},
-        {"$pull": {"modules": module_id}}
+        with_version_bump({"$pull": {"modules": module_id}})
     )
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Deleted module {module_id} from course {course_id}")
     assert result is True
@@ -281,7 +283,7 @@ def test_add_resource_to_module_success(repo, mock_collection_modules, mock_logg
 
     mock_collection_modules.update_one.assert_called_once_with(
         {"course_id": ObjectId(course_id), "modules._id": module_id},
-        {"$addToSet": {"modules.$.resources": resource_dict}},
+        with_version_bump({"$addToSet": {"modules.$.resources": resource_dict}}),
     )
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Resource {resource_dict} added to module {module_id}")
     assert result is True
@@ -313,7 +315,7 @@ def test_delete_resource_from_module_success(repo, mock_collection_modules, mock
     repo.get_resource_from_module.assert_called_once_with(course_id, module_id, resource_id)
     mock_collection_modules.update_one.assert_called_once_with(
         {"course_id": ObjectId(course_id), "modules._id": module_id},
-        {"$pull": {"modules.$.resources": {"_id": resource_id}}},
+        with_version_bump({"$pull": {"modules.$.resources": {"_id": resource_id}}}),
     )
     mock_collection_modules.update_many.assert_called_once()
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Resource {resource_id} deleted from module {module_id}")
@@ -332,3 +334,79 @@ def test_delete_resource_from_module_failure(repo, mock_collection_modules, mock
 
     mock_logger.debug.assert_called_with(f"[MODULE REPOSITORY] Failed to delete resource {resource_id} from module {module_id}")
     assert result is False
+
+
+def test_module_writes_invalidate_course_and_modules_caches():
+    from src.repository.cache import LRUCache
+    from src.repository.invalidation_bus import COURSES, MODULES, InProcessInvalidationBus
+
+    collection_modules = MagicMock()
+    collection_modules.find_one.return_value = None
+    courses_cache, modules_cache = LRUCache(), LRUCache()
+    bus = InProcessInvalidationBus(MagicMock())
+    bus.subscribe(COURSES, courses_cache)
+    bus.subscribe(MODULES, modules_cache)
+    course_id = "64b81e3f4a8f1c1a9f123456"
+    courses_cache.set(course_id, {"modules": []})
+    modules_cache.set(course_id, [])
+    repo = ModuleRepository(
+        collection_modules, MagicMock(), MagicMock(), cache=modules_cache, invalidation_bus=bus
+    )
+
+    repo.add_module_to_course(course_id, Module("Intro", "desc", 1))
+
+    assert courses_cache.get(course_id) is None
+    assert modules_cache.get(course_id) is None
+
+
+def test_get_modules_from_course_reads_through_cache():
+    from src.repository.cache import LRUCache
+
+    collection_modules = MagicMock()
+    collection_modules.find_one.return_value = {"modules": [{"_id": "m1"}]}
+    repo = ModuleRepository(collection_modules, MagicMock(), MagicMock(), cache=LRUCache())
+
+    repo.get_modules_from_course(ID)
+    assert repo.get_modules_from_course(ID) == [{"_id": "m1"}]
+
+    collection_modules.find_one.assert_called_once()
+
+
+def test_get_modules_version(repo, mock_collection_modules):
+    mock_collection_modules.find_one.return_value = {"version": 4, "updated_at": None}
+
+    assert repo.get_modules_version(ID) == {"version": 4, "updated_at": None}
+    mock_collection_modules.find_one.assert_called_once_with(
+        {"course_id": ID_OBJ}, {"_id": 0, "version": 1, "updated_at": 1}
+    )
+
+
+def test_get_modules_version_without_modules(repo, mock_collection_modules):
+    mock_collection_modules.find_one.return_value = None
+    assert repo.get_modules_version(ID) is None
+
+
+def test_get_modules_version_from_cache():
+    from src.repository.cache import LRUCache
+    from src.repository.invalidation_bus import MODULES, InProcessInvalidationBus
+
+    collection_modules = MagicMock()
+    collection_modules.find_one.return_value = {
+        "modules": [{"_id": "m1"}], "version": 4, "updated_at": None
+    }
+    bus = InProcessInvalidationBus(MagicMock())
+    cache = LRUCache()
+    bus.subscribe(MODULES, cache)
+    repo = ModuleRepository(
+        collection_modules, MagicMock(), MagicMock(), cache=cache, invalidation_bus=bus
+    )
+
+    repo.get_modules_from_course(ID)
+    assert repo.get_modules_version(ID) == {"version": 4, "updated_at": None}
+    collection_modules.find_one.assert_called_once()
+
+    # A write drops the version with the modules
+    bus.publish(MODULES, ID)
+    collection_modules.find_one.return_value["version"] = 5
+    assert repo.get_modules_version(ID) == {"version": 5, "updated_at": None}
+    assert collection_modules.find_one.call_count == 2
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo.errors import DuplicateKeyError
+from src.repository.submissions_repository import SubmissionsRepository
+from src.migrations.backfill_submissions import backfill_submissions
+from src.migrations.drop_task_submissions import drop_task_submissions
+
+
+@pytest.fixture
+def collection_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def logger_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def repo(collection_mock, logger_mock):
+    return SubmissionsRepository(collection_mock, logger_mock)
+
+
+def test_declared_indexes():
+    unique_index, student_index = SubmissionsRepository.INDEXES["collection"]
+
+    assert unique_index.document["key"] == {"task_id": 1, "student_id": 1}
+    assert unique_index.document["unique"] is True
+    assert student_index.document["key"] == {"student_id": 1, "course_id": 1}
+
+
+def test_save_submission_is_an_upsert(repo, collection_mock):
+    repo.save_submission("task1", "course1", "student1", {"attachments": []})
+
+    query, update = collection_mock.update_one.call_args[0]
+    assert query == {"task_id": "task1", "student_id": "student1"}
+    assert update["$set"] == {"course_id": "course1", "attachments": []}
+    assert "submitted_at" in update["$setOnInsert"]
+    assert collection_mock.update_one.call_args[1]["upsert"] is True
+
+
+def test_save_submission_concurrent_duplicate(repo, collection_mock):
+    collection_mock.update_one.side_effect = [DuplicateKeyError("duplicate"), None]
+
+    repo.save_submission("task1", "course1", "student1", {"attachments": []})
+
+    assert collection_mock.update_one.call_count == 2
+
+
+def test_get_submissions_by_task_ids_groups_by_task(repo, collection_mock):
+    collection_mock.find.return_value = [
+        {"task_id": "task1", "student_id": "s1", "on_time": True},
+        {"task_id": "task1", "student_id": "s2", "on_time": False},
+        {"task_id": "task2", "student_id": "s1", "on_time": True},
+    ]
+
+    submissions = repo.get_submissions_by_task_ids(["task1", "task2"])
+
+    assert submissions == {
+        "task1": {"s1": {"on_time": True}, "s2": {"on_time": False}},
+        "task2": {"s1": {"on_time": True}},
+    }
+    collection_mock.find.assert_called_once()
+    assert collection_mock.find.call_args[0][0] == {
+        "task_id": {"$in": ["task1", "task2"]}
+    }
+
+
+def test_get_submissions_by_task_ids_without_tasks(repo, collection_mock):
+    assert repo.get_submissions_by_task_ids([]) == {}
+    collection_mock.find.assert_not_called()
+
+
+def test_get_task_ids_by_student_in_course(repo, collection_mock):
+    collection_mock.find.return_value = [{"task_id": "task1"}, {"task_id": "task2"}]
+
+    assert repo.get_task_ids_by_student("s1", "course1") == ["task1", "task2"]
+    collection_mock.find.assert_called_once_with(
+        {"student_id": "s1", "course_id": "course1"}, {"_id": 0, "task_id": 1}
+    )
+
+
+def test_backfill_submissions(repo, collection_mock, logger_mock):
+    tasks_mock = MagicMock()
+    tasks_mock.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": "task1", "course_id": "course1", "submissions": {"s1": {"on_time": True}, "s2": {"on_time": False}}},
+        {"_id": "task2", "course_id": "course1", "submissions": {"s1": {"on_time": True}, "s2": None}},
+    ]
+    collection_mock.bulk_write.return_value.upserted_count = 2
+
+    processed, created = backfill_submissions(
+        tasks_mock, repo, logger_mock, batch_size=2
+    )
+
+    assert processed == 2
+    assert created == 4
+    batches = collection_mock.bulk_write.call_args_list
+    assert [len(batch[0][0]) for batch in batches] == [2, 1]
+    assert batches[0][1]["ordered"] is False
+
+
+def test_save_submissions_never_overwrites(repo, collection_mock):
+    collection_mock.bulk_write.return_value.upserted_count = 1
+
+    repo.save_submissions([("task1", "course1", "s1", {"on_time": True})])
+
+    operation = collection_mock.bulk_write.call_args[0][0][0]
+    assert set(operation._doc) == {"$setOnInsert"}
+    assert operation._doc["$setOnInsert"]["on_time"] is True
+
+
+def test_drop_task_submissions_in_batches(logger_mock):
+    tasks_mock = MagicMock()
+    tasks_mock.find.return_value.sort.return_value.batch_size.return_value = [
+        {"_id": "task1"}, {"_id": "task2"}, {"_id": "task3"},
+    ]
+    tasks_mock.update_many.return_value.modified_count = 1
+
+    assert drop_task_submissions(tasks_mock, logger_mock, batch_size=2) == (3, 2)
+
+    query, update = tasks_mock.update_many.call_args[0]
+    assert query == {"_id": {"$in": ["task3"]}, "submissions": {"$exists": True}}
+    assert update == {"$unset": {"submissions": ""}}
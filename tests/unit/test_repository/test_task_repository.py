@@ -1,8 +1,16 @@
+import mongomock
 import pytest
 from unittest.mock import MagicMock, patch
 from bson import ObjectId
 
-from src.repository.tasks_repository import TasksRepository
+from src.repository.tasks_repository import (
+    HAS_SUBMISSION,
+    TASK_FEED_SORT,
+    TasksRepository,
+    after_task_cursor,
+    next_task_cursor,
+)
+from src.utils import encode_cursor
 from src.models.task import Task
 from src.models.submission import Submission
 
@@ -84,53 +92,131 @@ def test_get_tasks_by_query(repo, collection_mock):
     collection_mock.find.assert_called_with({"status": "active"})
 
 
-def test_get_task_with_submission_for_student_exists(repo):
-    task = Task(title="Test", submissions={"student1": {"attachments": []}}, due_date="2025-10-10", course_id="c123", module_id="m123")
-    with patch.object(repo, "get_tasks_by_query", return_value=[task]):
-        result = repo.get_task_with_submission_for_student("taskid", "student1")
+def test_get_task_with_submission_for_student_exists(repo, collection_mock):
+    collection_mock.find_one.return_value = {
+        "_id": ID, "title": "Test", "course_id": "c123", "module_id": "m123",
+        "submissions": {"student1": {"attachments": []}},
+    }
+
+    result = repo.get_task_with_submission_for_student(ID, "student1")
 
     assert result is not None
-    assert result.submissions == {"student1": {"attachments": []}}
+    assert list(result.submissions) == ["student1"]
+    query, projection = collection_mock.find_one.call_args[0]
+    assert query == {"_id": ID}
+    assert projection["submissions.student1"] == 1
+    assert "submissions" not in projection
+    assert projection["title"] == 1
+
 
+def test_get_task_with_submission_for_student_no_submissions(repo, collection_mock):
+    collection_mock.find_one.return_value = {
+        "_id": ID, "title": "Test", "course_id": "c123", "module_id": "m123"
+    }
 
-def test_get_task_with_submission_for_student_no_submissions(repo):
-    task = Task(title="Test", submissions={}, due_date="2025-10-10", course_id="c123", module_id="m123")
-    with patch.object(repo, "get_tasks_by_query", return_value=[task]):
-        result = repo.get_task_with_submission_for_student("taskid", "student1")
+    result = repo.get_task_with_submission_for_student(ID, "student1")
 
     assert result is not None
     assert result.submissions == {}
 
 
+def test_get_task_with_submission_for_student_task_not_found(repo, collection_mock):
+    collection_mock.find_one.return_value = None
+
+    assert repo.get_task_with_submission_for_student(ID, "student1") is None
+
+
 def test_add_task_submission_success(repo, collection_mock, logger_mock):
-    collection_mock.update_one.return_value.matched_count = 1
-    submission = Submission(attachments=[{"file": "file1"}])
-    with patch.object(
-        repo, 
-        "get_task_with_submission_for_student", 
-        return_value=Task(title="Test", submissions={"student1": submission.to_dict()}, due_date="2025-10-10", course_id="c123", module_id="m123")
-        ):
-        task = repo.add_task_submission("taskid", "student1", [{"file": "file1"}],True)
+    collection_mock.find_one_and_update.return_value = {
+        "_id": ID, "title": "Test", "course_id": "c123", "module_id": "m123",
+        "submissions": {"student1": {"attachments": [{"file": "file1"}], "on_time": True}},
+    }
+
+    task = repo.add_task_submission(ID, "student1", [{"file": "file1"}], True)
 
     assert "student1" in task.submissions
+    # One round trip, no re-read
+    collection_mock.find_one.assert_not_called()
+    kwargs = collection_mock.find_one_and_update.call_args[1]
+    assert kwargs["projection"]["submissions.student1"] == 1
     logger_mock.info.assert_called()
 
 
 def test_add_task_submission_task_not_found(repo, collection_mock):
-    collection_mock.update_one.return_value.matched_count = 0
+    collection_mock.find_one_and_update.return_value = None
 
     with pytest.raises(ValueError):
         repo.add_task_submission("taskid", "student1", [{"file": "file1"}],True)
 
 
-def test_get_tasks_by_course_ids_with_filters(repo, collection_mock):
-    tasks_dicts = [{"_id": ID_OBJ, "course_id": "course1", "title": "TEST1", "module_id": "mod123"}, {"_id": ID_OBJ_2, "course_id": "course2", "title": "TEST2", "module_id": "mod345"}]
-    collection_mock.find.return_value.skip.return_value.limit.return_value = tasks_dicts
+def test_next_task_cursor_points_after_last_task():
+    tasks = [
+        Task.from_dict({"_id": ID_OBJ_2, "title": "T1", "course_id": "c1", "module_id": "m1", "due_date": 1_700_000_000_000}),
+        Task.from_dict({"_id": ID_OBJ, "title": "T2", "course_id": "c1", "module_id": "m1", "due_date": 1_800_000_000_000}),
+    ]
 
-    result = repo.get_tasks_by_course_ids(["course1", "course2"], status="active", page=1, limit=2)
+    assert next_task_cursor(tasks, 3) is None
+    assert after_task_cursor(next_task_cursor(tasks, 2))["$or"][1] == {"due_date": 1_800_000_000_000, "_id": {"$gt": ID}}
 
-    assert len(result) == 2
-    collection_mock.find.assert_called()
+
+def test_after_task_cursor_without_due_date():
+    query = after_task_cursor(encode_cursor({"due_date": None, "_id": ID}))
+
+    # Tasks without due date sort first, after them come all the dated ones
+    assert query["$or"] == [
+        {"due_date": None, "_id": {"$gt": ID}},
+        {"due_date": {"$ne": None}},
+    ]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor({"due_date": 1}), encode_cursor({"due_date": 1, "_id": "bad"})])
+def test_after_task_cursor_invalid(cursor):
+    # InvalidCursorError, a ValueError
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        after_task_cursor(cursor)
+
+
+def test_get_tasks_by_teacher_single_aggregation(collection_mock, logger_mock):
+    courses_mock = MagicMock()
+    collection_mock.name = "tasks"
+    courses_mock.aggregate.return_value = [
+        {"_id": ID_OBJ, "course_id": "course1", "title": "TEST1", "module_id": "mod123"}
+    ]
+    repo = TasksRepository(collection_mock, logger_mock, collection_courses=courses_mock)
+
+    result = repo.get_tasks_by_teacher(
+        "teacher1", status="open", start_date=1, end_date=2, page=3, limit=10
+    )
+
+    assert [task.title for task in result] == ["TEST1"]
+    collection_mock.find.assert_not_called()
+    pipeline = courses_mock.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"$or": [{"creator_id": "teacher1"}, {"assistants": "teacher1"}]}}
+    lookup = pipeline[2]["$lookup"]
+    assert lookup["from"] == "tasks"
+    assert lookup["pipeline"] == [
+        {"$match": {"status": "open", "due_date": {"$gte": 1, "$lte": 2}}}
+    ]
+    assert pipeline[-3:] == [
+        {"$sort": {"due_date": 1, "_id": 1}},
+        {"$skip": 20},
+        {"$limit": 10},
+    ]
+
+
+def test_get_tasks_by_teacher_resumes_after_cursor(collection_mock, logger_mock):
+    courses_mock = MagicMock()
+    courses_mock.aggregate.return_value = []
+    repo = TasksRepository(collection_mock, logger_mock, collection_courses=courses_mock)
+
+    repo.get_tasks_by_teacher("teacher1", page=5, limit=10, cursor=encode_cursor({"due_date": 1, "_id": ID}))
+
+    pipeline = courses_mock.aggregate.call_args[0][0]
+    # The cursor filters inside the lookup, so each course resumes from its index
+    lookup_match = pipeline[2]["$lookup"]["pipeline"][0]["$match"]
+    assert lookup_match["$or"][1] == {"due_date": 1, "_id": {"$gt": ID}}
+    assert not any("$skip" in stage for stage in pipeline)
+    assert pipeline[-1] == {"$limit": 10}
 
 
 def test_update_task_success(repo, collection_mock):
@@ -154,10 +240,262 @@ def test_get_tasks_done_by_student(repo, collection_mock):
     collection_mock.find.assert_called()
 
 
-def test_clean_task(repo, collection_mock):
-    repo.clean_task("taskid")
+def test_iter_tasks_by_query_is_lazy(repo, collection_mock):
+    documents = [{"_id": ID_OBJ, "title": "T", "course_id": "c1", "module_id": "m1"}]
+    collection_mock.find.return_value.batch_size.return_value = iter(documents)
+
+    tasks = repo.iter_tasks_by_query({"course_id": "c1"}, batch_size=25)
+
+    collection_mock.find.return_value.batch_size.assert_called_once_with(25)
+    assert not isinstance(tasks, list)
+    assert [task.title for task in tasks] == ["T"]
+
+
+def test_reset_tasks_for_course_single_update(repo, collection_mock):
+    collection_mock.update_many.return_value.modified_count = 42
+
+    assert repo.reset_tasks_for_course("course1") == 42
+    collection_mock.update_many.assert_called_once_with(
+        {"course_id": "course1"},
+        {"$set": {"status": "inactive", "submissions": {}}},
+    )
+    collection_mock.update_one.assert_not_called()
+
+
+@pytest.fixture
+def submissions_repo_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def collection_repo(collection_mock, logger_mock, submissions_repo_mock):
+    return TasksRepository(
+        collection_mock,
+        logger_mock,
+        submissions_repository=submissions_repo_mock,
+        read_submissions_from_collection=True,
+    )
+
+
+def test_add_task_submission_writes_both(repo, collection_mock):
+    submissions_repo = MagicMock()
+    repo.submissions_repository = submissions_repo
+    collection_mock.find_one_and_update.return_value = {
+        "_id": ID, "title": "T", "course_id": "c123", "module_id": "m1"
+    }
+
+    repo.add_task_submission(ID, "student1", [], True)
+
+    assert "submissions.student1" in collection_mock.find_one_and_update.call_args[0][1]["$set"]
+    task_id, course_id, student_id, _ = submissions_repo.save_submission.call_args[0]
+    assert (task_id, course_id, student_id) == (ID, "c123", "student1")
+
+
+def test_collection_mode_reads_tasks_without_their_map(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.find.return_value = [
+        {"_id": ID, "title": "T", "course_id": "c1", "module_id": "m1"}
+    ]
+    submissions_repo_mock.get_submissions_by_task_ids.return_value = {
+        ID: {"student1": {"attachments": [], "on_time": True}}
+    }
+
+    tasks = collection_repo.get_tasks_by_query({"course_id": "c1"})
+
+    collection_mock.find.assert_called_once_with({"course_id": "c1"}, {"submissions": 0})
+    submissions_repo_mock.get_submissions_by_task_ids.assert_called_once_with([ID])
+    assert list(tasks[0].submissions) == ["student1"]
+
+
+def test_collection_mode_task_with_submission_for_student(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.find_one.return_value = {
+        "_id": ID, "title": "T", "course_id": "c1", "module_id": "m1"
+    }
+    submissions_repo_mock.get_submission.return_value = {"attachments": []}
+
+    task = collection_repo.get_task_with_submission_for_student(ID, "student1")
+
+    submissions_repo_mock.get_submission.assert_called_once_with(ID, "student1")
+    submissions_repo_mock.get_submissions_by_task_ids.assert_not_called()
+    assert list(task.submissions) == ["student1"]
+
+
+def test_collection_mode_tasks_done_by_student(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    submissions_repo_mock.get_task_ids_by_student.return_value = [ID]
+    collection_mock.find.return_value = []
+
+    collection_repo.get_tasks_done_by_student("student1", "c1")
+
+    submissions_repo_mock.get_task_ids_by_student.assert_called_once_with("student1", "c1")
+    query = collection_mock.find.call_args[0][0]
+    assert query == {"_id": {"$in": [ID]}, "course_id": "c1", "status": "completed"}
+
+
+def test_set_submission_feedback_writes_both(repo, collection_mock):
+    submissions_repo = MagicMock()
+    repo.submissions_repository = submissions_repo
+    collection_mock.find_one_and_update.return_value = {
+        "_id": ID, "title": "T", "course_id": "c1", "module_id": "m1"
+    }
+
+    task = repo.set_submission_feedback(ID, "student1", "teacher1", {"grade": 8})
+
+    update = collection_mock.find_one_and_update.call_args[0][1]
+    assert update == {"$set": {"submissions.student1.feedbacks.teacher1": {"grade": 8}}}
+    submissions_repo.set_feedback.assert_called_once_with(
+        ID, "student1", "teacher1", {"grade": 8}
+    )
+    assert task is not None
+
+
+def test_collection_mode_set_submission_feedback_skips_the_map(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.find_one.return_value = {
+        "_id": ID, "title": "T", "course_id": "c1", "module_id": "m1"
+    }
+    submissions_repo_mock.get_submissions_by_task_ids.return_value = {
+        ID: {"student1": {"attachments": [], "feedbacks": {"teacher1": {"grade": 8}}}}
+    }
+
+    task = collection_repo.set_submission_feedback(ID, "student1", "teacher1", {"grade": 8})
+
+    collection_mock.find_one_and_update.assert_not_called()
+    submissions_repo_mock.set_feedback.assert_called_once_with(
+        ID, "student1", "teacher1", {"grade": 8}
+    )
+    assert list(task.submissions) == ["student1"]
+
+
+def test_collection_mode_unset_submission_feedback_task_not_found(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.find_one.return_value = None
+
+    assert collection_repo.unset_submission_feedback(ID, "student1", "teacher1") is None
+    collection_mock.find_one_and_update.assert_not_called()
+
+
+def test_collection_mode_add_task_submission_skips_the_map(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.find_one.return_value = {
+        "_id": ID, "title": "T", "course_id": "c123", "module_id": "m1"
+    }
+
+    task = collection_repo.add_task_submission(ID, "student1", [], True)
+
+    collection_mock.find_one.assert_called_once_with({"_id": ID}, {"submissions": 0})
+    collection_mock.find_one_and_update.assert_not_called()
+    task_id, course_id, student_id, _ = submissions_repo_mock.save_submission.call_args[0]
+    assert (task_id, course_id, student_id) == (ID, "c123", "student1")
+    assert task.submissions["student1"].on_time is True
+
+
+def test_collection_mode_add_task_submission_task_not_found(collection_repo, collection_mock):
+    collection_mock.find_one.return_value = None
+
+    with pytest.raises(ValueError):
+        collection_repo.add_task_submission(ID, "student1", [], True)
+
+
+def test_collection_mode_create_task_without_the_map(collection_repo, collection_mock):
+    task = Task(title="T", due_date=None, course_id="c1", module_id="m1")
+    collection_mock.insert_one.return_value.inserted_id = ID
+
+    collection_repo.create_task(task)
+
+    assert "submissions" not in collection_mock.insert_one.call_args[0][0]
+
+
+def test_collection_mode_reset_tasks_drops_the_map(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.update_many.return_value.modified_count = 2
+
+    assert collection_repo.reset_tasks_for_course("course1") == 2
+    collection_mock.update_many.assert_called_once_with(
+        {"course_id": "course1"},
+        {"$set": {"status": "inactive"}, "$unset": {"submissions": ""}},
+    )
+    submissions_repo_mock.remove_course_submissions.assert_called_once_with("course1")
+
+
+def test_get_student_tasks_computes_status_and_filters_before_paging(repo, collection_mock):
+    collection_mock.aggregate.return_value = [
+        {
+            "_id": ID, "title": "T", "course_id": "c1", "module_id": "m1",
+            "status": "pending", "submissions": {},
+        }
+    ]
+
+    tasks = repo.get_student_tasks_by_course_ids(
+        ["c1", "c2"], "student1", student_status="pending", page=3, limit=5
+    )
+
+    assert tasks[0].status == "pending"
+    pipeline = collection_mock.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"course_id": {"$in": ["c1", "c2"]}}}
+    assert pipeline[1] == {"$sort": dict(TASK_FEED_SORT)}
+    get_field = pipeline[2]["$set"]["submission"]["$getField"]
+    assert get_field["field"] == {"$literal": "student1"}
+    assert "$switch" in pipeline[3]["$set"]["status"]
+    # The computed status is filtered before the page is cut
+    assert pipeline[4:] == [
+        {"$match": {"status": "pending"}},
+        {"$unset": "submission"},
+        {"$skip": 10},
+        {"$limit": 5},
+    ]
+
+
+@pytest.mark.parametrize(
+    "document, has_submission",
+    [
+        ({"_id": 1}, False),
+        ({"_id": 1, "submission": None}, False),
+        ({"_id": 1, "submission": {}}, False),
+        ({"_id": 1, "submission": {"on_time": True, "attachments": []}}, True),
+    ],
+)
+def test_has_submission_only_counts_non_empty_submissions(document, has_submission):
+    # A null or {} entry of the submissions map is not a submission (see Task.from_dict)
+    collection = mongomock.MongoClient().db.tasks
+    collection.insert_one(document)
+
+    result = collection.aggregate([{"$project": {"has_submission": HAS_SUBMISSION}}])
+
+    assert next(result)["has_submission"] is has_submission
+
+
+def test_get_student_tasks_with_cursor(repo, collection_mock):
+    collection_mock.aggregate.return_value = []
+    after = encode_cursor({"due_date": 1_700_000_000_000, "_id": ID})
+
+    repo.get_student_tasks_by_course_ids(["c1"], "student1", page=50, cursor=after)
+
+    pipeline = collection_mock.aggregate.call_args[0][0]
+    assert "$or" in pipeline[0]["$match"]
+    assert all("$skip" not in stage for stage in pipeline)
+    assert all("$match" not in stage for stage in pipeline[1:])
+
+
+def test_collection_mode_student_tasks_look_up_the_submission(
+    collection_repo, collection_mock, submissions_repo_mock
+):
+    collection_mock.aggregate.return_value = []
+    submissions_repo_mock.student_submission_lookup.return_value = {"$lookup": {}}
+
+    collection_repo.get_student_tasks_by_course_ids(["c1"], "student1")
 
-    collection_mock.update_one.assert_called_with(
-        {"_id": "taskid"},
-        {"$set": {"status": "inactive", "submissions": {}}}
+    submissions_repo_mock.student_submission_lookup.assert_called_once_with(
+        "student1", "submission"
     )
+    pipeline = collection_mock.aggregate.call_args[0][0]
+    assert pipeline[2] == {"$lookup": {}}
+    assert pipeline[3] == {"$set": {"submission": {"$first": "$submission"}}}
@@ -280,3 +280,24 @@ def test_check_assistants_permissions_false_perm_missing(repo, collection_users_
     collection_users_mock.find_one.return_value = {"assistant": {"course1": {}}}
     result = repo.check_assistants_permissions("course1", "assistant1", "perm1")
     assert result is False
+
+
+def test_assistant_permissions_read_through_cache(collection_users_mock, approved_courses_collection_mock, logger_mock):
+    from src.repository.cache import LRUCache
+
+    repo = UsersDataRepository(
+        collection_users_mock, approved_courses_collection_mock, logger_mock, cache=LRUCache()
+    )
+    collection_users_mock.find_one.return_value = {
+        "student_id": "a1",
+        "assistant": {"course1": {"Tasks": True}},
+    }
+
+    assert repo.check_assistants_permissions("course1", "a1", "Tasks") is True
+    assert repo.get_assistant_permissions_for_course("course1", "a1") == {"Tasks": True}
+    collection_users_mock.find_one.assert_called_once()
+
+    collection_users_mock.update_one.return_value.modified_count = 1
+    repo.remove_assistant_from_course_with_id("course1", "a1")
+    repo.check_assistants_permissions("course1", "a1", "Tasks")
+    assert collection_users_mock.find_one.call_count == 2
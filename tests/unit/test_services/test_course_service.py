@@ -1,6 +1,13 @@
 import pytest
 from flask import Flask
 from unittest.mock import patch, MagicMock
+from bson import ObjectId
+from src.headers import (
+    COURSE_NOT_IMPORTED,
+    INTERNAL_SERVER_ERROR,
+    INVALID_COURSE,
+    MISSING_FIELDS,
+)
 
 
 @pytest.fixture(scope="session")
@@ -86,6 +93,16 @@ def test_create_course_missing_fields(service):
     assert response["code_status"] == 400
     response_json = response["response"].get_json()
     assert "Field creator_id is required" in response_json["detail"]
+    assert response_json["title"] == MISSING_FIELDS
+
+
+def test_create_course_invalid_value(service):
+    data = {**bulk_course("Math 101"), "enroll_date_end": "not a date"}
+
+    response = service.create_course(data)
+
+    assert response["code_status"] == 400
+    assert response["response"].get_json()["title"] == INVALID_COURSE
 
 
 def test_create_course_success(service, mock_repo):
@@ -128,6 +145,77 @@ def test_create_course_internal_error(service, mock_repo):
     assert "DB fail" in response["detail"]
 
 
+# -------- create_courses (bulk) --------
+def bulk_course(name):
+    return {
+        "name": name,
+        "description": "Basic Math",
+        "creator_id": "user123",
+        "creator_name": "Test",
+        "course_start_date": "2025-01-01",
+        "course_end_date": "2025-06-01",
+        "max_students": 50,
+    }
+
+
+def test_create_courses_all_created(service, mock_repo):
+    mock_repo.create_courses.side_effect = lambda courses: [
+        (str(course["_id"]), None) for course in courses
+    ]
+
+    response = service.create_courses([bulk_course("A"), bulk_course("B"), bulk_course("C")], chunk_size=2)
+
+    assert response["code_status"] == 201
+    assert response["response"]["created"] == 3
+    assert [len(call[0][0]) for call in mock_repo.create_courses.call_args_list] == [2, 1]
+
+
+def test_create_courses_reports_each_item(service, mock_repo):
+    from src.services.course_service import InvalidCourseError
+
+    mock_repo.create_courses.side_effect = lambda courses: [
+        ("id1", None),
+        ("id2", "E11000 duplicate key error"),
+    ]
+    items = iter([
+        bulk_course("A"),
+        {"name": "Missing everything"},
+        InvalidCourseError("Line 3 is not valid JSON"),
+        bulk_course("B"),
+    ])
+
+    response = service.create_courses(items)
+
+    assert response["code_status"] == 207
+    results = response["response"]["results"]
+    assert [result["status"] for result in results] == [201, 400, 400, 409]
+    assert results[0]["_id"] == "id1"
+    assert "description" in results[1]["detail"]
+    assert results[1]["title"] == MISSING_FIELDS
+    assert results[2]["title"] == INVALID_COURSE
+    assert results[3]["title"] == COURSE_NOT_IMPORTED
+
+
+def test_create_courses_none_created(service, mock_repo):
+    mock_repo.create_courses.side_effect = Exception("DB fail")
+
+    response = service.create_courses([bulk_course("A"), "not a course"])
+
+    assert response["code_status"] == 400
+    assert [result["status"] for result in response["response"]["results"]] == [500, 400]
+
+
+def test_create_courses_database_down(service, mock_repo):
+    mock_repo.create_courses.side_effect = Exception("DB fail")
+
+    response = service.create_courses([bulk_course("A"), bulk_course("B")])
+
+    assert response["code_status"] == 500
+    results = response["response"]["results"]
+    assert [result["status"] for result in results] == [500, 500]
+    assert results[0]["title"] == INTERNAL_SERVER_ERROR
+
+
 # -------- delete_course --------
 def test_delete_course_success(service, mock_repo):
     mock_repo.delete_course.return_value = True
@@ -242,6 +330,65 @@ def test_get_all_courses_internal_error(service, mock_repo):
     assert "Read error" in response["detail"]
 
 
+def test_get_catalog_facets_success(mock_repo, mock_logger):
+    from src.services.course_service import CourseService
+    facets_repo = MagicMock()
+    facets_repo.get_facets.return_value = {"total": 2, "status": [{"value": "open", "count": 2}]}
+    service = CourseService(mock_repo, mock_logger, catalog_facets_repository=facets_repo)
+
+    response = service.get_catalog_facets()
+
+    assert response["code_status"] == 200
+    assert response["response"]["total"] == 2
+    mock_repo.get_all_courses.assert_not_called()
+
+
+def test_get_catalog_facets_internal_error(mock_repo, mock_logger):
+    from src.services.course_service import CourseService
+    facets_repo = MagicMock()
+    facets_repo.get_facets.side_effect = Exception("Merge error")
+    service = CourseService(mock_repo, mock_logger, catalog_facets_repository=facets_repo)
+
+    response = service.get_catalog_facets()
+
+    assert response["code_status"] == 500
+    assert "Merge error" in response["response"].get_json()["detail"]
+
+
+def test_get_all_courses_serializes_summaries(service, mock_repo):
+    course_id = ObjectId()
+    mock_repo.get_all_courses.return_value = [{"_id": course_id, "name": "Math"}]
+
+    response = service.get_all_courses()
+
+    course = response["response"][0]
+    assert course["_id"] == str(course_id)
+    assert course["status"] == "open"
+    assert course["correlatives_required_id"] == []
+    assert "students" not in course
+
+
+def test_get_all_courses_streamed(service, mock_repo):
+    course_id = ObjectId()
+    mock_repo.iter_all_courses.return_value = iter([{"_id": course_id, "name": "Math"}])
+
+    response = service.get_all_courses(stream=True, batch_size=50)
+
+    assert response["code_status"] == 200
+    assert not isinstance(response["response"], list)
+    assert [course["_id"] for course in response["response"]] == [str(course_id)]
+    mock_repo.iter_all_courses.assert_called_once_with(50)
+    mock_repo.get_all_courses.assert_not_called()
+
+
+def test_get_all_courses_streamed_empty_is_not_found(service, mock_repo):
+    mock_repo.iter_all_courses.return_value = iter([])
+
+    response = service.get_all_courses(stream=True)
+
+    assert response["code_status"] == 404
+
+
 # -------- get_specific_course --------
 def test_get_specific_course_found(service, mock_repo):
     course_data = {"_id": "course123", "name": "Math"}
@@ -271,3 +418,93 @@ def test_get_specific_course_internal_error(service, mock_repo):
     assert response["code_status"] == 500
     response = response["response"].get_json()
     assert "DB fail" in response["detail"]
+
+
+# -------- search_course_by_query --------
+def test_search_course_legacy_list(service, mock_repo):
+    mock_repo.search_course_by_partial_information.return_value = (
+        [{"_id": "c1", "name": "Math"}],
+        "next",
+    )
+
+    response = service.search_course_by_query("math")
+
+    assert response["code_status"] == 200
+    assert isinstance(response["response"], list)
+
+
+def test_search_course_with_cursor(service, mock_repo):
+    mock_repo.search_course_by_partial_information.return_value = (
+        [{"_id": "c1", "name": "Math"}],
+        "next",
+    )
+
+    response = service.search_course_by_query("math", 0, 10, "")
+
+    assert response["code_status"] == 200
+    assert response["response"]["next_cursor"] == "next"
+    assert response["response"]["data"][0]["_id"] == "c1"
+
+
+def test_search_course_timeout(service, mock_repo):
+    from pymongo.errors import ExecutionTimeout
+
+    mock_repo.search_course_by_partial_information.side_effect = ExecutionTimeout("slow")
+
+    response = service.search_course_by_query("math")
+
+    assert response["code_status"] == 503
+
+
+# -------- get_paginated_courses --------
+def test_get_paginated_courses_with_cursor(service, mock_repo):
+    from bson import ObjectId
+
+    ids = [ObjectId(), ObjectId()]
+    mock_repo.get_paginated_courses.return_value = [{"_id": i, "name": "Math"} for i in ids]
+
+    response = service.get_paginated_courses(0, 2, "")
+
+    assert response["code_status"] == 200
+    assert len(response["response"]["data"]) == 2
+    assert response["response"]["next_cursor"] is not None
+
+
+def test_get_paginated_courses_last_page_has_no_cursor(service, mock_repo):
+    mock_repo.get_paginated_courses.return_value = [{"_id": "c1", "name": "Math"}]
+
+    response = service.get_paginated_courses(0, 2, "")
+
+    assert response["response"]["next_cursor"] is None
+
+
+def test_get_paginated_courses_legacy_list(service, mock_repo):
+    mock_repo.get_paginated_courses.return_value = [{"_id": "c1", "name": "Math"}]
+
+    response = service.get_paginated_courses(0, 2)
+
+    assert isinstance(response["response"], list)
+
+
+def test_get_course_version_unknown_on_error(service, mock_repo):
+    mock_repo.get_course_version.side_effect = Exception("DB error")
+    assert service.get_course_version("c1") is None
+
+def test_get_courses_owned_by_user_with_datetime_dates(service, mock_repo):
+    from datetime import datetime
+
+    course_id = ObjectId()
+    mock_repo.get_courses_owned_by_user.return_value = [
+        {
+            "_id": course_id,
+            "name": "Course",
+            "creator_id": "user1",
+            "enroll_date_start": datetime(2025, 3, 1),
+            "enroll_date_end": datetime(2025, 3, 31),
+        }
+    ]
+
+    courses = service.get_courses_owned_by_user("user1")
+
+    assert courses[0]["_id"] == course_id
+    assert courses[0]["enroll_date_end"] == datetime(2025, 3, 31)
@@ -2,6 +2,8 @@ import pytest
 from flask import Flask
 from unittest.mock import patch, MagicMock
 
+from src.models.course_snapshot import EnrollmentOutcome
+
 
 @pytest.fixture(scope="session")
 def app():
@@ -40,39 +42,47 @@ def service(mock_course_repo, mock_user_repo, mock_logger):
     return EnrollmentService(mock_course_repo, mock_user_repo, mock_logger)
 
 def test_enroll_success(service, mock_course_repo, mock_user_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = True
-    mock_course_repo.is_student_enrolled_in_course.return_value = False
-    mock_course_repo.check_if_course_has_place_to_enroll.return_value = True
-    mock_course_repo.get_course_correlatives.return_value = ["math1", "physics1"]
     mock_user_repo.get_student_approved_courses.return_value = [{"course_id": "math1", "final_grade": 10}, {"course_id": "physics1", "final_grade": 9}]
-    mock_course_repo.enroll_student_in_course.return_value = True
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.ENROLLED
 
     response = service.enroll_student_in_course("course1", "student1")
 
     assert response["code_status"] == 200
     assert response["response"]["student_id"] == "student1"
+    mock_course_repo.enroll_student_in_course.assert_called_once_with(
+        "course1", "student1", ["math1", "physics1"]
+    )
+
+def test_enroll_is_a_single_write_without_course_reads(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.ENROLLED
+
+    service.enroll_student_in_course("course1", "student1")
+
+    mock_course_repo.get_course_snapshot.assert_not_called()
+    mock_course_repo.get_course_by_id.assert_not_called()
 
-def test_enroll_inscription_closed(service, mock_course_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = False
+def test_enroll_inscription_closed(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.CLOSED
 
     response = service.enroll_student_in_course("course1", "student1")
 
     assert response["code_status"] == 403
     assert "inscription is no longer available" in response["response"].get_json()["detail"]
 
-def test_enroll_student_already_enrolled(service, mock_course_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = True
-    mock_course_repo.is_student_enrolled_in_course.return_value = True
+def test_enroll_student_already_enrolled(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.ALREADY_ENROLLED
 
     response = service.enroll_student_in_course("course1", "student1")
 
     assert response["code_status"] == 403
     assert "already enrolled" in response["response"].get_json()["detail"]
 
-def test_enroll_course_full(service, mock_course_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = True
-    mock_course_repo.is_student_enrolled_in_course.return_value = False
-    mock_course_repo.check_if_course_has_place_to_enroll.return_value = False
+def test_enroll_course_full(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.FULL
 
     response = service.enroll_student_in_course("course1", "student1")
 
@@ -80,31 +90,43 @@ def test_enroll_course_full(service, mock_course_repo):
     assert "is full" in response["response"].get_json()["detail"]
 
 def test_enroll_course_already_approved(service, mock_course_repo, mock_user_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = True
-    mock_course_repo.is_student_enrolled_in_course.return_value = False
-    mock_course_repo.check_if_course_has_place_to_enroll.return_value = True
-    mock_course_repo.get_course_correlatives.return_value = []
     mock_user_repo.get_student_approved_courses.return_value = [{"course_id": "course1", "final_grade": 90}]
 
     response = service.enroll_student_in_course("course1", "student1")
 
     assert response["code_status"] == 403
     assert "already has approved course" in response["response"].get_json()["detail"]
+    mock_course_repo.enroll_student_in_course.assert_not_called()
 
 def test_enroll_missing_correlatives(service, mock_course_repo, mock_user_repo):
-    mock_course_repo.check_if_course_inscription_is_available.return_value = True
-    mock_course_repo.is_student_enrolled_in_course.return_value = False
-    mock_course_repo.check_if_course_has_place_to_enroll.return_value = True
-    mock_course_repo.get_course_correlatives.return_value = ["math1"]
     mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.MISSING_CORRELATIVES
 
     response = service.enroll_student_in_course("course1", "student1")
 
     assert response["code_status"] == 403
     assert "does not have the correlatives" in response["response"].get_json()["detail"]
 
-def test_enroll_internal_error(service, mock_course_repo):
-    mock_course_repo.check_if_course_inscription_is_available.side_effect = Exception("DB down")
+def test_enroll_course_not_found(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.NOT_FOUND
+
+    response = service.enroll_student_in_course("course1", "student1")
+
+    assert response["code_status"] == 404
+    assert "not found" in response["response"].get_json()["detail"]
+
+def test_enroll_conflict(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.return_value = EnrollmentOutcome.CONFLICT
+
+    response = service.enroll_student_in_course("course1", "student1")
+
+    assert response["code_status"] == 409
+
+def test_enroll_internal_error(service, mock_course_repo, mock_user_repo):
+    mock_user_repo.get_student_approved_courses.return_value = []
+    mock_course_repo.enroll_student_in_course.side_effect = Exception("DB down")
 
     response = service.enroll_student_in_course("course1", "student1")
 
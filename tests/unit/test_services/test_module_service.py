@@ -155,3 +155,17 @@ def test_delete_resource_from_module_success(module_service, mock_dependencies):
 
     assert result["code_status"] == 200
     assert result["response"]["title"] == "Module removed successfully"
+
+def test_get_modules_version(module_service, mock_dependencies):
+    repo_modules, repo_courses, service_users, logger = mock_dependencies
+    repo_courses.get_course_version.return_value = {"version": 1, "updated_at": None}
+    repo_modules.get_modules_version.return_value = {"version": 5, "updated_at": None}
+
+    assert module_service.get_modules_version(COURSE_ID) == {"version": 5, "updated_at": None}
+
+def test_get_modules_version_of_deleted_course(module_service, mock_dependencies):
+    repo_modules, repo_courses, service_users, logger = mock_dependencies
+    repo_courses.get_course_version.return_value = None
+
+    assert module_service.get_modules_version(COURSE_ID) is None
+    repo_modules.get_modules_version.assert_not_called()
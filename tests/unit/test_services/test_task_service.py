@@ -337,6 +337,28 @@ def test_get_tasks_by_course_success(service, mock_repo, mock_course_service, st
     assert query_passed["course_id"] == "course123"
     assert query_passed["status"] == status
 
+def test_get_tasks_by_course_streamed(service, mock_repo, mock_course_service):
+    mock_course_service.get_course_by_id.return_value = {"code_status": 200}
+    task = build_task_mock()
+    mock_repo.iter_tasks_by_query.return_value = iter([task, task])
+
+    response = service.get_tasks_by_course("course123", stream=True, batch_size=10)
+
+    assert response["code_status"] == 200
+    assert len(list(response["response"])) == 2
+    mock_repo.iter_tasks_by_query.assert_called_once_with({"course_id": "course123"}, 10)
+    mock_repo.get_tasks_by_query.assert_not_called()
+
+def test_get_tasks_by_course_streamed_query_error(service, mock_repo, mock_course_service):
+    mock_course_service.get_course_by_id.return_value = {"code_status": 200}
+    mock_repo.iter_tasks_by_query.return_value = MagicMock(
+        __iter__=MagicMock(side_effect=Exception("DB error"))
+    )
+
+    response = service.get_tasks_by_course("course123", stream=True)
+
+    assert response["code_status"] == 500
+
 def test_get_tasks_by_course_invalid_status(service, mock_course_service):
     mock_course_service.get_course_by_id.return_value = {"code_status": 200}
 
@@ -403,51 +425,43 @@ def test_upload_element_raises_if_no_filename(service):
     with pytest.raises(FileNotFoundError):
         service._upload_element("uuid", 1, file_mock)
 
-@patch("src.services.task_service.storage")  # Ajustá el path al que uses
-@patch("src.services.task_service.os")
-def test_save_file_generates_signed_url(mock_os, mock_storage, service):
+def test_save_file_uses_attachment_storage(service):
     file_mock = MagicMock()
     file_mock.filename = "file.pdf"
     file_mock.content_type = "application/pdf"
-
-    mock_blob = MagicMock()
-    mock_blob.generate_signed_url.return_value = "http://signed-url"
-    mock_blob.upload_from_file.return_value = None
-
-    mock_bucket = MagicMock()
-    mock_bucket.blob.return_value = mock_blob
-    service._get_gcp_bucket = MagicMock(return_value=mock_bucket)
+    service.attachment_storage = MagicMock()
+    service.attachment_storage.save.return_value = "http://signed-url"
 
     url = service._save_file("uuid", 1, file_mock)
 
     assert url == "http://signed-url"
-    mock_bucket.blob.assert_called_once()
-    mock_blob.upload_from_file.assert_called_once_with(file_mock, content_type="application/pdf")
+    service.attachment_storage.save.assert_called_once_with(
+        "uuid1.pdf", file_mock, "application/pdf"
+    )
 
 def test_get_tasks_by_teacher_success(service):
     
-    course1 = MagicMock(_id="c1")
-    course2 = MagicMock(_id="c2")
-    service.course_service.get_courses_owned_by_user.return_value = [course1, course2]
-    service.repository.get_tasks_by_course_ids.return_value = ["task1", "task2"]
+    service.repository.get_tasks_by_teacher.return_value = ["task1", "task2"]
 
-    result = service.get_tasks_by_teacher("teacher123")
+    result = service.get_tasks_by_teacher("teacher123", status="open", page=2, limit=5)
 
     assert result == ["task1", "task2"]
-    service.repository.get_tasks_by_course_ids.assert_called_once()
+    service.repository.get_tasks_by_teacher.assert_called_once_with(
+        "teacher123", status="open", due_date=None, start_date=None, end_date=None, page=2, limit=5, cursor=None
+    )
+    service.course_service.get_courses_owned_by_user.assert_not_called()
 
-def test_get_tasks_by_teacher_no_courses(service):
+def test_get_tasks_by_teacher_no_tasks(service):
     
-    service.course_service.get_courses_owned_by_user.return_value = []
+    service.repository.get_tasks_by_teacher.return_value = []
 
     result = service.get_tasks_by_teacher("teacher123")
 
     assert result == []
-    service.logger.info.assert_called_once()
 
 def test_get_tasks_by_teacher_exception(service):
     
-    service.course_service.get_courses_owned_by_user.side_effect = Exception("Fail")
+    service.repository.get_tasks_by_teacher.side_effect = Exception("Fail")
 
     with pytest.raises(Exception):
         service.get_tasks_by_teacher("teacher123")
@@ -459,23 +473,47 @@ def test_get_tasks_by_student_success(service):
     service.course_service.get_courses_by_student_id.return_value = [course1]
 
     task1 = MagicMock()
-    service.repository.get_tasks_by_course_ids.return_value = [task1]
-
-    service._calculate_status = MagicMock(return_value="pending")
-    service._get_submission = MagicMock(return_value=["sub1"])
+    service.repository.get_student_tasks_by_course_ids.return_value = [task1]
 
     result = service.get_tasks_by_student("student123")
 
-    assert len(result) == 1
-    assert task1.status == "pending"
-    assert task1.submissions == ["sub1"]
+    assert result == [task1]
+    kwargs = service.repository.get_student_tasks_by_course_ids.call_args[1]
+    assert kwargs["course_ids"] == ["c1"]
+    assert kwargs["student_id"] == "student123"
+    assert kwargs["student_status"] is None
+
+def test_get_tasks_by_student_filters_by_student_status(service):
+    
+    course1 = MagicMock(_id="c1")
+    service.course_service.get_courses_by_student_id.return_value = [course1]
+    service.repository.get_student_tasks_by_course_ids.return_value = []
+
+    service.get_tasks_by_student("student123", status="pending", page=2, limit=5)
+
+    kwargs = service.repository.get_student_tasks_by_course_ids.call_args[1]
+    assert kwargs["student_status"] == "pending"
+    assert kwargs["status"] is None
+    assert (kwargs["page"], kwargs["limit"]) == (2, 5)
+
+def test_get_tasks_by_student_filters_by_stored_status(service):
+    
+    course1 = MagicMock(_id="c1")
+    service.course_service.get_courses_by_student_id.return_value = [course1]
+    service.repository.get_student_tasks_by_course_ids.return_value = []
+
+    service.get_tasks_by_student("student123", status="open")
+
+    kwargs = service.repository.get_student_tasks_by_course_ids.call_args[1]
+    assert kwargs["student_status"] is None
+    assert kwargs["status"] == "open"
 
 def test_get_tasks_by_student_with_course_filter(service):
     
     course1 = MagicMock(_id="c1")
     service.course_service.get_courses_by_student_id.return_value = [course1]
 
-    service.repository.get_tasks_by_course_ids.return_value = []
+    service.repository.get_student_tasks_by_course_ids.return_value = []
 
     result = service.get_tasks_by_student("student123", course_id="c1")
 
@@ -489,58 +527,32 @@ def test_get_tasks_by_student_no_courses(service):
 
     assert result == []
 
-def test_get_tasks_by_student_exception(service):
+def test_get_tasks_by_student_cursor_page(service):
     
-    service.course_service.get_courses_by_student_id.side_effect = Exception("Fail")
-
-    with pytest.raises(Exception):
-        service.get_tasks_by_student("student123")
-    service.logger.error.assert_called_once()
-
-@patch("src.services.task_service.parse_to_timestamp_ms_now")
-def test_calculate_status_completed(mock_now, service):
-    task = MagicMock()
-    task.submissions = {"student123": "submission_data"}
-    task.due_date = 9999999999999  # dummy
-
-    status = service._calculate_status(task, "student123")
-    assert status == TaskStatus.COMPLETED
-
-
-@patch("src.services.task_service.parse_to_timestamp_ms_now")
-def test_calculate_status_overdue(mock_now, service):
-    mock_now.return_value = 2000
-    task = MagicMock()
-    task.submissions = {}
-    task.due_date = 1000
-
-    status = service._calculate_status(task, "student123")
-    assert status == TaskStatus.OVERDUE
-
+    course1 = MagicMock(_id="c1")
+    service.course_service.get_courses_by_student_id.return_value = [course1]
+    tasks = [MagicMock(submissions={}, due_date=1_800_000_000_000, _id=f"6498ef1b9a8f4b123456789{i}") for i in range(2)]
+    service.repository.get_student_tasks_by_course_ids.return_value = tasks
 
-@patch("src.services.task_service.parse_to_timestamp_ms_now")
-def test_calculate_status_pending(mock_now, service):
-    mock_now.return_value = 1000
-    task = MagicMock()
-    task.submissions = {}
-    task.due_date = 2000
+    result = service.get_tasks_by_student("student123", limit=2, cursor="")
 
-    status = service._calculate_status(task, "student123")
-    assert status == TaskStatus.PENDING
+    assert result["data"] == tasks
+    assert result["next_cursor"] is not None
+    assert service.repository.get_student_tasks_by_course_ids.call_args[1]["cursor"] == ""
 
-def test_get_submission_found(service):
-    task = MagicMock()
-    task.submissions = {"student123": {"data": "value"}}
+def test_get_tasks_by_student_cursor_no_courses(service):
+    
+    service.course_service.get_courses_by_student_id.return_value = []
 
-    result = service._get_submission(task, "student123")
-    assert result == {"student123": {"data": "value"}}
+    assert service.get_tasks_by_student("student123", cursor="") == {"data": [], "next_cursor": None}
 
-def test_get_submission_not_found(service):
-    task = MagicMock()
-    task.submissions = {}
+def test_get_tasks_by_student_exception(service):
+    
+    service.course_service.get_courses_by_student_id.side_effect = Exception("Fail")
 
-    result = service._get_submission(task, "student123")
-    assert result == {}
+    with pytest.raises(Exception):
+        service.get_tasks_by_student("student123")
+    service.logger.error.assert_called_once()
 
 def test_add_feedback_success(service):
     task_id = "task123"
@@ -555,10 +567,12 @@ def test_add_feedback_success(service):
     
     repo = service.repository
     repo.get_tasks_by_query = MagicMock(return_value=[task_mock])
-    repo.update_task = MagicMock(return_value=MagicMock(to_dict=lambda: {"ok": True}))
+    repo.set_submission_feedback = MagicMock(return_value=MagicMock(to_dict=lambda: {"ok": True}))
 
     result = service.add_or_update_feedback(task_id, student_id, corrector_id, 9.5, "Buen trabajo")
 
+    repo.set_submission_feedback.assert_called_once()
+    assert repo.set_submission_feedback.call_args[0][:3] == (task_id, student_id, corrector_id)
     assert result["code_status"] == 200
     assert result["response"].json["ok"] == True
 
@@ -608,7 +622,7 @@ def test_add_feedback_update_fails(service):
     task_mock.submissions = {student_id: submission_mock}
 
     service.repository.get_tasks_by_query = MagicMock(return_value=[task_mock])
-    service.repository.update_task = MagicMock(return_value=None)  # Simula fallo
+    service.repository.set_submission_feedback = MagicMock(return_value=None)  # Simula fallo
 
     result = service.add_or_update_feedback(task_id, student_id, corrector_id, 9.0, "Comentario")
 
@@ -628,10 +642,11 @@ def test_add_feedback_unassign_corrector(service):
     task_mock.submissions = {student_id: submission_mock}
 
     service.repository.get_tasks_by_query = MagicMock(return_value=[task_mock])
-    service.repository.update_task = MagicMock(return_value=MagicMock(to_dict=lambda: {"ok": True}))
+    service.repository.unset_submission_feedback = MagicMock(return_value=MagicMock(to_dict=lambda: {"ok": True}))
 
     result = service.add_or_update_feedback(task_id, student_id, corrector_id=None)
 
-    service.repository.update_task.assert_called_once()
-    assert "$unset" in list(service.repository.update_task.call_args[0][1].keys())[0]
+    service.repository.unset_submission_feedback.assert_called_once_with(
+        task_id, student_id, existing_corrector_id
+    )
     assert result["code_status"] == 200
@@ -0,0 +1,71 @@
+import gzip
+import pytest
+from flask import Flask, Response
+
+from src.compression import ResponseCompressor
+
+brotli = pytest.importorskip("brotli")
+
+LARGE = [{"name": f"Course {i}", "description": "Algebra and geometry"} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.after_request(ResponseCompressor(min_bytes=1024).after_request)
+
+    @app.get("/large")
+    def large():
+        return LARGE, 200
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}, 200
+
+    @app.get("/streamed")
+    def streamed():
+        return Response(("x" * 2048 for _ in range(2)), mimetype="application/x-ndjson")
+
+    return app.test_client()
+
+
+def test_gzip(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data).startswith(b"[")
+
+
+def test_brotli_preferred(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, deflate, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data).startswith(b"[")
+
+
+def test_client_quality_respected(client):
+    response = client.get("/large", headers={"Accept-Encoding": "br;q=0.5, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_not_compressed_without_accept_encoding(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json == LARGE
+
+
+def test_small_response_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_streamed_response_not_buffered(client):
+    response = client.get("/streamed", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"x" * 4096
@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime
+from flask import Flask
+from unittest.mock import MagicMock
+
+from src.endpoints.conditional import conditional_response
+
+VERSION = {"version": 3, "updated_at": datetime(2025, 1, 1, 12, 0, 0, 500)}
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture
+def load():
+    return MagicMock(return_value={"response": {"name": "Math"}, "code_status": 200})
+
+
+def test_sets_etag_and_last_modified(app, load):
+    with app.test_request_context("/"):
+        response = conditional_response(VERSION, load)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"3"'
+    assert response.headers["Last-Modified"] == "Wed, 01 Jan 2025 12:00:00 GMT"
+    load.assert_called_once()
+
+
+def test_if_none_match_current_version(app, load):
+    with app.test_request_context("/", headers={"If-None-Match": 'W/"3"'}):
+        response = conditional_response(VERSION, load)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == 'W/"3"'
+    load.assert_not_called()
+
+
+def test_if_none_match_stale_version(app, load):
+    with app.test_request_context("/", headers={"If-None-Match": 'W/"2"'}):
+        response = conditional_response(VERSION, load)
+
+    assert response.status_code == 200
+    load.assert_called_once()
+
+
+def test_if_modified_since(app, load):
+    headers = {"If-Modified-Since": "Wed, 01 Jan 2025 12:00:00 GMT"}
+    with app.test_request_context("/", headers=headers):
+        assert conditional_response(VERSION, load).status_code == 304
+
+    headers = {"If-Modified-Since": "Wed, 01 Jan 2025 11:59:59 GMT"}
+    with app.test_request_context("/", headers=headers):
+        assert conditional_response(VERSION, load).status_code == 200
+
+
+def test_unknown_version_loads(app):
+    load = MagicMock(return_value={"response": {"title": "Not found"}, "code_status": 404})
+    with app.test_request_context("/", headers={"If-None-Match": "*"}):
+        response = conditional_response(None, load)
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
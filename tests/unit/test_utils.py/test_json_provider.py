@@ -0,0 +1,81 @@
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.json_provider import MongoJSONProvider, OrjsonProvider
+from src.models.course import Course, CourseStatus, course_response_from_dict
+
+pytest.importorskip("orjson")
+
+COURSE_ID = ObjectId("64b81e3f4a8f1c1a9f123456")
+DOCUMENT = {
+    "_id": COURSE_ID,
+    "name": "Math 101",
+    "description": "Algebra",
+    "max_students": 30,
+    "course_start_date": "2025-03-01",
+    "course_end_date": "2025-07-01",
+    "enroll_date_start": datetime(2025, 1, 1, 10, 30),
+    "enroll_date_end": "2025-02-15",
+    "creator_id": "owner123",
+    "creator_name": "Alice",
+    "students": ["s1"],
+    "status": "closed",
+}
+
+
+@pytest.fixture(params=[OrjsonProvider, MongoJSONProvider])
+def app(request):
+    app = Flask(__name__)
+    app.json = request.param(app)
+    return app
+
+
+def test_encodes_mongo_types(app):
+    with app.app_context():
+        data = app.json.loads(
+            app.json.dumps({"_id": COURSE_ID, "at": datetime(2025, 1, 1), "status": CourseStatus.OPEN})
+        )
+
+    assert data == {"_id": str(COURSE_ID), "at": "Wed, 01 Jan 2025 00:00:00 GMT", "status": "open"}
+
+
+def test_same_body_as_the_hydrated_course(app):
+    # The raw document must serialize exactly like Course.from_dict(...).to_dict() did
+    reference = Flask(__name__)
+    reference.json = DefaultJSONProvider(reference)
+
+    with reference.app_context():
+        expected = reference.json.response(Course.from_dict(DOCUMENT).to_dict()).get_json()
+    with app.app_context():
+        body = app.json.response(course_response_from_dict(DOCUMENT)).get_json()
+
+    assert body == expected
+
+
+def test_response_is_json(app):
+    with app.app_context():
+        response = app.json.response([{"_id": COURSE_ID}])
+
+    assert response.mimetype == "application/json"
+    assert response.get_json() == [{"_id": str(COURSE_ID)}]
+
+
+def test_unknown_type_fails(app):
+    with app.app_context(), pytest.raises(TypeError):
+        app.json.dumps({"value": object()})
+
+
+def test_http_date_matches_werkzeug():
+    from datetime import date, timedelta, timezone
+    from werkzeug.http import http_date as werkzeug_http_date
+    from src.json_provider import http_date
+
+    for value in (
+        datetime(2025, 1, 1, 10, 3, 4, 5),
+        datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone(timedelta(hours=-3))),
+        date(2024, 2, 29),
+    ):
+        assert http_date(value) == werkzeug_http_date(value)
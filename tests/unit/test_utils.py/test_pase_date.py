@@ -1,7 +1,13 @@
 import pytest
+from unittest.mock import patch
 from datetime import datetime, timezone
 
-from src.utils import parse_date_to_timestamp_ms
+from src.utils import (
+    parse_date_to_timestamp_ms,
+    parse_dates_to_timestamp_ms,
+    parse_iso_date_string_to_timestamp_ms,
+    timestamp_ms,
+)
 
 
 def test_parse_int_timestamp_ms():
@@ -42,3 +48,59 @@ def test_parse_invalid_string_raises_value_error():
 def test_parse_invalid_type_raises_value_error():
     with pytest.raises(ValueError):
         parse_date_to_timestamp_ms(["invalid", "type"])
+
+def test_parse_date_only_string():
+    expected = int(datetime(2023, 6, 28, tzinfo=timezone.utc).timestamp() * 1000)
+    assert parse_date_to_timestamp_ms("2023-06-28") == expected
+
+def test_parse_iso_string_with_z():
+    expected = int(datetime(2023, 6, 28, 12, tzinfo=timezone.utc).timestamp() * 1000)
+    assert parse_date_to_timestamp_ms("2023-06-28T12:00:00Z") == expected
+
+def test_parse_non_iso_string_falls_back_to_dateutil():
+    expected = int(datetime(2023, 6, 28, 12, tzinfo=timezone.utc).timestamp() * 1000)
+    assert parse_date_to_timestamp_ms("June 28 2023 12:00") == expected
+
+def test_parse_repeated_strings_are_cached():
+    parse_iso_date_string_to_timestamp_ms.cache_clear()
+
+    first = parse_date_to_timestamp_ms("2024-01-15T10:30:00")
+    second = parse_date_to_timestamp_ms("2024-01-15T10:30:00")
+
+    assert first == second
+    assert parse_iso_date_string_to_timestamp_ms.cache_info().hits == 1
+
+def test_parse_relative_strings_are_not_cached():
+    parse_iso_date_string_to_timestamp_ms.cache_clear()
+
+    with patch("src.utils.parse_date") as parse_date:
+        parse_date.side_effect = [
+            datetime(2024, 1, 15, 10, tzinfo=timezone.utc),
+            datetime(2024, 1, 16, 10, tzinfo=timezone.utc),
+        ]
+        # "10:00" is today at 10, so the day after midnight it is another date
+        first = parse_date_to_timestamp_ms("10:00")
+        second = parse_date_to_timestamp_ms("10:00")
+
+    assert second - first == 24 * 60 * 60 * 1000
+    assert parse_iso_date_string_to_timestamp_ms.cache_info().currsize == 0
+
+def test_parse_dates_batch_keeps_semantics():
+    values = [10**13, 1600000000, 1600000000.5, "2023-06-28", None]
+
+    assert parse_dates_to_timestamp_ms(values) == [
+        parse_date_to_timestamp_ms(value) for value in values
+    ]
+
+def test_parse_dates_batch_invalid_value_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_dates_to_timestamp_ms(["2023-06-28", "not a date"])
+
+
+def test_timestamp_ms_keeps_stored_timestamps():
+    with patch("src.utils.parse_date_to_timestamp_ms") as parse:
+        assert timestamp_ms(10**13) == 10**13
+        parse.assert_not_called()
+
+    assert timestamp_ms(1600000000) == 1600000000 * 1000
+    assert timestamp_ms(None) is None
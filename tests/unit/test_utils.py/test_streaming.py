@@ -0,0 +1,90 @@
+import json
+import pytest
+from flask import Flask
+from unittest.mock import MagicMock
+
+from src.endpoints.streaming import stream_batch_size, stream_format, stream_response
+from src.utils import STREAM_MAX_BATCH_SIZE, non_empty_iterator
+
+ITEMS = [{"_id": str(i), "name": f"Course {i}"} for i in range(250)]
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_non_empty_iterator():
+    assert non_empty_iterator(iter([])) is None
+    assert list(non_empty_iterator(iter([1, 2]))) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "url, headers, expected",
+    [
+        ("/", {}, None),
+        ("/?stream=json", {}, "json"),
+        ("/?stream=ndjson", {}, "ndjson"),
+        ("/", {"Accept": "application/x-ndjson"}, "ndjson"),
+        ("/", {"Accept": "*/*"}, None),
+    ],
+)
+def test_stream_format(app, url, headers, expected):
+    with app.test_request_context(url, headers=headers):
+        assert stream_format() == expected
+
+
+def test_stream_batch_size_is_bounded(app):
+    with app.test_request_context("/?batch_size=100000"):
+        assert stream_batch_size() == STREAM_MAX_BATCH_SIZE
+    with app.test_request_context("/?batch_size=0"):
+        assert stream_batch_size() == 1
+
+
+def test_json_array(app):
+    with app.test_request_context("/"):
+        response = stream_response(
+            {"response": iter(ITEMS), "code_status": 200}, "json", MagicMock()
+        )
+
+    assert response.is_streamed
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == ITEMS
+
+
+def test_ndjson(app):
+    with app.test_request_context("/"):
+        response = stream_response(
+            {"response": iter(ITEMS), "code_status": 200}, "ndjson", MagicMock()
+        )
+
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == ITEMS
+
+
+def test_empty_json_array(app):
+    with app.test_request_context("/"):
+        response = stream_response({"response": iter([]), "code_status": 200}, "json", MagicMock())
+
+    assert json.loads(response.get_data()) == []
+
+
+def test_error_is_not_streamed(app):
+    result = {"response": {"title": "Not found"}, "code_status": 404}
+    with app.test_request_context("/"):
+        assert stream_response(result, "json", MagicMock()) == ({"title": "Not found"}, 404)
+
+
+def test_error_while_streaming_cuts_the_body(app):
+    def items():
+        yield ITEMS[0]
+        raise RuntimeError("cursor lost")
+
+    logger = MagicMock()
+    with app.test_request_context("/"):
+        response = stream_response({"response": items(), "code_status": 200}, "ndjson", logger)
+
+    # The first chunk wasn't complete, nothing was sent
+    assert response.get_data() == b""
+    logger.error.assert_called_once()